@@ -104,7 +104,7 @@ for n in range(2,nt):
         p[xscr]=p[xscr]+q[n]
 
         # Update velocity
-        for kx in range(6,nx-5):
+        for kx in range(5,nx-4):
 
             # Calculating spatial derivative
             p_x=i_dx*(1225.0/1024.0)*(p[kx+1]-p[kx])+i_dx*(-245.0/3072.0)*(p[kx+2]-p[kx-1])+i_dx*(49.0/5120.0)*(p[kx+3]-p[kx-2])+i_dx*(-5.0/7168.0)*(p[kx+4]-p[kx-3])
@@ -113,7 +113,7 @@ for n in range(2,nt):
             vx[kx]=vx[kx]-dt/rho[kx]*p_x
 
         # Update pressure
-        for kx in range(6,nx-5):
+        for kx in range(5,nx-4):
 
             # Calculating spatial derivative
             vx_x=i_dx*(1225.0/1024.0)*(vx[kx]-vx[kx-1])+i_dx*(-245.0/3072.0)*(vx[kx+1]-vx[kx-2])+i_dx*(49.0/5120.0)*(vx[kx+2]-vx[kx-3])+i_dx*(-5.0/7168.0)*(vx[kx+3]-vx[kx-4])
@@ -0,0 +1,48 @@
+## FD_1D_advisor.py 1-D FD configuration advisor
+# GNU General Public License v3.0
+#
+# Recommend the cheapest spatial order, temporal scheme, number of grid
+# points per wavelength (c1) and CFL-number (c2) for a given model and
+# propagation time, which meets a tolerance for the phase-velocity error.
+#
+# The cost is measured as number of cell updates (cells*steps) times the
+# stencil terms per update of the scheme (FD_1D_work).
+
+## Initialisation
+import numpy as np
+from FD_1D_advisor_func import FD_1D_advisor
+print(" ")
+print("Starting FD_1D_advisor")
+
+## Input Parameter
+nx=2000     # Number of grid points of the reference setup
+c1=20       # Number of grid points per dominant wavelength of the reference setup
+T=10        # Total propagation time
+f0=10       # Center frequency Ricker-wavelet
+tol=1e-3    # Tolerated relative phase-velocity error
+
+# Velocity
+modell_v = np.hstack((1000*np.ones((int(nx/2))),1500*np.ones((int(nx/2)))))
+
+## Calculation
+cmin=np.min(modell_v)           # Lowest P-wave velocity
+cmax=np.max(modell_v)           # Highest P-wave velocity
+fmax=2*f0                       # Maximum frequency
+length=nx*cmin/(fmax*c1)        # Model size (in m)
+
+best,table=FD_1D_advisor(cmin,cmax,length,fmax,T,tol)
+
+## Output
+print("Model size: x:",length,"in m")
+print("Phase error tolerance: ",tol)
+print(" ")
+print("%-14s %6s %6s %8s %8s %12s %12s"%("Scheme","c1","c2","nx","nt","Cost","Phase error"))
+for row in table:
+    print("%-14s %6.1f %6.2f %8d %8d %12.3e %12.2e"%(row["scheme"],row["c1"],row["c2"],
+          row["nx"],row["nt"],row["cost"],row["phase_error"]))
+print(" ")
+if best is None:
+    print("No configuration meets the tolerance!")
+else:
+    print("Recommended: FD_1D_"+best["scheme"],"with c1=",best["c1"],"and c2=",best["c2"])
+print(" ")
@@ -0,0 +1,83 @@
+## FD_1D_advisor_func.py recommend the cheapest accurate 1D FD configuration
+# GNU General Public License v3.0
+#
+# Evaluates numerical dispersion, dissipation and stability for every
+# combination of spatial order, temporal scheme, number of grid points per
+# minimum wavelength (c1) and CFL-number (c2) at once and recommends the
+# configuration with the lowest cost that meets the given phase-velocity
+# error tolerance. The cost is the number of cell updates (cells*steps)
+# times the stencil work per update (FD_1D_work): the terms of the two
+# first derivatives, of the Adams-Bashforth history and, for Lax-Wendroff,
+# of the two third derivatives.
+#
+# The phase error is evaluated for all wavenumbers up to fmax at both the
+# lowest velocity (c1 grid points per wavelength, local CFL=c2*cmin/cmax)
+# and the highest velocity (c1*cmax/cmin grid points per wavelength, local
+# CFL=c2). The optional dissipation tolerance
+# limits the amplitude loss at fmax after all nt time steps.
+#
+# Usage:
+# best,table=FD_1D_advisor(cmin,cmax,length,fmax,T,tol=1e-3)
+# best is a dict with spatial_order, temporal_order, method, c1, c2, dx, dt,
+# nx, nt, cost and phase_error; table holds the best configuration of every
+# scheme (sorted by cost, infeasible schemes are omitted).
+import numpy as np
+from FD_1D_modelling_func import scheme_name, ABS_WEIGHTS
+from FD_1D_dispersion_func import FD_1D_dispersion, FD_1D_dissipation, FD_1D_check_stability
+
+SCHEMES=[(2,"ABS"),(3,"ABS"),(4,"ABS"),(4,"LW")]
+
+def FD_1D_work(spatial_order,temporal_order,method="ABS"):
+    # Stencil terms per cell update: spatial_order/2 coefficients per first
+    # derivative of p and v, 2 per third derivative (Lax-Wendroff) and the
+    # previous derivatives of the Adams-Bashforth schemes
+    work=spatial_order
+    if method=="LW":
+        work+=2*2
+    else:
+        work+=2*(len(ABS_WEIGHTS[temporal_order])-1)
+    return(work)
+
+def FD_1D_advisor(cmin,cmax,length,fmax,T,tol,dissipation_tol=None,
+                  spatial_orders=(4,6,8,10,12),schemes=SCHEMES,
+                  c1=np.arange(3.0,31.0,0.5),c2=np.linspace(0.02,1.0,50),nk=32):
+    c1=np.asarray(c1,float)[:,None,None]
+    c2=np.asarray(c2,float)[None,:,None]
+    band=np.arange(1,nk+1)[None,None,:]/nk
+
+    # Discretization and cost of every (c1,c2) combination
+    dx=cmin/(fmax*c1)
+    dt=dx/cmax*c2
+    nx=np.ceil(length/dx)
+    nt=np.ceil(T/dt)
+    cost=(nx*nt)[...,0]
+
+    table=[]
+    for spatial_order in spatial_orders:
+        for temporal_order,method in schemes:
+            # Phase error at the lowest and the highest velocity
+            error=np.zeros(cost.shape)
+            amplitude=np.ones(cost.shape)
+            for CFL,points in ((c2*cmin/cmax,c1),(c2,c1*cmax/cmin)):
+                KH=2*np.pi/points*band
+                dispersion=FD_1D_dispersion(temporal_order,spatial_order,CFL,KH,method)
+                error=np.maximum(error,np.max(np.abs(dispersion-1.0),axis=-1))
+                if dissipation_tol is not None:
+                    dissipation=FD_1D_dissipation(temporal_order,spatial_order,CFL,KH,method)
+                    amplitude=np.minimum(amplitude,np.min(dissipation,axis=-1)**nt[...,0])
+            work=FD_1D_work(spatial_order,temporal_order,method)
+            feasible=FD_1D_check_stability(temporal_order,spatial_order,c2[...,0],method)
+            feasible=feasible&(error<=tol)
+            if dissipation_tol is not None:
+                feasible=feasible&(1.0-amplitude<=dissipation_tol)
+            if not np.any(feasible):
+                continue
+            i,j=np.unravel_index(np.argmin(np.where(feasible,cost,np.inf)),cost.shape)
+            table.append({"scheme":scheme_name(spatial_order,temporal_order,method),
+                          "spatial_order":spatial_order,"temporal_order":temporal_order,
+                          "method":method,"c1":c1[i,0,0],"c2":c2[0,j,0],
+                          "dx":dx[i,0,0],"dt":dt[i,j,0],"nx":int(nx[i,0,0]),
+                          "nt":int(nt[i,j,0]),"cost":cost[i,j]*work,"phase_error":error[i,j]})
+    table.sort(key=lambda row: row["cost"])
+    best=table[0] if table else None
+    return(best,table)
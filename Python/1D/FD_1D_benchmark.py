@@ -0,0 +1,48 @@
+## FD_1D_benchmark.py benchmark of the 1-D modelling backends
+# GNU General Public License v3.0
+#
+# Compares the runtime per time step of the plain NumPy backend and the
+# fused numexpr backend (if installed) of FD_1D_modelling for several grid
+# sizes and temporal schemes. Only the time stepping is timed: the runtime
+# of a short run (setup and nt_setup time steps) is subtracted from the
+# runtime of a run with nt time steps (best of repeat measurements).
+
+## Initialisation
+import time
+import numpy as np
+from FD_1D_modelling_func import FD_1D_modelling, scheme_name
+from FD_numexpr_func import ne
+print(" ")
+print("Starting FD_1D_benchmark")
+
+## Input Parameter
+grid_sizes=[2000,20000,200000,2000000] # Number of grid points
+schemes=[(4,2,"ABS"),(4,4,"ABS"),(4,4,"LW"),(8,2,"ABS")]
+nt=50        # Number of time steps per measurement
+nt_setup=10  # Number of time steps of the subtracted short run
+repeat=3     # Number of measurements
+
+## Benchmark
+backends=["numpy"]+(["numexpr"] if ne is not None else [])
+if ne is None:
+    print("numexpr is not installed, only the NumPy backend is measured")
+print("%-14s %9s"%("Scheme","nx")+"".join(" %14s"%(b+" us/step") for b in backends)+"  Speedup")
+for spatial_order,temporal_order,method in schemes:
+    for nx in grid_sizes:
+        modell_v=1000*np.ones(nx)
+        rho=np.ones(nx)
+        runtime=[]
+        for backend in backends:
+            def run(steps):
+                # Runtime of a run with steps time steps
+                start=time.perf_counter()
+                FD_1D_modelling(modell_v,rho,1.0,0.0005,np.zeros(steps),nx//2,[nx//4],spatial_order,
+                                temporal_order,method,backend=backend)
+                return(time.perf_counter()-start)
+            runtime.append(min(run(nt)-run(nt_setup) for r in range(repeat))/(nt-nt_setup))
+        line="%-14s %9d"%(scheme_name(spatial_order,temporal_order,method),nx)
+        line+="".join(" %14.1f"%(1e6*r) for r in runtime)
+        if len(runtime)>1:
+            line+="  %7.2f"%(runtime[0]/runtime[1])
+        print(line)
+print(" ")
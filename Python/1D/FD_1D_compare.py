@@ -9,57 +9,49 @@
 # Compare seismograms, which are calculated with different
 # spatial and temporal accuracy.
 #
-# This script will read in the seismograms to compare them.
+# This script runs all configurations in parallel (configurations which
+# are already stored in Seismograms/ are not computed again), compares them
+# against a reference run and plots the seismograms.
 
 ## Initialisation
 import numpy as np
 from matplotlib.pyplot import *
+from FD_1D_compare_func import FD_1D_compare_runs, FD_1D_compare_table
 
-## Execute the following python code
-# python FD_1D_DX4_DT3_ABS_fast.py
-# python FD_1D_DX4_DT3_ABS_fast.py
-# python FD_1D_DX4_DT4_ABS_fast.py
-# python FD_1D_DX4_DT4_LW_fast.py
-# python FD_1D_DX8_DT2_fast.py
+## Input Parameter
 
-## Read Seismograms
-FD_1D_DX4_DT2=np.load("Seismograms/FD_1D_DX4_DT2_fast.npy")
-FD_1D_DX4_DT3_ABS=np.load("Seismograms/FD_1D_DX4_DT3_ABS_fast.npy")
-FD_1D_DX4_DT4_ABS=np.load("Seismograms/FD_1D_DX4_DT4_ABS_fast.npy")
-FD_1D_DX4_DT4_LW=np.load("Seismograms/FD_1D_DX4_DT4_LW_fast.npy")
-FD_1D_DX8_DT2=np.load("Seismograms/FD_1D_DX8_DT2_fast.npy")
+# Model and acquisition of the FD_1D_* scripts
+setup={"c1":20,"c2":0.5,"nx":2000,"T":10,"f0":10,"xscr":100,"xrec":(400,800,1800)}
 
-## Plotting
-figure(1)
-Line1,=plot(FD_1D_DX4_DT2[0,:])
-Line2,=plot(FD_1D_DX4_DT3_ABS[0,:])
-Line3,=plot(FD_1D_DX4_DT4_ABS[0,:])
-Line4,=plot(FD_1D_DX4_DT4_LW[0,:])
-Line5,=plot(FD_1D_DX8_DT2[0,:])
-legend((Line1, Line2, Line3, Line4, Line5), ('FD_1D_DX4_DT2', 'FD_1D_DX4_DT3_ABS', 'FD_1D_DX4_DT4_ABS', 'FD_1D_DX4_DT4_LW', 'FD_1D_DX8_DT2'))
-title('Seismogram 1')
-ylabel('Amplitude')
-xlabel('Time in s')
+# Configurations to compare
+configs=[{"spatial_order":4,"temporal_order":2},
+         {"spatial_order":4,"temporal_order":3,"method":"ABS"},
+         {"spatial_order":4,"temporal_order":4,"method":"ABS"},
+         {"spatial_order":4,"temporal_order":4,"method":"LW"},
+         {"spatial_order":8,"temporal_order":2}]
 
-figure(2)
-Line1,=plot(FD_1D_DX4_DT2[1,:])
-Line2,=plot(FD_1D_DX4_DT3_ABS[1,:])
-Line3,=plot(FD_1D_DX4_DT4_ABS[1,:])
-Line4,=plot(FD_1D_DX4_DT4_LW[1,:])
-Line5,=plot(FD_1D_DX8_DT2[1,:])
-legend((Line1, Line2, Line3, Line4, Line5), ('FD_1D_DX4_DT2', 'FD_1D_DX4_DT3_ABS', 'FD_1D_DX4_DT4_ABS', 'FD_1D_DX4_DT4_LW', 'FD_1D_DX8_DT2'))
-title('Seismogram 2')
-ylabel('Amplitude')
-xlabel('Time in s')
+# Reference: high spatial and temporal order with a small time step
+reference={"spatial_order":12,"temporal_order":4,"method":"ABS","c2":0.1}
 
-figure(3)
-Line1,=plot(FD_1D_DX4_DT2[2,:])
-Line2,=plot(FD_1D_DX4_DT3_ABS[2,:])
-Line3,=plot(FD_1D_DX4_DT4_ABS[2,:])
-Line4,=plot(FD_1D_DX4_DT4_LW[2,:])
-Line5,=plot(FD_1D_DX8_DT2[2,:])
-legend((Line1, Line2, Line3, Line4, Line5), ('FD_1D_DX4_DT2', 'FD_1D_DX4_DT3_ABS', 'FD_1D_DX4_DT4_ABS', 'FD_1D_DX4_DT4_LW', 'FD_1D_DX8_DT2'))
-title('Seismogram 3')
-ylabel('Amplitude')
-xlabel('Time in s')
-show()
+processes=None # Number of processes, None uses all cores
+
+if __name__=="__main__":
+    print(" ")
+    print("Starting FD_1D_compare")
+
+    ## Run and compare
+    results=FD_1D_compare_runs(configs,reference,setup,processes)
+    FD_1D_compare_table(results)
+
+    ## Plotting
+    t=np.arange(results[0]["Seismogramm"].shape[1])*results[0]["dt"]
+    for n in range(len(setup["xrec"])):
+        figure(n+1)
+        lines=[plot(t,r["Seismogramm"][n,:])[0] for r in results[1:]]
+        legend(lines,[r["name"] for r in results[1:]])
+        title('Seismogram '+str(n+1))
+        ylabel('Amplitude')
+        xlabel('Time in s')
+    show()
+
+    print(" ")
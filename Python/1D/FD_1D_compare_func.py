@@ -0,0 +1,125 @@
+## FD_1D_compare_func.py compare 1-D FD schemes in parallel
+# GNU General Public License v3.0
+#
+# Runs any set of scheme configurations of FD_1D_modelling concurrently in
+# a process pool and compares their seismograms against a reference run.
+# Results are stored in the seismogram cache (FD_cache_func), so
+# configurations which have already been computed are not run again.
+#
+# A configuration is a dict with the keys spatial_order, temporal_order,
+# method, coeff_spatial (see FD_1D_modelling), c1, c2 (see FD_1D_setup)
+# and an optional name. Missing keys take the defaults of FD_1D_modelling
+# and FD_1D_setup. Seismograms of runs with another time step or grid
+# spacing than the reference are resampled to the time vector of the
+# reference and scaled by dt/dx (the source is injected into one grid point
+# per time step).
+#
+# The rigid model edges (BOUNDARY grid points of FD_1D_modelling) are at a
+# physical position which depends on dx, so runs with another c1 than the
+# reference have their edge reflections at other times. FD_1D_compare_table
+# prints a warning for these runs, their misfit then includes the edges.
+#
+# Usage:
+# results=FD_1D_compare_runs(configs,reference)
+# FD_1D_compare_table(results)
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from FD_1D_modelling_func import FD_1D_modelling, scheme_name, SAMPLE_OFFSET, BOUNDARY
+from FD_cache_func import FD_cached, FD_cache_key, FD_cache_load, CACHE_DIR
+from FD_misfit_func import FD_misfit, FD_resample
+
+SCHEME_KEYS=("spatial_order","temporal_order","method","coeff_spatial")
+SETUP_KEYS=("c1","c2","nx","T","f0","q0","xscr","xrec","c1_model")
+
+def FD_1D_setup(c1=20,c2=0.5,nx=2000,T=10,f0=10,q0=1,xscr=100,xrec=(400,800,1800),c1_model=20):
+    # Two-layer model of the FD_1D_* scripts. The geometry (nx, xscr, xrec
+    # in grid points) refers to a grid with c1_model points per wavelength,
+    # so that runs with a different c1 model the same physical setup.
+    cmin=1000.0
+    cmax=1500.0
+    fmax=2*f0
+    length=nx*cmin/(fmax*c1_model)
+    dx=cmin/(fmax*c1)             # Spatial discretization (in m)
+    dt=dx/(cmax)*c2               # Temporal discretization (in s)
+    scale=c1/c1_model
+    nx=int(round(nx*scale))
+    x=np.arange(nx)*dx
+    modell_v=np.where(x<length/2,cmin,cmax)
+    rho=np.where(x<length/2,1.0,1.5)
+    t=np.arange(0,T,dt)
+    tau=np.pi*f0*(t-1.5/f0)
+    q=q0*(1.0-2.0*tau**2.0)*np.exp(-tau**2)
+    return({"modell_v":modell_v,"rho":rho,"dx":dx,"dt":dt,"q":q,
+            "xscr":int(round(xscr*scale)),"xrec":[int(round(r*scale)) for r in xrec],"t":t})
+
+def _arguments(config,setup):
+    # Arguments of FD_1D_modelling for a configuration
+    s=dict(setup)
+    s.update((k,config[k]) for k in SETUP_KEYS if k in config)
+    model=FD_1D_setup(**s)
+    args=(model["modell_v"],model["rho"],model["dx"],model["dt"],model["q"],model["xscr"],model["xrec"])
+    kwargs=dict((k,config[k]) for k in SCHEME_KEYS if k in config)
+    return(args,kwargs,model)
+
+def _name(config):
+    if "name" in config:
+        return(config["name"])
+    return(scheme_name(config.get("spatial_order",4),config.get("temporal_order",2),
+                       config.get("method","ABS")))
+
+def _run(args,kwargs,cache_dir):
+    FD_cached(FD_1D_modelling,*args,cache_dir=cache_dir,**kwargs)
+
+def FD_1D_compare_runs(configs,reference,setup=None,processes=None,cache_dir=CACHE_DIR):
+    if setup is None:
+        setup={}
+    jobs=[reference]+list(configs)
+    arguments=[_arguments(job,setup) for job in jobs]
+    keys=[FD_cache_key(FD_1D_modelling,*a[0],**a[1]) for a in arguments]
+
+    ## Run all configurations which are not cached yet
+    pending={}
+    for key,a in zip(keys,arguments):
+        if key not in pending and FD_cache_load(key,cache_dir) is None:
+            pending[key]=a
+    if pending:
+        print("Running",len(pending),"of",len(set(keys)),"configurations...")
+        with ProcessPoolExecutor(processes) as pool:
+            futures=[pool.submit(_run,a[0],a[1],cache_dir) for a in pending.values()]
+            for f in futures:
+                f.result()
+
+    ## Compare against the reference
+    results=[]
+    for job,key,a in zip(jobs,keys,arguments):
+        Seismogramm,meta=FD_cache_load(key,cache_dir)
+        model=a[2]
+        results.append({"name":_name(job),"config":job,"dt":model["dt"],"dx":model["dx"],
+                        "Seismogramm":Seismogramm,"runtime":meta["runtime"],
+                        "cost":float(model["modell_v"].size)*model["q"].size,
+                        "edges":(BOUNDARY[0]*model["dx"],(model["modell_v"].size-BOUNDARY[1])*model["dx"])})
+    ref=results[0]
+    nt_ref=ref["Seismogramm"].shape[1]
+    for r in results:
+        # The source is injected once per time step, so amplitudes scale with dx/dt
+        scale=r["dt"]/ref["dt"]*ref["dx"]/r["dx"]
+        r["Seismogramm"]=FD_resample(r["Seismogramm"],r["dt"],ref["dt"],nt_ref,SAMPLE_OFFSET)*scale
+        r["misfit"]=FD_misfit(r["Seismogramm"],ref["Seismogramm"],ref["dt"])
+    return(results)
+
+def FD_1D_compare_table(results):
+    # Print runtime versus accuracy of every configuration (the first is the reference)
+    print("%-16s %10s %12s %10s %12s %14s"%("Scheme","Runtime/s","Cells*steps",
+          "L2-misfit","Max. error","Time shift/ms"))
+    for n,r in enumerate(results):
+        m=r["misfit"]
+        name=r["name"]+(" (ref)" if n==0 else "")
+        print("%-16s %10.2f %12.3e %10.2e %12.2e %14.4f"%(name,r["runtime"],r["cost"],
+              np.max(m["l2"]),np.max(m["max_error"]),1000*np.max(np.abs(m["time_shift"]))))
+    edges=results[0]["edges"]
+    for r in results[1:]:
+        if not np.allclose(r["edges"],edges,rtol=0,atol=1e-3*results[0]["dx"]):
+            print("Warning: FD_1D_compare_table")
+            print("The rigid edges of %s are at %.1f m and %.1f m instead of %.1f m and %.1f m (reference),"
+                  %((r["name"],)+r["edges"]+edges))
+            print("its misfit includes the different edge reflections!")
@@ -0,0 +1,117 @@
+## FD_1D_dispersion_func.py numerical dispersion, dissipation and stability
+# GNU General Public License v3.0
+#
+# Vectorized calculation of the numerical dispersion (ratio between
+# numerical wave velocity and model velocity), the numerical dissipation
+# (remaining amplitude after one time step) and the stability limit of the
+# 1D acoustic FD-schemes of FD_1D_modelling_func.
+#
+# Supports the second-order leapfrog scheme, the third and fourth-order
+# Adams-Bashforth schemes (method="ABS") and the fourth-order Lax-Wendroff
+# scheme (method="LW"). CFL and KH can be arrays of any broadcastable shape,
+# KH is the spatial sampling 2*pi/(grid points per wavelength).
+#
+# With the amplification factor t=z^2 of one time step, the staggered
+# Adams-Bashforth schemes (weights w_j) lead to the characteristic equation
+# z^(2L)-z^(2L-2)-2i*mu*sum_j w_j*z^(2(L-1-j)+1)=0, mu=CFL*spatial_influence
+# which is solved once per scheme on a fine mu grid; the physical root is
+# tracked from z=1. The Lax-Wendroff scheme is the leapfrog scheme with the
+# third-derivative correction added to the spatial influence.
+#
+# Theory:
+# Bohlen, T., & Wittkamp, F. (2016).
+# Three-dimensional viscoelastic time-domain finite-difference
+# seismic modelling using the staggered Adams-Bashforth time integrator.
+# Geophysical Journal International, 204(3), 1781-1788.
+import numpy as np
+from FD_taylor_coeff_func import coeff
+from FD_1D_modelling_func import ABS_WEIGHTS
+
+# Sampling of the characteristic equation in mu
+MU_MAX=2.0
+NMU=20001
+_roots={}
+
+def _physical_root(temporal_order,method):
+    # Returns (mu, |z|, arg(z), largest stable mu) of the physical root
+    key=2 if method=="LW" else temporal_order
+    if key in _roots:
+        return(_roots[key])
+    w=ABS_WEIGHTS[key]
+    L=len(w)
+    mu=np.linspace(0,MU_MAX,NMU)
+    # Polynomial coefficients, highest power first
+    P=np.zeros((NMU,2*L+1),complex)
+    P[:,0]=1.0
+    P[:,2]=-1.0
+    for j in range(L):
+        P[:,2*j+1]+=-2j*mu*w[j]
+    # Roots of all polynomials at once as eigenvalues of the companion matrices
+    C=np.zeros((NMU,2*L,2*L),complex)
+    C[:,0,:]=-P[:,1:]
+    C[:,np.arange(1,2*L),np.arange(2*L-1)]=1.0
+    roots=np.linalg.eigvals(C)
+    # Track the physical root from z=1
+    z=np.zeros(NMU,complex)
+    z_old=1.0
+    for n in range(NMU):
+        z_old=roots[n,np.argmin(np.abs(roots[n]-z_old))]
+        z[n]=z_old
+    unstable=np.nonzero(np.max(np.abs(roots),axis=1)>1.0+1e-9)[0]
+    mu_stable=mu[unstable[0]-1] if unstable.size else MU_MAX
+    _roots[key]=(mu,np.abs(z),np.unwrap(np.angle(z)),mu_stable)
+    return(_roots[key])
+
+def spatial_influence(coeff_spatial,KH):
+    # sum_n coeff(n)*sin(KH/2*(2n-1)), vectorized over KH
+    coeff_spatial=np.asarray(coeff_spatial,float)
+    KH=np.asarray(KH,float)
+    n=2*np.arange(1,coeff_spatial.size+1)-1
+    return(np.sin(KH[...,None]/2.0*n).dot(coeff_spatial))
+
+def _mu(temporal_order,spatial_order,CFL,KH,method,coeff_spatial):
+    if coeff_spatial is None:
+        coeff_spatial=coeff(spatial_order)
+    CFL=np.asarray(CFL,float)
+    s=spatial_influence(coeff_spatial,KH)
+    if method=="LW":
+        # Third derivative stencil of second order: -4*sin(KH/2)^3
+        s=s-CFL**2/6.0*np.sin(np.asarray(KH,float)/2.0)**3
+    return(CFL*s)
+
+def FD_1D_stability_limit(temporal_order,spatial_order,method="ABS",coeff_spatial=None):
+    # Largest stable CFL number
+    mu,amp,phase,mu_stable=_physical_root(temporal_order,method)
+    CFL=np.linspace(1e-3,2.0,2000)
+    KH=np.linspace(0,np.pi,257)
+    mu_k=np.abs(_mu(temporal_order,spatial_order,CFL[:,None],KH[None,:],method,coeff_spatial))
+    stable=np.all(mu_k<=mu_stable,axis=1)
+    if not stable[0]:
+        # Unstable for all sampled CFL numbers
+        return(0.0)
+    return(CFL[np.argmin(stable)-1] if not np.all(stable) else CFL[-1])
+
+def FD_1D_check_stability(temporal_order,spatial_order,CFL,method="ABS",coeff_spatial=None):
+    # True where the scheme is stable for all wavenumbers
+    mu,amp,phase,mu_stable=_physical_root(temporal_order,method)
+    CFL=np.asarray(CFL,float)
+    KH=np.linspace(0,np.pi,257)
+    mu_k=np.abs(_mu(temporal_order,spatial_order,CFL[...,None],KH,method,coeff_spatial))
+    return(np.all(mu_k<=mu_stable,axis=-1))
+
+def FD_1D_dispersion(temporal_order,spatial_order,CFL,KH,method="ABS",coeff_spatial=None):
+    # Ratio between numerical wave velocity and model velocity, NaN if unstable
+    mu,amp,phase,mu_stable=_physical_root(temporal_order,method)
+    CFL=np.asarray(CFL,float)
+    mu_k=_mu(temporal_order,spatial_order,CFL,KH,method,coeff_spatial)
+    dispersion=2.0*np.sign(mu_k)*np.interp(np.abs(mu_k),mu,phase)/(CFL*np.asarray(KH,float))
+    stable=FD_1D_check_stability(temporal_order,spatial_order,CFL,method,coeff_spatial)
+    return(np.where(stable,dispersion,np.nan))
+
+def FD_1D_dissipation(temporal_order,spatial_order,CFL,KH,method="ABS",coeff_spatial=None):
+    # Remaining amplitude after one time step, NaN if unstable
+    mu,amp,phase,mu_stable=_physical_root(temporal_order,method)
+    mu_k=_mu(temporal_order,spatial_order,CFL,KH,method,coeff_spatial)
+    dissipation=np.interp(np.abs(mu_k),mu,amp)**2
+    stable=FD_1D_check_stability(temporal_order,spatial_order,CFL,method,coeff_spatial)
+    return(np.where(stable,dissipation,np.nan))
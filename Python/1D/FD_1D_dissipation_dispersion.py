@@ -0,0 +1,48 @@
+## FD_1D_dissipation_dispersion.py Plot dissipation and dispersion for a 1D acoustic FD-scheme
+# GNU General Public License v3.0
+#
+# Plotting the numerical dissipation and numerical dispersion for
+# the 1D acoustic FD-schemes.
+# This script supports the second-order leapfrog scheme as well as
+# the third and fourth-order Adams-Basforth schemes.
+
+## Initialisation
+import numpy as np
+import matplotlib.pyplot as plt
+from FD_1D_dispersion_func import FD_1D_dispersion, FD_1D_dissipation
+print(" ")
+print("Starting FD_1D_dissipation_dispersion")
+
+## Input Parameter
+Courant_Max=0.8     # Maximum Courant (CFL) number
+Courant_Min=0.01    # Smallest Courant (CFL) number
+Courant_Delta=0.05  # Sampling for the Courant (CFL) number
+KH=2*np.pi/15       # Spatial sampling, 2*pi/(Grid points per wavelength)
+Spatial_order=8     # Spatial-order of the FD-stencil
+NT=2000             # Number of time steps for the dissipation calculation
+
+## Calculating the numerical dissipation and dispersion
+CFL=np.arange(Courant_Min,Courant_Max,Courant_Delta)
+order=np.arange(2,5)
+Dissipation=np.array([FD_1D_dissipation(o,Spatial_order,CFL,KH) for o in order])**NT
+Dispersion=np.array([FD_1D_dispersion(o,Spatial_order,CFL,KH) for o in order])
+print("Calculation finished")
+
+## Plotting of the dispersion and dissipation
+colors=[[0.8500,0.3250,0.0980],[0.9290,0.6940,0.1250],[0.4940,0.1840,0.5560]]
+fig,(ax1,ax2)=plt.subplots(1,2)
+for n in range(3):
+    ax1.plot(CFL,Dissipation[n],linewidth=2,color=colors[n],label="M="+str(order[n]))
+    ax2.plot(CFL,Dispersion[n]-1,linewidth=2,color=colors[n],label="M="+str(order[n]))
+ax1.legend()
+ax1.set_title('Dissipation')
+ax1.set_xlabel('CFL-Number')
+ax1.set_ylabel('Amplitude after \n'+str(NT)+' time steps')
+ax2.plot(CFL,np.zeros(CFL.size),'-.',color='black')
+ax2.legend()
+ax2.set_title('Dispersion')
+ax2.set_xlabel('CFL-Number')
+ax2.set_ylabel('c_fd/c-1')
+plt.show()
+
+print(" ")
@@ -0,0 +1,50 @@
+## FD_1D_impulse_response_func.py impulse responses and FFT convolution
+# GNU General Public License v3.0
+#
+# The discretized wave equation is linear and time-invariant, so the
+# seismograms of any source wavelet are the convolution of the wavelet with
+# the impulse response of the FD-scheme. FD_1D_impulse_response runs the
+# time stepping once with a unit impulse at the source position and returns
+# the spectra of the impulse responses at all receivers, band-limited to
+# fmax to keep them small. FD_convolve then gives the seismograms of any
+# wavelet with frequencies below fmax by FFT convolution, without another
+# time stepping.
+#
+# Usage:
+# H=FD_cached(FD_1D_impulse_response,modell_v,rho,dx,dt,nt,xscr,xrec,fmax=50)
+# Seismogramm=FD_convolve(H,FD_ricker(f0,dt,nt))
+# FD_cached (FD_cache_func) stores H in Seismograms/, so the impulse
+# responses are reused across sessions.
+import numpy as np
+from FD_1D_modelling_func import FD_1D_modelling
+
+def FD_ricker(f0,dt,nt,q0=1):
+    # Ricker-wavelet of the FD_1D_* scripts
+    t=np.arange(nt)*dt
+    tau=np.pi*f0*(t-1.5/f0)
+    return(q0*(1.0-2.0*tau**2.0)*np.exp(-tau**2))
+
+def FD_1D_impulse_response(modell_v,rho,dx,dt,nt,xscr,xrec,fmax=None,spatial_order=4,
+                           temporal_order=2,method="ABS",coeff_spatial=None):
+    # Unit impulse at the first injected time step (the time loop starts at n=2)
+    q=np.zeros(nt)
+    q[2]=1.0
+    G=FD_1D_modelling(modell_v,rho,dx,dt,q,xscr,xrec,spatial_order,
+                      temporal_order,method,coeff_spatial)
+    if G is None:
+        return
+    # Align to the injection, zero padded to 2*nt for a linear convolution
+    H=np.fft.rfft(G[:,2:],2*nt,axis=1)
+    if fmax is not None:
+        nf=int(np.ceil(fmax*2*nt*dt))+1
+        H=H[:,:min(nf,H.shape[1])]
+    return(H)
+
+def FD_convolve(H,q):
+    # Seismograms of the source signal q, same result as FD_1D_modelling with q
+    nt=np.size(q)
+    q=np.array(q,float)
+    q[:2]=0.0 # Not injected by the time loop
+    Q=np.fft.rfft(q,2*nt)
+    Seismogramm=np.fft.irfft(H*Q[:H.shape[1]],2*nt,axis=1)
+    return(Seismogramm[:,:nt])
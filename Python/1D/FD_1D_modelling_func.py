@@ -0,0 +1,464 @@
+## FD_1D_modelling_func.py 1-D acoustic Finite-Difference modelling
+# GNU General Public License v3.0
+#
+# Finite-Difference acoustic seismic wave simulation
+# Discretization of the first-order acoustic wave equation
+#
+# Vectorized 1-D modelling function for an arbitrary spatial order and
+# the temporal schemes of the FD_1D_* scripts:
+# temporal_order=2               Leapfrog
+# temporal_order=3, method="ABS" Adams-Bashforth
+# temporal_order=4, method="ABS" Adams-Bashforth
+# temporal_order=4, method="LW"  Lax-Wendroff
+#
+# The spatial stencil is given by coeff_spatial (same layout as coeff(order)
+# from FD_taylor_coeff_func), so Taylor and dispersion-optimized
+# coefficients (FD_holberg_coeff_func) can be used interchangeably.
+#
+# Usage:
+# Seismogramm=FD_1D_modelling(modell_v,rho,dx,dt,q,xscr,[xrec1,xrec2,xrec3])
+# returns the pressure seismograms with shape (number of receivers, nt),
+# where nt is the number of samples of the source signal q.
+# backend="numexpr" evaluates every derivative and update as one fused
+# expression (see FD_numexpr_func), backend=None selects it automatically.
+# With dt_out, the seismograms are low-pass filtered and resampled to the
+# sample interval dt_out during the time stepping (see FD_recorder_func).
+# progress reports progress, ETA and throughput (see FD_progress_func).
+# live shows the wavefield and seismograms during the time stepping (see
+# FD_live_func).
+# modell_v and rho can also be file names of .npy files (see FD_model_func).
+# multirate=True advances slow regions with larger local time steps
+# (power of two multiples of dt, see FD_multirate_func), for temporal_order=2
+# and dt from CFL-numbers up to about 0.65 (with the numpy backend).
+# refinement=True (or blocks from FD_grid_blocks) uses a coarser grid
+# spacing in blocks with higher velocities (see FD_grid_func), for the
+# leapfrog and Adams-Bashforth schemes (with the numpy backend).
+# stop=True ends the time stepping early when no more waves arrive at the
+# receivers (see FD_stop_func).
+# watchdog (default True) aborts unstable runs with a diagnostic and
+# returns None (see FD_watchdog_func), not with multirate time stepping or
+# grid refinement.
+import numpy as np
+from FD_taylor_coeff_func import coeff
+from FD_numexpr_func import ne, select_backend, stencil_expression
+from FD_kernel_func import FD_kernel
+from FD_recorder_func import FD_recorder, FD_record
+from FD_progress_func import FD_progress_start, FD_progress_update, FD_progress_finish
+from FD_live_func import FD_live_start, FD_live_update, FD_live_finish
+from FD_stop_func import FD_stop_start, FD_stop_check, FD_stop_distance
+from FD_watchdog_func import FD_watchdog_start, FD_watchdog_check
+from FD_model_func import FD_model_load, FD_model_coefficients
+from FD_multirate_func import FD_multirate_regions, FD_multirate_tree
+from FD_grid_func import FD_grid_blocks, FD_grid_align, FD_grid_axis, FD_grid_average, FD_grid_halves, FD_grid_source, FD_grid_interpolation, FD_grid_nearest
+
+# Rigid grid points at the left and right model edge, as in the FD_1D_* scripts
+BOUNDARY=(5,4)
+
+# Sample n of the seismograms belongs to the time (n+SAMPLE_OFFSET)*dt of
+# the source signal q (source injection and recording order of the time loop)
+SAMPLE_OFFSET=1.5
+
+# Weights of the staggered Adams-Bashforth schemes (Bohlen & Wittkamp, 2016)
+ABS_WEIGHTS={2:[1.0],
+             3:[25.0/24.0,-1.0/12.0,1.0/24.0],
+             4:[13.0/12.0,-5.0/24.0,1.0/6.0,-1.0/24.0]}
+
+def scheme_name(spatial_order,temporal_order,method="ABS"):
+    # Name of a scheme as used by the FD_1D_* scripts, e.g. DX4_DT3_ABS
+    name="DX"+str(spatial_order)+"_DT"+str(temporal_order)
+    if temporal_order>2:
+        name=name+"_"+method
+    return(name)
+
+def forward_derivative(f,c,out,a,b):
+    # out[k-a]=sum_n c(n)*(f[k+n]-f[k-n+1]) for k=a..b-1 (generated kernel),
+    # along the first axis of f (further axes: members of an ensemble)
+    return(FD_kernel(c,f.ndim,0,True)(f,out,(slice(a,b),)+(slice(None),)*(f.ndim-1)))
+
+def backward_derivative(f,c,out,a,b):
+    # out[k-a]=sum_n c(n)*(f[k+n-1]-f[k-n]) for k=a..b-1 (generated kernel),
+    # along the first axis of f (further axes: members of an ensemble)
+    return(FD_kernel(c,f.ndim,0,False)(f,out,(slice(a,b),)+(slice(None),)*(f.ndim-1)))
+
+def _lts_buffers(node,N):
+    # Work arrays of the active rows of all nodes
+    node["buffers"]=[(np.zeros(e-s+4*N-2),np.zeros(e-s+2*N-1),np.zeros(e-s)) for s,e in node["active"]]
+    for child in node["children"]:
+        _lts_buffers(child,N)
+
+def _lts_operator(y,node,c,dt_rho,l_dt,out):
+    # out+=dt^2*K(own*y) of a node, with the second-order operator
+    # K=-l*D_x(1/rho*D_x) of the staggered leapfrog scheme, on its active
+    # rows (dt_rho with N zeros at both sides, the rigid velocities)
+    N=c.size
+    D=2*N-1
+    lo,hi=node["lo"],node["hi"]
+    for (s,e),(f,v,d) in zip(node["active"],node["buffers"]):
+        r0,r1=max(s-D,lo),min(e+D,hi)
+        np.multiply(node["own"][r0-lo:r1-lo],y[r0-lo:r1-lo],out=f[r0-s+D:r1-s+D])
+        forward_derivative(f,c,v,D-N,D+e-s+N-1)
+        v*=dt_rho[s:e+2*N-1]
+        backward_derivative(v,c,d,N,N+e-s)
+        d*=l_dt[s:e]
+        out[s-lo:e-lo]-=d
+    return(out)
+
+def _lts_solve(node,z,w,H,c,dt_rho,l_dt,nu):
+    # Local time stepping of a node over the step H of its parent (in units
+    # of dt), starting at rest from z with the constant forcing w of the
+    # coarser levels: m=H/step leapfrog steps, stabilized with the damped
+    # Chebyshev polynomial of order m (LTS-LF(nu), Diaz & Grote, 2009;
+    # Grote, Mehlin & Sauter, 2018); nu=0 is the plain leapfrog
+    lo,m=node["lo"],node["ratio"]
+    theta=np.arccosh(1.0+nu/m**2)
+    T=np.cosh(np.arange(m+1)*theta)
+    # Step of the half-steps, so that the result is consistent (for nu=0: H/m)
+    h=H/m if nu==0 else H*np.sqrt(np.sinh(theta)*T[m]/(m*np.sinh(m*theta)*T[1]))
+    y=z
+    for k in range(m):
+        W=_lts_operator(y,node,c,dt_rho,l_dt,w.copy())
+        Y=y-0.5*h*h*W
+        for child in node["children"]:
+            r=slice(child["lo"]-lo,child["hi"]-lo)
+            Y[r]=_lts_solve(child,y[r],W[r],h,c,dt_rho,l_dt,nu)
+        if k>0:
+            Y*=2*T[k]*T[1]/T[k+1]
+            Y-=T[k-1]/T[k+1]*y_old
+        y,y_old=Y,y
+    return(y)
+
+def _multirate_time_steps(p,c,dt_rho,l_dt,q,xscr,xrec,a,b,root,recorder,progress,live,nu=0.3):
+    # Leapfrog of the second-order form u(T+H)=2u(T)-u(T-H)-H^2*K*u(T) of the
+    # staggered scheme (u: pressure after the source injection) with the
+    # step H of the root node; finer nodes advance with their own steps.
+    # Seismograms are interpolated (cubic) between the steps of the root.
+    N=c.size
+    n_u=b-a
+    nt=np.size(q)
+    dt_rho=np.concatenate((np.zeros(N),dt_rho,np.zeros(N)))
+    _lts_buffers(root,N)
+    H=root["step"]
+    src=xscr-a
+    rec=np.asarray(xrec)-a
+    valid=(rec>=0)&(rec<n_u)
+    rec=np.where(valid,rec,0)
+    q_t=lambda t: np.interp(t,np.arange(nt),q)
+    u=np.zeros(n_u)
+    u[src]=q[2]
+    u_old=np.zeros(n_u)
+    T=2
+    history=[np.zeros(rec.size)]*3+[u[rec]*valid]
+    n=2
+    while n<nt:
+        # Root step with the source as forcing
+        W=_lts_operator(u,root,c,dt_rho,l_dt,np.zeros(n_u))
+        W[src]-=q_t(T+1)-q_t(T)
+        Y=u-0.5*H*H*W
+        for child in root["children"]:
+            r=slice(child["lo"],child["hi"])
+            Y[r]=_lts_solve(child,u[r],W[r],H,c,dt_rho,l_dt,nu)
+        u_old*=-1.0
+        u_old+=2.0*Y
+        u,u_old=u_old,u
+        T+=H
+        history=history[1:]+[u[rec]*valid]
+
+        # Save seismograms of the times T-2H..T-H (pressure before the
+        # injection, at the sample n the time n+1)
+        while n<nt and n+1<T-H:
+            x=(n+1-(T-2*H))/float(H)
+            weights=(-x*(x-1)*(x-2)/6,(x+1)*(x-1)*(x-2)/2,-(x+1)*x*(x-2)/2,(x+1)*x*(x-1)/6)
+            values=sum(wi*hi for wi,hi in zip(weights,history))-q_t(n+1)*(rec==src)*valid
+            FD_record(recorder,n,values)
+            if progress is not None:
+                FD_progress_update(progress,n)
+            if live is not None:
+                p[a:b]=u
+                FD_live_update(live,n,p,recorder["Seismogramm"])
+            n+=1
+    p[a:b]=u
+
+def _refined_time_steps(modell_v,rho,dt,c,weights,q,xscr,xrec,blocks,recorder,progress,live):
+    # Time stepping on the block grid (see FD_grid_func): pressure and
+    # velocity of all blocks in flat arrays with ghost points. The pressure
+    # ghost points are interpolated before the velocity update, the
+    # divergence of the velocity is the adjoint of this gradient (ghost
+    # values added back with the interpolation weights), so the energy is
+    # conserved. The rigid grid points of the model edges are grid points
+    # with zero coefficients.
+    N=c.size
+    nx=np.size(modell_v)
+    nt=np.size(q)
+    blocks=FD_grid_align(blocks)
+    P=FD_grid_axis(blocks,nx,N)
+    V=FD_grid_axis(blocks,nx,N,0.5)
+    p=np.zeros(P["size"])
+    vx=np.zeros(P["size"])
+
+    # Coefficients at the grid points (zero at the ghost and rigid grid
+    # points): density and l averaged over the cells (arithmetic and
+    # harmonic mean), l_dt divided by the cell size and the velocity weighted
+    # with the relative cell size for the divergence
+    dt_rho=np.zeros(P["size"])
+    l_dt=np.zeros(P["size"])
+    x=V["positions"]
+    rho_V=FD_grid_average(rho,V["lower"],V["upper"])
+    dt_rho[V["index"]]=np.where((x>=BOUNDARY[0]+0.5)&(x<nx-BOUNDARY[1]+0.5),dt/rho_V,0.0)
+    x=P["positions"]
+    l_P=FD_grid_average(FD_grid_halves(rho*modell_v**2,blocks),2*P["lower"],2*P["upper"],1.0,harmonic=True)
+    l_dt[P["index"]]=np.where((x>=BOUNDARY[0])&(x<nx-BOUNDARY[1]),l_P*dt,0.0)
+    l_dt[P["index"]]/=P["volume"]
+    weight=np.zeros(P["size"])
+    weight[V["index"]]=V["volume"]/V["spacing"]
+
+    # Source (distributed) and receivers (interpolated)
+    idx,w_src=FD_grid_source(P["positions"],P["volume"],xscr)
+    src=P["index"][idx]
+    idx,w_rec=FD_grid_interpolation(P["positions"],np.asarray(xrec,float))
+    rec=P["index"][idx]
+    show=P["index"][FD_grid_nearest(P["positions"],np.arange(nx))] if live is not None else None
+
+    ghosts,sources,ghost_weights=P["ghosts"],P["sources"].ravel(),P["weights"]
+    u=np.zeros(P["size"])
+    p_x=[np.zeros(P["size"]) for w in weights]
+    vx_x=[np.zeros(P["size"]) for w in weights]
+    for n in range(2,nt):
+
+        # Inject source wavelet
+        p[src]+=w_src*q[n]
+
+        # Update velocity
+        p[ghosts]=(p[sources].reshape(ghost_weights.shape)*ghost_weights).sum(1)
+        for (a,b),(s,e,f) in zip(V["ranges"],blocks):
+            forward_derivative(p,c/f,p_x[0][a:b],a,b)
+        vx-=dt_rho*sum(w*d for w,d in zip(weights,p_x))
+        p_x.insert(0,p_x.pop())
+
+        # Update pressure (divergence at the grid and ghost points, ghost
+        # values added to the grid points they are interpolated from)
+        np.multiply(vx,weight,out=u)
+        for (a,b),(s,e,f) in zip(P["ranges"],blocks):
+            backward_derivative(u,c,vx_x[0][a-N:b+N],a-N,b+N)
+        vx_x[0]+=np.bincount(sources,(vx_x[0][ghosts][:,None]*ghost_weights).ravel(),P["size"])
+        p-=l_dt*sum(w*d for w,d in zip(weights,vx_x))
+        vx_x.insert(0,vx_x.pop())
+
+        # Save seismograms
+        FD_record(recorder,n,(p[rec]*w_rec).sum(1))
+        if progress is not None:
+            FD_progress_update(progress,n)
+        if live is not None:
+            FD_live_update(live,n,p[show],recorder["Seismogramm"])
+    return(p[show] if live is not None else None)
+
+def _time_steps(vx,p,c,model,weights,method,dx,q,xscr,xrec,a,b,backend,recorder,
+                progress=None,live=None,stop=None,watchdog=None):
+    # Time stepping of the grid points a..b-1 with the coefficients of model
+    # (FD_model_coefficients on these grid points). vx and p have the shape
+    # (grid points,) or (grid points, members) for an ensemble, whose
+    # receivers are recorded member by member.
+    N=c.size
+    k=slice(a,b)
+    shape=p[k].shape
+    dt_rho=model["dt_rho"]
+    l_dt=model["l_dt"]
+
+    # Spatial derivatives of the current and previous time steps
+    p_x=[np.zeros(shape) for w in weights]
+    vx_x=[np.zeros(shape) for w in weights]
+    update=np.zeros(shape)
+
+    # Lax-Wendroff correction with the third spatial derivative
+    if method=="LW":
+        c3=np.array([-3.0,1.0])/dx**3
+        lw_v=model["lw_v"]
+        lw_p=model["lw_p"]
+        p_xxx=np.zeros(shape)
+        vx_xxx=np.zeros(shape)
+
+    # Fused expressions of the derivatives and updates for numexpr
+    if backend=="numexpr":
+        d={"vx_k":vx[k],"p_k":p[k],"dt_rho":dt_rho,"l_dt":l_dt}
+        D_p=stencil_expression(c,[p[a+n:b+n] for n in range(1,N+1)],
+                               [p[a-n+1:b-n+1] for n in range(1,N+1)],"p",d)
+        D_vx=stencil_expression(c,[vx[a+n-1:b+n-1] for n in range(1,N+1)],
+                                [vx[a-n:b-n] for n in range(1,N+1)],"vx",d)
+        if method=="LW":
+            d.update(lw_v=lw_v,lw_p=lw_p)
+            D3_p=stencil_expression(c3,[p[a+n:b+n] for n in (1,2)],[p[a-n+1:b-n+1] for n in (1,2)],"p3",d)
+            D3_vx=stencil_expression(c3,[vx[a+n-1:b+n-1] for n in (1,2)],[vx[a-n:b-n] for n in (1,2)],"vx3",d)
+            update_vx="vx_k-dt_rho*("+D_p+")-lw_v*("+D3_p+")"
+            update_p="p_k-l_dt*("+D_vx+")-lw_p*("+D3_vx+")"
+        elif len(weights)==1:
+            update_vx="vx_k-dt_rho*("+D_p+")"
+            update_p="p_k-l_dt*("+D_vx+")"
+        else:
+            update_vx="vx_k-dt_rho*("+"+".join("%r*h%d"%(w,j) for j,w in enumerate(weights))+")"
+            update_p="p_k-l_dt*("+"+".join("%r*h%d"%(w,j) for j,w in enumerate(weights))+")"
+
+    for n in range(2,q.size):
+
+        # Inject source wavelet
+        p[xscr]+=q[n]
+
+        if backend=="numexpr":
+            if method=="LW" or len(weights)==1:
+                ne.evaluate(update_vx,local_dict=d,out=vx[k])
+                ne.evaluate(update_p,local_dict=d,out=p[k])
+            else:
+                # Adams-Bashforth: derivative into the history, then update
+                ne.evaluate(D_p,local_dict=d,out=p_x[0])
+                d.update(("h%d"%j,h) for j,h in enumerate(p_x))
+                ne.evaluate(update_vx,local_dict=d,out=vx[k])
+                p_x.insert(0,p_x.pop())
+                ne.evaluate(D_vx,local_dict=d,out=vx_x[0])
+                d.update(("h%d"%j,h) for j,h in enumerate(vx_x))
+                ne.evaluate(update_p,local_dict=d,out=p[k])
+                vx_x.insert(0,vx_x.pop())
+        else:
+            # Calculating spatial derivative
+            forward_derivative(p,c,p_x[0],a,b)
+
+            # Update velocity
+            if method=="LW":
+                forward_derivative(p,c3,p_xxx,a,b)
+                np.multiply(dt_rho,p_x[0],out=update)
+                update+=lw_v*p_xxx
+            else:
+                np.multiply(weights[0],p_x[0],out=update)
+                for w,h in zip(weights[1:],p_x[1:]):
+                    update+=w*h
+                update*=dt_rho
+            vx[k]-=update
+
+            # Save old spatial derivations for Adam-Bashforth method
+            p_x.insert(0,p_x.pop())
+
+            # Calculating spatial derivative
+            backward_derivative(vx,c,vx_x[0],a,b)
+
+            # Update pressure
+            if method=="LW":
+                backward_derivative(vx,c3,vx_xxx,a,b)
+                np.multiply(l_dt,vx_x[0],out=update)
+                update+=lw_p*vx_xxx
+            else:
+                np.multiply(weights[0],vx_x[0],out=update)
+                for w,h in zip(weights[1:],vx_x[1:]):
+                    update+=w*h
+                update*=l_dt
+            p[k]-=update
+
+            # Save old spatial derivations for Adam-Bashforth method
+            vx_x.insert(0,vx_x.pop())
+
+        # Save seismograms
+        FD_record(recorder,n,p[xrec].T.ravel())
+        if progress is not None:
+            FD_progress_update(progress,n)
+        if live is not None:
+            FD_live_update(live,n,p,recorder["Seismogramm"])
+        if stop is not None and FD_stop_check(stop,n,(p[k],vx[k]),recorder):
+            break
+        if watchdog is not None and FD_watchdog_check(watchdog,n,p[k]):
+            break
+
+def FD_1D_modelling(modell_v,rho,dx,dt,q,xscr,xrec,spatial_order=4,
+                    temporal_order=2,method="ABS",coeff_spatial=None,backend=None,dt_out=None,
+                    progress=None,live=None,multirate=None,refinement=None,stop=None,watchdog=True):
+    ## Check some conditions
+    if temporal_order not in ABS_WEIGHTS or (method=="LW" and temporal_order!=4):
+        print("Error: FD_1D_modelling")
+        print("Supported are temporal_order=2,3,4 (ABS) and 4 (LW)!")
+        return
+    if multirate and temporal_order!=2:
+        print("Error: FD_1D_modelling")
+        print("Multirate time stepping is supported for temporal_order=2!")
+        return
+    refined=refinement is not None and refinement is not False
+    if refined and (method=="LW" or multirate):
+        print("Error: FD_1D_modelling")
+        print("Grid refinement is supported for the leapfrog and Adams-Bashforth schemes!")
+        return
+    if (refined or multirate) and stop is not None and stop is not False:
+        print("Error: FD_1D_modelling")
+        print("Early termination is not supported with multirate time stepping or grid refinement!")
+        return
+    if coeff_spatial is None:
+        coeff_spatial=coeff(spatial_order)
+        if coeff_spatial is None:
+            return
+
+    ## Preparation
+    c=np.asarray(coeff_spatial,float)/dx
+    N=c.size
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    nx=np.size(modell_v)
+    nt=np.size(q)
+    backend=select_backend(backend,nx)
+    if backend is None:
+        return
+
+    # Updated grid points a..b-1, the rigid boundary does not depend on the
+    # order. Long stencils get additional ghost points (pad) outside the model.
+    pad=max(N-min(BOUNDARY),0)
+    a=BOUNDARY[0]+pad
+    b=nx-BOUNDARY[1]+pad
+    xscr=xscr+pad
+    xrec=np.asarray(xrec,int)+pad
+
+    # Init wavefields
+    vx=np.zeros(nx+2*pad)
+    p=np.zeros(nx+2*pad)
+
+    # Derived coefficients on the updated grid points (with the Lax-Wendroff
+    # coefficients lw_v and lw_p, c9=dt^3/24)
+    c9=dt**3/24.0 if method=="LW" else None
+    model=FD_model_coefficients(modell_v,rho,dt,c9,region=(slice(a-pad,b-pad),))
+    if model is None:
+        return
+    dt_rho=model["dt_rho"]
+    l_dt=model["l_dt"]
+
+    # Weights of the current and previous spatial derivatives
+    weights=ABS_WEIGHTS[2] if method=="LW" else ABS_WEIGHTS[temporal_order]
+
+    # Init Seismograms
+    recorder=FD_recorder(xrec.size,nt,dt,dt_out)
+    if recorder is None:
+        return
+
+    ## Time stepping
+    progress=FD_progress_start(progress,nt,b-a)
+    live=FD_live_start(live,nt,dt,(nx,),None if refined else slice(pad,pad+nx))
+    if refined:
+        blocks=FD_grid_blocks(modell_v) if refinement is True else refinement
+        if blocks is None:
+            return
+        p=_refined_time_steps(modell_v,rho,dt,c,weights,q,xscr-pad,xrec-pad,blocks,recorder,progress,live)
+        FD_progress_finish(progress,nt-1)
+        FD_live_finish(live,nt-1,p,recorder["Seismogramm"])
+        return(recorder["Seismogramm"])
+    if multirate:
+        regions=FD_multirate_regions(modell_v[a-pad:b-pad])
+        if regions is None:
+            return
+        root=FD_multirate_tree(regions,2*N-1)
+        _multirate_time_steps(p,c,dt_rho,l_dt,q,xscr,xrec,a,b,root,recorder,progress,live)
+        FD_progress_finish(progress,nt-1)
+        FD_live_finish(live,nt-1,p,recorder["Seismogramm"])
+        return(recorder["Seismogramm"])
+    stop=FD_stop_start(stop,nt,dt,q,(l_dt,dt_rho),FD_stop_distance((np.arange(a,b),),(xrec,),dx),N*dx)
+    watchdog=FD_watchdog_start(watchdog,dt,dx,q,np.sqrt((l_dt*dt_rho).max())/dt,
+                               (temporal_order,spatial_order,method,coeff_spatial,1),(a-pad,))
+    _time_steps(vx,p,c,model,weights,method,dx,q,xscr,xrec,a,b,backend,recorder,progress,live,stop,watchdog)
+
+    last=nt-1 if stop is None else stop["last"]
+    if watchdog is not None and watchdog["failed"]:
+        last=watchdog["checked"]
+    FD_progress_finish(progress,last)
+    FD_live_finish(live,last,p,recorder["Seismogramm"])
+    if watchdog is not None and watchdog["failed"]:
+        return
+    return(recorder["Seismogramm"])
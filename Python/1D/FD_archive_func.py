@@ -0,0 +1,190 @@
+## FD_archive_func.py compressed archives of seismograms and snapshots
+# GNU General Public License v3.0
+#
+# Stores seismograms (receivers, nt) or wavefield snapshots of any shape in
+# a compressed archive file. The array is split into chunks of rows (along
+# the first axis), which are compressed independently, so a reader only
+# decompresses the chunks of the requested rows.
+#
+# Encodings of the values:
+# max_error=e   quantization to integer multiples of 2*e (the error of
+#               every value is at most e), differences along the last axis
+#               and the smallest integer type, all exactly reversible
+#               (chunks with inf or NaN or values beyond 2**62*2*e, which
+#               do not fit into int64, are stored lossless instead)
+# dtype=float16 or float32, rounding to the lower precision
+# neither       lossless (original dtype)
+# Compression of the chunks: "zlib" (default), "zstd" (if the module
+# zstandard is installed) or None.
+#
+# File layout: magic, offset of the header, compressed chunks, JSON header
+# (shape, dtype, encoding and position of every chunk).
+#
+# Usage:
+# FD_archive_save("Seismograms/run.fda",Seismogramm,max_error=1e-6)
+# archive=FD_archive_open("Seismograms/run.fda")
+# traces=FD_archive_read(archive,slice(10,20)) # Decompresses only these rows
+# Seismogramm=FD_archive_load("Seismograms/run.fda")
+import os
+import json
+import zlib
+import struct
+import numpy as np
+try:
+    import zstandard
+except ImportError:
+    zstandard=None
+
+MAGIC=b"FDARCH01"
+CHUNK_SIZE=2**20 # Uncompressed size of a chunk in bytes
+QUANTIZED_MAX=2.0**62 # Largest quantized value (differences fit into int64)
+
+def _compress(data,compression,level):
+    if compression=="zlib":
+        return(zlib.compress(data,level))
+    if compression=="zstd":
+        return(zstandard.ZstdCompressor(level=level).compress(data))
+    return(data)
+
+def _decompress(data,compression):
+    if compression=="zlib":
+        return(zlib.decompress(data))
+    if compression=="zstd":
+        return(zstandard.ZstdDecompressor().decompress(data))
+    return(data)
+
+def _int_type(values):
+    # Smallest signed integer type of the values
+    lo=int(values.min()) if values.size else 0
+    hi=int(values.max()) if values.size else 0
+    for t in (np.int8,np.int16,np.int32):
+        if np.iinfo(t).min<=lo and hi<=np.iinfo(t).max:
+            return(t)
+    return(np.int64)
+
+def _encode(chunk,header):
+    # Values of a chunk as bytes, the dtype of the stored values and the
+    # encoding of the chunk
+    if header["encoding"]=="quantized":
+        scaled=chunk/header["step"]
+        if np.all(np.isfinite(scaled)) and (scaled.size==0 or np.abs(scaled).max()<=QUANTIZED_MAX):
+            quantized=np.rint(scaled).astype(np.int64)
+            quantized[...,1:]=np.diff(quantized,axis=-1)
+            stored=quantized.astype(_int_type(quantized))
+            return(np.ascontiguousarray(stored).tobytes(),stored.dtype.str,"quantized")
+        # Not representable with the step, lossless
+        stored=chunk
+    else:
+        stored=chunk.astype(header["stored_dtype"])
+    return(np.ascontiguousarray(stored).tobytes(),stored.dtype.str,"cast")
+
+def _decode(data,dtype,shape,header,encoding):
+    stored=np.frombuffer(data,dtype).reshape(shape)
+    if encoding=="quantized":
+        values=np.cumsum(stored,axis=-1,dtype=np.int64)*header["step"]
+    else:
+        values=stored
+    return(values.astype(header["dtype"]))
+
+def FD_archive_save(filename,data,max_error=None,dtype=None,compression="zlib",
+                    level=6,chunk_size=CHUNK_SIZE):
+    ## Check some conditions
+    if max_error is not None and dtype is not None:
+        print("Error: FD_archive_save")
+        print("Choose either max_error or dtype!")
+        return
+    if max_error is not None and max_error<=0:
+        print("Error: FD_archive_save")
+        print("max_error has to be positive!")
+        return
+    if compression not in ("zlib","zstd",None):
+        print("Error: FD_archive_save")
+        print("Compression has to be zlib, zstd or None!")
+        return
+    if compression=="zstd" and zstandard is None:
+        print("Error: FD_archive_save")
+        print("zstandard is not installed!")
+        return
+
+    ## Header
+    data=np.asarray(data)
+    rows=data.reshape(1,-1) if data.ndim<2 else data
+    header={"shape":list(data.shape),"dtype":data.dtype.str,"compression":compression,"chunks":[]}
+    if max_error is not None:
+        header["encoding"]="quantized"
+        # Rounding to multiples of step changes every value by at most step/2
+        header["step"]=2.0*max_error*(1.0-1e-9)
+    else:
+        header["encoding"]="cast"
+        header["stored_dtype"]=np.dtype(dtype if dtype is not None else data.dtype).str
+    row_size=max(rows[0].nbytes,1) if rows.shape[0] else 1
+    n_rows=max(int(chunk_size//row_size),1)
+
+    ## Write the chunks, then the header
+    with open(filename+".tmp","wb") as f:
+        f.write(MAGIC+struct.pack("<Q",0))
+        for r0 in range(0,rows.shape[0],n_rows):
+            chunk=rows[r0:r0+n_rows]
+            raw,stored_dtype,encoding=_encode(chunk,header)
+            blob=_compress(raw,compression,level)
+            header["chunks"].append({"rows":[r0,r0+chunk.shape[0]],"offset":f.tell(),
+                                     "size":len(blob),"dtype":stored_dtype,"encoding":encoding})
+            f.write(blob)
+        offset=f.tell()
+        f.write(json.dumps(header).encode())
+        f.seek(len(MAGIC))
+        f.write(struct.pack("<Q",offset))
+    os.replace(filename+".tmp",filename)
+    return(header)
+
+def FD_archive_open(filename):
+    # Reads the header only, the chunks are read by FD_archive_read
+    with open(filename,"rb") as f:
+        if f.read(len(MAGIC))!=MAGIC:
+            print("Error: FD_archive_open")
+            print("Not an archive of FD_archive_save!")
+            return
+        offset,=struct.unpack("<Q",f.read(8))
+        f.seek(offset)
+        header=json.loads(f.read().decode())
+    header["filename"]=filename
+    return(header)
+
+def _row_shape(shape):
+    # Shape of a row, arrays with less than two dimensions are one row
+    return(list(shape[1:]) if len(shape)>=2 else [int(np.prod(shape))])
+
+def _read_rows(archive,r0,r1):
+    # Decompress the chunks which overlap the rows r0..r1-1
+    row_shape=_row_shape(archive["shape"])
+    parts=[np.zeros([0]+row_shape,archive["dtype"])]
+    with open(archive["filename"],"rb") as f:
+        for c in archive["chunks"]:
+            c0,c1=c["rows"]
+            if c1<=r0 or c0>=r1:
+                continue
+            f.seek(c["offset"])
+            data=_decompress(f.read(c["size"]),archive["compression"])
+            chunk=_decode(data,c["dtype"],[c1-c0]+row_shape,archive,c.get("encoding",archive["encoding"]))
+            parts.append(chunk[max(r0-c0,0):min(r1,c1)-c0])
+    return(np.concatenate(parts))
+
+def FD_archive_read(archive,rows=None):
+    # Rows (index, slice, list or None for all) along the first axis of the
+    # archived array, only the chunks of these rows are decompressed
+    shape=archive["shape"]
+    if len(shape)<2:
+        values=_read_rows(archive,0,1)[0].reshape(shape)
+        return(values if rows is None else values[rows])
+    index=np.arange(shape[0])[slice(None) if rows is None else rows]
+    if index.size==0:
+        return(np.zeros(index.shape+tuple(shape[1:]),archive["dtype"]))
+    r0=int(index.min())
+    return(_read_rows(archive,r0,int(index.max())+1)[index-r0])
+
+def FD_archive_load(filename):
+    # The complete array of an archive
+    archive=FD_archive_open(filename)
+    if archive is None:
+        return
+    return(FD_archive_read(archive))
@@ -0,0 +1,156 @@
+## FD_cache_func.py content-addressed cache for seismograms
+# GNU General Public License v3.0
+#
+# Cache the seismograms of a modelling function, e.g. FD_1D_modelling.
+# Every run is keyed on a hash of the function name and all arguments
+# (model arrays, source signal, source and receiver positions, scheme and
+# discretization). Arguments which are file names (e.g. .npy models, see
+# FD_model_func) are hashed with the file content, so a changed model file
+# gives a new key. Arguments which do not change the seismograms (progress
+# display, live plot, watchdog, callbacks) are not part of the key. The
+# seismograms are stored as Seismograms/<key>.npy
+# together with the metadata of the run in Seismograms/<key>.json.
+# A repeated run returns the stored seismograms without time stepping.
+#
+# The cache is bounded in size: if the stored seismograms exceed max_size
+# bytes, the least recently used entries are removed.
+#
+# Usage:
+# Seismogramm=FD_cached(FD_1D_modelling,modell_v,rho,dx,dt,q,xscr,xrec,
+#                       spatial_order=8,temporal_order=4)
+import os
+import json
+import time
+import hashlib
+import inspect
+import numpy as np
+
+CACHE_DIR="Seismograms"
+MAX_SIZE=2**30 # Maximum size of the cache in bytes
+# Arguments without influence on the seismograms
+RUNTIME_ARGUMENTS=("progress","live","watchdog","callback")
+
+def _update(h,value):
+    # Feed a value into the hash, arrays by dtype, shape and content
+    if isinstance(value,np.ndarray):
+        h.update(str((value.dtype.str,value.shape)).encode())
+        h.update(np.ascontiguousarray(value).data)
+    elif isinstance(value,(list,tuple)):
+        h.update(str(type(value).__name__).encode())
+        for v in value:
+            _update(h,v)
+    elif isinstance(value,np.generic):
+        h.update(repr(value.item()).encode())
+    elif isinstance(value,str) and os.path.isfile(value):
+        # File name and content
+        h.update(repr(value).encode())
+        with open(value,"rb") as f:
+            for block in iter(lambda: f.read(2**20),b""):
+                h.update(block)
+    else:
+        h.update(repr(value).encode())
+    h.update(b"|")
+
+def _describe(value):
+    # JSON compatible description of an argument for the metadata
+    if isinstance(value,np.ndarray):
+        return({"shape":list(value.shape),"dtype":value.dtype.str,
+                "min":float(np.min(value)) if value.size else None,
+                "max":float(np.max(value)) if value.size else None})
+    if isinstance(value,np.generic):
+        return(value.item())
+    if isinstance(value,(list,tuple)):
+        return([_describe(v) for v in value])
+    if isinstance(value,(int,float,str,bool)) or value is None:
+        return(value)
+    return(repr(value))
+
+def _arguments(func,args,kwargs):
+    # All arguments by name including defaults, so that equal runs get equal keys
+    try:
+        bound=inspect.signature(func).bind(*args,**kwargs)
+    except (TypeError,ValueError):
+        arguments=dict(("arg%d"%n,a) for n,a in enumerate(args))
+        arguments.update(kwargs)
+        return(arguments)
+    bound.apply_defaults()
+    return(dict(bound.arguments))
+
+def FD_cache_key(func,*args,**kwargs):
+    # Hash of the function name and all arguments
+    h=hashlib.sha256()
+    _update(h,getattr(func,"__name__",str(func)))
+    arguments=_arguments(func,args,kwargs)
+    for name in sorted(arguments):
+        if name in RUNTIME_ARGUMENTS:
+            continue
+        _update(h,name)
+        _update(h,arguments[name])
+    return(h.hexdigest())
+
+def FD_cache_load(key,cache_dir=CACHE_DIR):
+    # Returns (seismograms, metadata) of a cached run or None
+    filename=os.path.join(cache_dir,key)
+    try:
+        Seismogramm=np.load(filename+".npy")
+        with open(filename+".json") as f:
+            meta=json.load(f)
+    except (OSError,ValueError):
+        return(None)
+    # Mark as recently used
+    os.utime(filename+".npy")
+    return(Seismogramm,meta)
+
+def FD_cache_store(key,Seismogramm,meta,cache_dir=CACHE_DIR,max_size=MAX_SIZE):
+    os.makedirs(cache_dir,exist_ok=True)
+    filename=os.path.join(cache_dir,key)
+    # Write to temporary files first, so parallel runs never see partial files
+    tmp=filename+".%d.tmp"%os.getpid()
+    with open(tmp,"wb") as f:
+        np.save(f,Seismogramm)
+    os.replace(tmp,filename+".npy")
+    with open(tmp,"w") as f:
+        json.dump(meta,f,indent=1)
+    os.replace(tmp,filename+".json")
+    FD_cache_evict(cache_dir,max_size)
+
+def FD_cache_evict(cache_dir=CACHE_DIR,max_size=MAX_SIZE):
+    # Remove least recently used entries until the cache fits into max_size
+    entries=[]
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        filename=os.path.join(cache_dir,name[:-5])
+        try:
+            stat=os.stat(filename+".npy")
+        except OSError:
+            continue
+        entries.append((stat.st_mtime,stat.st_size,filename))
+    entries.sort()
+    size=sum(e[1] for e in entries)
+    for mtime,nbytes,filename in entries:
+        if size<=max_size:
+            break
+        for ext in (".npy",".json"):
+            try:
+                os.remove(filename+ext)
+            except OSError:
+                pass
+        size-=nbytes
+
+def FD_cached(func,*args,cache_dir=CACHE_DIR,max_size=MAX_SIZE,**kwargs):
+    # Run func(*args,**kwargs) or return its cached seismograms
+    key=FD_cache_key(func,*args,**kwargs)
+    cached=FD_cache_load(key,cache_dir)
+    if cached is not None:
+        return(cached[0])
+    start=time.perf_counter()
+    Seismogramm=func(*args,**kwargs)
+    runtime=time.perf_counter()-start
+    if Seismogramm is None:
+        return(Seismogramm)
+    meta={"key":key,"function":getattr(func,"__name__",str(func)),
+          "arguments":{name:_describe(a) for name,a in _arguments(func,args,kwargs).items()},
+          "runtime":runtime,"created":time.time()}
+    FD_cache_store(key,Seismogramm,meta,cache_dir,max_size)
+    return(Seismogramm)
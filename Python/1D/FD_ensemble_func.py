@@ -0,0 +1,102 @@
+## FD_ensemble_func.py 1-D modelling of model ensembles in one vectorized pass
+# GNU General Public License v3.0
+#
+# For uncertainty studies, the same 1-D acquisition is modelled for many
+# perturbed velocity and density models. FD_1D_ensemble stacks the models
+# and advances all members in one time loop: the wavefields and the
+# coefficients dt/rho and l*dt of all members are arrays (nx, number of
+# models), every derivative and update is one operation over the whole
+# ensemble (the time stepping of FD_1D_modelling with the members as second
+# axis: generated kernels along the first axis, see FD_kernel_func, or
+# fused numexpr expressions, see FD_numexpr_func). All members use
+# the same time step dt, which has to be stable for the highest velocity of
+# the ensemble (FD_ensemble_dt). Each member gives the same seismograms as
+# FD_1D_modelling with this dt.
+#
+# modell_v has the shape (number of models, nx), rho the same shape or
+# (nx,) for a common density model, both can also be file names of .npy
+# files (see FD_model_func).
+#
+# Usage:
+# dt=FD_ensemble_dt(modell_v,dx,c2)          # dt=dx/cmax*c2 of the ensemble
+# Seismograms=FD_1D_ensemble(modell_v,rho,dx,dt,q,xscr,[xrec1,xrec2,xrec3])
+# Seismogramm=Seismograms[i]                 # (number of receivers, nt) of the model i
+import numpy as np
+from FD_taylor_coeff_func import coeff
+from FD_numexpr_func import select_backend
+from FD_recorder_func import FD_recorder
+from FD_progress_func import FD_progress_start, FD_progress_finish
+from FD_model_func import FD_model_load, FD_model_range, FD_model_coefficients
+from FD_1D_modelling_func import ABS_WEIGHTS, BOUNDARY, _time_steps
+
+def FD_ensemble_dt(modell_v,dx,c2):
+    # Common time step of all members for the CFL-number c2 of the highest
+    # velocity of the ensemble
+    cmin,cmax=FD_model_range(modell_v)
+    return(dx/cmax*c2)
+
+def FD_1D_ensemble(modell_v,rho,dx,dt,q,xscr,xrec,spatial_order=4,
+                   temporal_order=2,method="ABS",coeff_spatial=None,backend=None,dt_out=None,progress=None):
+    # Seismograms (number of models, number of receivers, nt) of all members
+    ## Check some conditions
+    if temporal_order not in ABS_WEIGHTS or (method=="LW" and temporal_order!=4):
+        print("Error: FD_1D_ensemble")
+        print("Supported are temporal_order=2,3,4 (ABS) and 4 (LW)!")
+        return
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    if np.ndim(modell_v)!=2:
+        print("Error: FD_1D_ensemble")
+        print("modell_v needs the shape (number of models, nx)!")
+        return
+    if np.shape(rho)==np.shape(modell_v)[1:]:
+        rho=np.broadcast_to(rho,np.shape(modell_v))
+    if np.shape(rho)!=np.shape(modell_v):
+        print("Error: FD_1D_ensemble")
+        print("rho needs the shape (number of models, nx) or (nx,)!")
+        return
+    if coeff_spatial is None:
+        coeff_spatial=coeff(spatial_order)
+        if coeff_spatial is None:
+            return
+
+    ## Preparation
+    c=np.asarray(coeff_spatial,float)/dx
+    N=c.size
+    n_models,nx=np.shape(modell_v)
+    nt=np.size(q)
+    backend=select_backend(backend,n_models*nx)
+    if backend is None:
+        return
+
+    # Updated grid points a..b-1 of every member (as in FD_1D_modelling)
+    pad=max(N-min(BOUNDARY),0)
+    a=BOUNDARY[0]+pad
+    b=nx-BOUNDARY[1]+pad
+    xscr=xscr+pad
+    xrec=np.asarray(xrec,int)+pad
+
+    # Init wavefields
+    vx=np.zeros((nx+2*pad,n_models))
+    p=np.zeros((nx+2*pad,n_models))
+
+    # Coefficients of all members on the updated grid points
+    c9=dt**3/24.0 if method=="LW" else None
+    model=FD_model_coefficients(modell_v,rho,dt,c9,region=(slice(None),slice(a-pad,b-pad)))
+    if model is None:
+        return
+    model={name:np.ascontiguousarray(f.T) for name,f in model.items()}
+
+    # Weights of the current and previous spatial derivatives
+    weights=ABS_WEIGHTS[2] if method=="LW" else ABS_WEIGHTS[temporal_order]
+
+    # Init Seismograms (receivers of all members in one recorder)
+    recorder=FD_recorder(n_models*xrec.size,nt,dt,dt_out)
+    if recorder is None:
+        return
+
+    ## Time stepping
+    progress=FD_progress_start(progress,nt,n_models*(b-a))
+    _time_steps(vx,p,c,model,weights,method,dx,q,xscr,xrec,a,b,backend,recorder,progress)
+    FD_progress_finish(progress,nt-1)
+    return(recorder["Seismogramm"].reshape(n_models,xrec.size,-1))
@@ -0,0 +1,66 @@
+## FD_gather_func.py shot gathers of many sources with source-receiver reciprocity
+# GNU General Public License v3.0
+#
+# A survey with many sources and few receivers (e.g. receivers in a
+# borehole) needs one run of the modelling per source. The acoustic system
+# is reciprocal: the pressure at xrec of the pressure source (as in
+# FD_1D_modelling, FD_2D_modelling and FD_3D_modelling) at xscr equals the
+# pressure at xscr of the same source at xrec, times l(xrec)/l(xscr) with
+# l=rho*v^2. This holds for the discrete schemes to rounding errors (also
+# with tiling and with grid refinement, if the medium is constant in the
+# cells around the sources and receivers; Lax-Wendroff to about 1e-3),
+# but not for the multirate time stepping. FD_gather runs the modelling
+# once per source or once per receiver, whichever are fewer (mode="auto",
+# always per source with multirate=True), and returns the same gathers in
+# both cases.
+#
+# Sources and receivers are given in grid points in the order of the
+# modelling function: positions in 1-D, (x, y) in 2-D and (x, y, z) in 3-D.
+#
+# Usage:
+# Gathers=FD_gather(FD_1D_modelling,modell_v,rho,dx,dt,q,xscr,xrec)
+# Gathers=FD_gather(FD_2D_modelling,modell_v,rho,dx,dt,q,(xscr,yscr),(xrec,yrec),spatial_order=8)
+# Seismogramm=Gathers[i]                     # Seismograms of the source i
+import numpy as np
+from FD_model_func import FD_model_load
+
+def _coordinates(positions,ndim):
+    # Positions as array (ndim, number of positions), rows x, y, z
+    return(np.asarray(positions,int).reshape(ndim,-1))
+
+def _lambda(modell_v,rho,coordinates):
+    # l=rho*v^2 of the model at the positions (model axes z, y, x)
+    index=tuple(coordinates[::-1])
+    v=np.asarray(modell_v[index],float)
+    return(np.asarray(rho[index],float)*v**2)
+
+def FD_gather(func,modell_v,rho,dx,dt,q,sources,receivers,mode="auto",**kwargs):
+    # Gathers (sources, receivers, samples) of func for all sources, with
+    # one run per source (mode="shots"), per receiver (mode="reciprocal")
+    # or per source or receiver, whichever are fewer (mode="auto")
+    # Models (memory maps of .npy files) are opened once for all runs
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    ndim=modell_v.ndim
+    src=_coordinates(sources,ndim)
+    rec=_coordinates(receivers,ndim)
+    if mode=="auto":
+        mode="shots" if src.shape[1]<=rec.shape[1] or kwargs.get("multirate") else "reciprocal"
+    if mode not in ("shots","reciprocal"):
+        print("Error: FD_gather")
+        print("mode must be auto, shots or reciprocal!")
+        return
+    if mode=="reciprocal":
+        src,rec=rec,src
+    gathers=[]
+    for i in range(src.shape[1]):
+        S=func(modell_v,rho,dx,dt,q,*[int(x) for x in src[:,i]],*[list(x) for x in rec],**kwargs)
+        if S is None:
+            return
+        gathers.append(S)
+    gathers=np.array(gathers)
+    if mode=="reciprocal":
+        # Runs per receiver (receivers, sources, samples) to gathers per source
+        scale=_lambda(modell_v,rho,src)[:,None]/_lambda(modell_v,rho,rec)[None,:]
+        gathers=np.transpose(gathers*scale[:,:,None],(1,0,2))
+    return(gathers)
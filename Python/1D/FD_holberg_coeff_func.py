@@ -0,0 +1,69 @@
+## FD_holberg_coeff_func.py calculate dispersion-optimized FD coefficients
+# GNU General Public License v3.0
+#
+# Calculate staggered-grid FD coefficients that minimize the numerical
+# phase-velocity error up to a chosen fraction of the Nyquist wavenumber
+# (Holberg-style optimization), instead of maximizing the Taylor order.
+#
+# The spatial phase-velocity ratio of the staggered first derivative is
+# c_fd/c = 2/(k*DH) * sum_n coeff(n)*sin((2n-1)*k*DH/2)
+# The coefficients minimize max|c_fd/c-1| for 0 < k*DH <= fraction*pi
+# (minimax fit by iteratively reweighted least squares, Lawson's algorithm).
+# The fit is constrained to sum_n (2n-1)*coeff(n)=1, so the stencil is a
+# consistent first derivative (c_fd/c -> 1 for k*DH -> 0).
+#
+# Usage:
+# The result has the same layout as coeff(order) from FD_taylor_coeff_func
+# and can be passed as coeff_spatial to every modelling function:
+# p_x = 1/DH * ( coeff(1) * (p(x+1)-p(x)) + coeff(2) * (p(x+2)-p(x-1)) )
+# A fraction of Nyquist corresponds to c1=2/fraction grid points per
+# minimum wavelength, e.g. fraction=0.4 is accurate down to c1=5.
+#
+# Theory:
+# Holberg, O. (1987). Computational aspects of the choice of operator and
+# sampling interval for numerical differentiation in large-scale simulation
+# of wave phenomena. Geophysical Prospecting, 35(6), 629-655.
+import numpy as np
+
+def holberg_coeff(order,fraction=0.5,iterations=200,nk=512):
+    ## Check some conditions
+    if int(order)%2!=0 or order<4:
+        print("Error: holberg_coeff")
+        print("Order has to be an integer multiple of 2 and at least 4!")
+        return
+    if fraction<=0 or fraction>1:
+        print("Error: holberg_coeff")
+        print("Fraction of Nyquist has to be in (0,1]!")
+        return
+    ## Calculation
+    N=int(order/2)
+    kh=np.linspace(fraction*np.pi/nk,fraction*np.pi,nk)
+    n=2*np.arange(1,N+1)-1
+    # Design matrix: A[i,n]=2/kh_i*sin((2n-1)*kh_i/2), target: c_fd/c=1
+    A=2.0/kh[:,None]*np.sin(np.outer(kh,n)/2.0)
+    # Consistency: coeff(1)=1-sum_n>1 (2n-1)*coeff(n), free are coeff(2..N)
+    Z=np.eye(N)[:,1:]
+    Z[0,:]=-n[1:]
+    c0=np.eye(N)[0]
+    AZ=A.dot(Z)
+    b=np.ones(nk)-A.dot(c0)
+    w=np.ones(nk)/nk
+    for it in range(iterations):
+        sw=np.sqrt(w)
+        d=np.linalg.lstsq(AZ*sw[:,None],b*sw,rcond=None)[0]
+        c=c0+Z.dot(d)
+        err=np.abs(AZ.dot(d)-b)
+        # Lawson update: shift weight towards the largest errors
+        w=w*err
+        if np.sum(w)==0:
+            break
+        w=w/np.sum(w)
+    return(c)
+
+def phase_error(coeff_spatial,fraction=1.0,nk=512):
+    # Maximum relative phase-velocity error |c_fd/c-1| up to fraction*Nyquist
+    coeff_spatial=np.asarray(coeff_spatial,float)
+    kh=np.linspace(fraction*np.pi/nk,fraction*np.pi,nk)
+    n=2*np.arange(1,coeff_spatial.size+1)-1
+    ratio=2.0/kh*np.sin(np.outer(kh,n)/2.0).dot(coeff_spatial)
+    return(np.max(np.abs(ratio-1.0)))
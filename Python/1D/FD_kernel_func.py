@@ -0,0 +1,113 @@
+## FD_kernel_func.py generated staggered derivative kernels
+# GNU General Public License v3.0
+#
+# Generates the forward and backward staggered first derivatives
+# forward:  out=sum_n c(n)*(f[k+n]-f[k-n+1])
+# backward: out=sum_n c(n)*(f[k+n-1]-f[k-n])
+# along one axis of 1-D, 2-D or 3-D arrays for the coefficients c (e.g.
+# coeff(order)/dx, Holberg coefficients or the third derivative of the
+# Lax-Wendroff schemes) as specialized Python functions: the stencil is
+# unrolled with the coefficients as constants, and every term is evaluated
+# in place into out and a working array, so a call allocates no
+# temporaries (the working array is reused per thread and shape, or given
+# as tmp). The halo of a kernel is the number of grid points it reads
+# before and after the updated grid points k: (N-1,N) forward and (N,N-1)
+# backward for N coefficients.
+#
+# The kernels are cached in memory and always compiled from the generated
+# source code. If KERNEL_DIR is set (e.g. to a directory in the user cache),
+# the source code is also written there for inspection (one file per
+# coefficients, dimension, axis and direction); the files are never read
+# back. The modelling functions use the kernels for all spatial
+# derivatives.
+#
+# Usage:
+# kernel=FD_kernel(coeff(8)/dx,ndim=2,axis=1,forward=True)
+# kernel(p,D_x,(ky,kx))                       # D_x=dp/dx on the grid points ky,kx
+# print(FD_kernel_halo(coeff(8),True))        # (3, 4)
+# print(FD_kernel_source(coeff(4)/dx,1,0,False))
+import os
+import hashlib
+import threading
+import numpy as np
+
+# Directory for the generated source code (None: not written)
+KERNEL_DIR=None
+# Version of the generated code, part of the file names on disk
+KERNEL_VERSION=1
+
+_kernels={}
+_buffers=threading.local()
+
+def _buffer(out):
+    # Working array of the calling thread with the shape and dtype of out
+    if not hasattr(_buffers,"arrays"):
+        _buffers.arrays={}
+    key=(out.shape,out.dtype.str)
+    if key not in _buffers.arrays:
+        _buffers.arrays[key]=np.empty(out.shape,out.dtype)
+    return(_buffers.arrays[key])
+
+def FD_kernel_halo(c,forward=True):
+    # Grid points read before and after the updated grid points
+    N=np.size(c)
+    return((N-1,N) if forward else (N,N-1))
+
+def FD_kernel_source(c,ndim=1,axis=0,forward=True):
+    # Source code of the kernel (f,out,k,tmp=None) for the coefficients c
+    c=np.asarray(c,float).ravel()
+    s=0 if forward else -1
+    index=["k[%d]"%j for j in range(ndim)]
+
+    def view(n):
+        # f shifted by n along axis
+        i=list(index)
+        i[axis]="a%+d:b%+d"%(n,n) if n else "a:b"
+        return("f["+",".join(i)+"]")
+
+    lines=["def kernel(f,out,k,tmp=None):",
+           "    # %s derivative along axis %d of %d-D arrays (N=%d)"
+           %("Forward" if forward else "Backward",axis,ndim,c.size),
+           "    a,b=k[%d].start,k[%d].stop"%(axis,axis)]
+    if c.size>1:
+        lines+=["    if tmp is None:","        tmp=_buffer(out)"]
+    lines+=["    np.subtract(%s,%s,out=out)"%(view(1+s),view(s)),
+            "    out*=%r"%float(c[0])]
+    for n in range(2,c.size+1):
+        lines+=["    np.subtract(%s,%s,out=tmp)"%(view(n+s),view(1-n+s)),
+                "    tmp*=%r"%float(c[n-1]),
+                "    out+=tmp"]
+    lines.append("    return(out)")
+    return("\n".join(lines)+"\n")
+
+def _compile(source):
+    # Kernel function of the source code
+    namespace={"np":np,"_buffer":_buffer}
+    exec(compile(source,"<FD_kernel>","exec"),namespace)
+    return(namespace["kernel"])
+
+def FD_kernel(c,ndim=1,axis=0,forward=True):
+    # Cached kernel (f,out,k,tmp=None) of the forward or backward derivative
+    # with the coefficients c along axis of ndim-D arrays on the grid points
+    # k (tuple of slices), out has the shape of f[k]
+    key=(np.asarray(c,float).tobytes(),ndim,axis,forward)
+    kernel=_kernels.get(key)
+    if kernel is not None:
+        return(kernel)
+    source=FD_kernel_source(c,ndim,axis,forward)
+    if KERNEL_DIR is not None:
+        name=hashlib.sha256(repr((KERNEL_VERSION,)+key).encode()).hexdigest()[:16]
+        filename=os.path.join(KERNEL_DIR,"FD_kernel_"+name+".py")
+        if not os.path.exists(filename):
+            # Write to a temporary file first (other processes may write the file)
+            try:
+                os.makedirs(KERNEL_DIR,exist_ok=True)
+                tmp=filename+".%d.tmp"%os.getpid()
+                with open(tmp,"w") as f:
+                    f.write(source)
+                os.replace(tmp,filename)
+            except OSError:
+                pass
+    kernel=_compile(source)
+    _kernels[key]=kernel
+    return(kernel)
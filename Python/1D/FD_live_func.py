@@ -0,0 +1,155 @@
+## FD_live_func.py throttled live view of the time stepping
+# GNU General Public License v3.0
+#
+# Shows the pressure wavefield (curve in 1-D, image in 2-D) and the
+# seismograms during the time stepping of the modelling functions. A new
+# frame is drawn at most fps times per second of wall-clock time, and
+# less often if drawing would take more than max_fraction of the runtime.
+# The clock is only read every few time steps (as in FD_progress_func).
+#
+# Frames use blitting: the static parts of the figure (axes, labels,
+# colorbar) are drawn once, and per frame only the reused image or curve
+# of the wavefield, the seismogram curves and the time label are redrawn.
+# The seismograms are reduced to the minimum and maximum per pixel column,
+# so the cost of a frame does not depend on the number of time steps.
+# Wavefield and seismograms are normalized by their running maximum, the
+# wavefield colors are clipped at clip times the maximum.
+#
+# In Jupyter notebooks, an interactive backend (e.g. %matplotlib widget) is
+# needed for live updates.
+#
+# Usage:
+# Seismogramm=FD_2D_modelling(...,live=True)   # 10 frames per second
+# Seismogramm=FD_2D_modelling(...,live=FD_live(fps=5,clip=0.3))
+import time
+import numpy as np
+
+def FD_live(fps=10.0,max_fraction=0.05,clip=1.0):
+    # Settings of the live view: frames per second, maximum share of the
+    # runtime for drawing and color clipping of the wavefield
+    return({"fps":float(fps),"max_fraction":float(max_fraction),"clip":float(clip)})
+
+def FD_live_start(live,nt,dt,shape,region=None):
+    # State of the live view for nt time steps of dt and a wavefield of
+    # shape (the model part region of the computed wavefield), live is None
+    # (no live view), True, a frame rate or from FD_live
+    if live is None or live is False:
+        return
+    if not isinstance(live,dict):
+        live=FD_live(10.0 if live is True else live)
+    import matplotlib.pyplot as plt
+    state=dict(live)
+    state.update(nt=nt,dt=dt,region=region,interval=1.0/state["fps"],last=None,
+                 countdown=1,check_every=1,n=1,frames=0,draw_time=0.0,start=time.perf_counter(),
+                 v_max=0.0,s_max=0.0,plt=plt,figure=None,shape=shape)
+    return(state)
+
+def _setup(state,nrec):
+    # Figure with the static parts, drawn once as background of the frames
+    plt=state["plt"]
+    fig,(ax1,ax2)=plt.subplots(1,2,figsize=(11,4.5))
+    shape=state["shape"]
+    if len(shape)==1:
+        state["wavefield"],=ax1.plot(np.arange(shape[0]),np.zeros(shape[0]),animated=True)
+        ax1.set_xlim(0,shape[0]-1)
+        ax1.set_ylim(-1.05,1.05)
+        ax1.set_xlabel('Grid-points in X')
+        ax1.set_ylabel('Normalized pressure')
+    else:
+        state["wavefield"]=ax1.imshow(np.zeros(shape),vmin=-state["clip"],vmax=state["clip"],
+                                      animated=True)
+        ax1.set_xlabel('Grid-points in X')
+        ax1.set_ylabel('Grid-points in Y')
+        fig.colorbar(state["wavefield"],ax=ax1)
+    ax1.set_title('P-Wavefield')
+    state["label"]=ax1.text(0.02,0.95,"",transform=ax1.transAxes,animated=True)
+    state["traces"]=[ax2.plot([],[],animated=True)[0] for r in range(nrec)]
+    ax2.set_xlim(0,state["nt"]*state["dt"])
+    ax2.set_ylim(-1,2*max(nrec,1)-1)
+    ax2.set_yticks(2*np.arange(nrec))
+    ax2.set_yticklabels([str(r+1) for r in range(nrec)])
+    ax2.set_title('Seismograms (normalized)')
+    ax2.set_xlabel('Time in s')
+    ax2.set_ylabel('Receiver')
+    state.update(figure=fig,axes=(ax1,ax2))
+    plt.show(block=False)
+    fig.canvas.draw()
+    state["background"]=fig.canvas.copy_from_bbox(fig.bbox)
+
+def _minmax(trace,bins):
+    # Minimum and maximum of trace per bin as alternating curve points
+    edges=np.linspace(0,trace.size,bins+1).astype(int)[:-1]
+    edges=np.unique(edges)
+    lo=np.minimum.reduceat(trace,edges)
+    hi=np.maximum.reduceat(trace,edges)
+    return(np.repeat(edges,2),np.column_stack((lo,hi)).ravel())
+
+def _draw(state,n,p,Seismogramm):
+    fig=state["figure"]
+    ax1,ax2=state["axes"]
+    canvas=fig.canvas
+    canvas.restore_region(state["background"])
+
+    # Wavefield, normalized by the running maximum
+    w=p if state["region"] is None else p[state["region"]]
+    state["v_max"]=max(state["v_max"],float(np.abs(w).max()))
+    scale=1.0/state["v_max"] if state["v_max"]>0 else 1.0
+    if w.ndim==1:
+        state["wavefield"].set_ydata(w*scale)
+    else:
+        state["wavefield"].set_data(w*scale)
+    state["label"].set_text("t = %.3f s"%(n*state["dt"]))
+
+    # Seismograms up to the current time, min/max per pixel column
+    samples=min(Seismogramm.shape[1],int(np.ceil((n+1)*Seismogramm.shape[1]/state["nt"])))
+    if samples>0:
+        S=Seismogramm[:,:samples]
+        state["s_max"]=max(state["s_max"],float(np.abs(S).max()))
+        s_scale=1.0/state["s_max"] if state["s_max"]>0 else 1.0
+        dt_trace=state["nt"]*state["dt"]/Seismogramm.shape[1]
+        bins=max(min(samples,int(ax2.bbox.width)),1)
+        for r,line in enumerate(state["traces"]):
+            i,values=_minmax(S[r],bins)
+            line.set_data(i*dt_trace,values*s_scale+2*r)
+    for artist in [state["wavefield"],state["label"]]+state["traces"]:
+        artist.axes.draw_artist(artist)
+    canvas.blit(fig.bbox)
+    canvas.flush_events()
+    state["frames"]+=1
+
+def FD_live_update(state,n,p,Seismogramm):
+    # Called after time step n with the pressure wavefield p and the
+    # seismograms, draws a frame if one is due
+    state["countdown"]-=n-state["n"]
+    state["n"]=n
+    if state["countdown"]>0:
+        return
+    now=time.perf_counter()
+    if state["figure"] is None:
+        # The figure is created with the first frame (not counted as drawing time)
+        _setup(state,Seismogramm.shape[0])
+        state["start"]+=time.perf_counter()-now
+        now=time.perf_counter()
+    if state["last"] is None or now-state["last"]>=state["interval"]:
+        _draw(state,n,p,Seismogramm)
+        done=time.perf_counter()
+        state["draw_time"]+=done-now
+        # Limit the share of the drawing on the runtime
+        state["interval"]=max(1.0/state["fps"],(done-now)/state["max_fraction"])
+        state["last"]=done
+        now=done
+    # Check the clock about ten times per frame interval
+    rate=n/(now-state["start"]) if now>state["start"] else 0.0
+    state["check_every"]=max(1,int(0.1*state["interval"]*rate))
+    state["countdown"]=state["check_every"]
+
+def FD_live_finish(state,n,p,Seismogramm):
+    # Last frame after the time stepping
+    if state is None:
+        return
+    if state["figure"] is None:
+        _setup(state,Seismogramm.shape[0])
+    _draw(state,n,p,Seismogramm)
+    runtime=time.perf_counter()-state["start"]
+    if runtime>0:
+        print("Live view: %d frames, %.1f %% of the runtime"%(state["frames"],100*state["draw_time"]/runtime))
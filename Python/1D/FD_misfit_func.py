@@ -0,0 +1,50 @@
+## FD_misfit_func.py misfit between seismograms and reference seismograms
+# GNU General Public License v3.0
+#
+# Calculates the misfit of seismograms with shape (receivers, nt) against
+# reference seismograms of the same shape, vectorized over all receivers:
+# l2         relative L2-norm of the difference ||s-s_ref||/||s_ref||
+# max_error  maximum absolute difference
+# time_shift delay of s relative to s_ref (in s) from the maximum of the
+#            cross-correlation (calculated by FFT, refined by a parabola)
+#
+# Usage:
+# misfit=FD_misfit(Seismogramm,Seismogramm_ref,dt)
+import numpy as np
+
+def FD_resample(Seismogramm,dt,dt_new,nt_new,offset=0.0):
+    # Linear interpolation of all traces onto the time vector np.arange(nt_new)*dt_new,
+    # sample n of the traces belongs to the time (n+offset)*dt (same offset after resampling)
+    Seismogramm=np.atleast_2d(Seismogramm)
+    pos=(np.arange(nt_new)+offset)*dt_new/dt-offset
+    i=np.clip(np.floor(pos).astype(int),0,Seismogramm.shape[1]-2)
+    w=np.clip(pos-i,0.0,1.0)
+    return(Seismogramm[:,i]*(1.0-w)+Seismogramm[:,i+1]*w)
+
+def FD_time_shift(Seismogramm,Seismogramm_ref,dt):
+    # Delay of each trace relative to the reference trace (in s)
+    Seismogramm=np.atleast_2d(Seismogramm)
+    Seismogramm_ref=np.atleast_2d(Seismogramm_ref)
+    nt=Seismogramm.shape[1]
+    nfft=2*nt
+    xc=np.fft.irfft(np.fft.rfft(Seismogramm,nfft)*np.conj(np.fft.rfft(Seismogramm_ref,nfft)),nfft)
+    lag=np.argmax(xc,axis=1)
+    # Parabolic interpolation around the maximum
+    rows=np.arange(xc.shape[0])
+    y0=xc[rows,lag-1]
+    y1=xc[rows,lag]
+    y2=xc[rows,(lag+1)%nfft]
+    denom=y0-2.0*y1+y2
+    frac=np.where(denom!=0,0.5*(y0-y2)/np.where(denom!=0,denom,1.0),0.0)
+    lag=np.where(lag>nfft//2,lag-nfft,lag)+frac
+    return(lag*dt)
+
+def FD_misfit(Seismogramm,Seismogramm_ref,dt):
+    Seismogramm=np.atleast_2d(Seismogramm)
+    Seismogramm_ref=np.atleast_2d(Seismogramm_ref)
+    diff=Seismogramm-Seismogramm_ref
+    norm_ref=np.linalg.norm(Seismogramm_ref,axis=1)
+    misfit={"l2":np.linalg.norm(diff,axis=1)/np.where(norm_ref>0,norm_ref,1.0),
+            "max_error":np.max(np.abs(diff),axis=1),
+            "time_shift":FD_time_shift(Seismogramm,Seismogramm_ref,dt)}
+    return(misfit)
@@ -0,0 +1,86 @@
+## FD_model_func.py chunked loading of velocity and density models
+# GNU General Public License v3.0
+#
+# The modelling functions accept the velocity and density models as arrays
+# or as file names of .npy files, which are opened as read-only memory
+# maps. The models are only read in chunks of rows (along the first axis):
+# FD_model_range returns the lowest and highest value and
+# FD_model_coefficients calculates the coefficients of the time stepping
+# (dt/rho, lambda*dt and the Lax-Wendroff coefficients) chunkwise in double
+# precision and stores them directly in the precision of the time
+# stepping. Neither full copies of the models nor full temporaries (e.g.
+# lambda=rho*v^2) are created, so large models load with bounded memory.
+#
+# Usage:
+# np.save("modell_v.npy",modell_v)
+# cmin,cmax=FD_model_range("modell_v.npy")
+# Seismogramm=FD_2D_modelling("modell_v.npy","rho.npy",dx,dt,q,xscr,yscr,xrec,yrec)
+import os
+import numpy as np
+
+# Size of the chunks of the models in bytes
+MODEL_CHUNK_SIZE=2**24
+
+def FD_model_load(model):
+    # Model array, a file name of a .npy file is opened as memory map
+    if isinstance(model,(str,os.PathLike)):
+        return(np.load(model,mmap_mode="r"))
+    return(model)
+
+def _chunk_rows(model,chunk_size):
+    # Number of rows (along the first axis) of a chunk
+    row_size=np.asarray(model).itemsize*int(np.prod(np.shape(model)[1:]))
+    return(max(int(chunk_size//max(row_size,1)),1))
+
+def FD_model_chunks(model,chunk_size=MODEL_CHUNK_SIZE):
+    # Iterates over (first row, chunk as array) of the model
+    model=FD_model_load(model)
+    rows=_chunk_rows(model,chunk_size)
+    for r0 in range(0,np.shape(model)[0],rows):
+        yield(r0,np.asarray(model[r0:r0+rows]))
+
+def FD_model_range(model,chunk_size=MODEL_CHUNK_SIZE):
+    # Lowest and highest value of the model (e.g. cmin and cmax)
+    lo,hi=np.inf,-np.inf
+    for r0,chunk in FD_model_chunks(model,chunk_size):
+        lo=min(lo,float(chunk.min()))
+        hi=max(hi,float(chunk.max()))
+    return(lo,hi)
+
+def FD_model_coefficients(modell_v,rho,dt,c9=None,region=None,pad=0,dtype=np.float64,
+                          chunk_size=MODEL_CHUNK_SIZE):
+    # dt_rho=dt/rho and l_dt=lambda*dt (lambda=rho*v^2) and with c9 the
+    # Lax-Wendroff coefficients lw_v=lambda*c9/rho^2 and lw_p=lambda^2*c9/rho
+    # of the model region (tuple of slices, default all) with pad ghost
+    # points on each side (edge values), as arrays of dtype
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    if np.shape(modell_v)!=np.shape(rho):
+        print("Error: FD_model_coefficients")
+        print("modell_v and rho need the same shape!")
+        return
+    if region is not None:
+        modell_v=modell_v[region]
+        rho=rho[region]
+    shape=tuple(n+2*pad for n in np.shape(modell_v))
+    names=["dt_rho","l_dt"]+(["lw_v","lw_p"] if c9 is not None else [])
+    out={name:np.empty(shape,dtype) for name in names}
+    rows=_chunk_rows(modell_v,chunk_size)
+    for r0 in range(0,np.shape(modell_v)[0],rows):
+        v=np.asarray(modell_v[r0:r0+rows],float)
+        r=np.asarray(rho[r0:r0+rows],float)
+        j=(slice(pad+r0,pad+r0+v.shape[0]),)+tuple(slice(pad,n-pad) for n in shape[1:])
+        l=r*v*v
+        out["dt_rho"][j]=dt/r
+        out["l_dt"][j]=l*dt
+        if c9 is not None:
+            out["lw_v"][j]=l*c9/r**2
+            out["lw_p"][j]=l**2*c9/r
+    # Ghost points with the values of the model edge (as np.pad mode="edge")
+    if pad>0:
+        for f in out.values():
+            for axis in range(f.ndim):
+                g=np.moveaxis(f,axis,0)
+                g[:pad]=g[pad]
+                g[-pad:]=g[-pad-1]
+    return(out)
@@ -0,0 +1,91 @@
+## FD_multirate_func.py levels of the multirate local time stepping
+# GNU General Public License v3.0
+#
+# The global time step dt=dx/cmax*c2 is set by the highest velocity. With
+# multirate local time stepping (FD_1D_modelling(...,multirate=True)),
+# every grid point gets its own CFL-limited time step dx/c*c2, rounded down
+# to a power of two times dt, so the slow parts of the model are stepped
+# 2, 4, 8, ... times less often. Narrow slow regions (less than min_width
+# grid points) get the smaller step of their neighbours, narrow fast bodies
+# keep their small step.
+#
+# The levels are nested: level l contains all grid points with a step of
+# at most the step of level l, and its connected parts (widened by the
+# reach of the spatial stencil) are the nodes of a tree, whose children
+# are the parts of the next finer level. The time stepping (explicit local
+# time stepping for the leapfrog scheme, Diaz & Grote, 2009) advances every
+# node with its own step, with the coarser part of the wavefield as a
+# constant forcing during the step of the parent node. The coupling of the
+# levels conserves energy; with the stabilization of Grote, Mehlin & Sauter
+# (2018) it is stable for CFL-numbers c2 up to about 0.65 (2nd-order in
+# time, DX4 and DX8), for all velocity contrasts.
+#
+# Usage:
+# regions=FD_multirate_regions(modell_v)   # [(start,end,step),...]
+# root=FD_multirate_tree(regions,reach)    # Nested nodes of the levels
+# speedup=FD_multirate_speedup(regions)    # Saved cell updates
+import numpy as np
+
+def _runs(m):
+    # Runs of equal values of m as [start,end,value]
+    edges=np.flatnonzero(np.diff(m))+1
+    starts=np.concatenate(([0],edges))
+    ends=np.concatenate((edges,[m.size]))
+    return([[int(s),int(e),int(m[s])] for s,e in zip(starts,ends)])
+
+def FD_multirate_regions(modell_v,min_width=20):
+    # Regions (start, end, step) of the grid points of modell_v, with the
+    # local time step as multiple of dt (power of two)
+    v=np.asarray(modell_v,float)
+    if v.ndim!=1 or v.min()<=0:
+        print("Error: FD_multirate_regions")
+        print("1-D model with positive velocities needed!")
+        return
+    # Largest multiple within the local CFL-limit (with some tolerance for
+    # rounding of exact multiples), rounded down to a power of two
+    m=np.floor(v.max()/v*(1.0+1e-9)).astype(int)
+    m=2**np.floor(np.log2(m)+1e-9).astype(int)
+    while True:
+        regions=_runs(m)
+        narrow=[]
+        for j,(s,e,h) in enumerate(regions):
+            smaller=[regions[k][2] for k in (j-1,j+1) if 0<=k<len(regions) and regions[k][2]<h]
+            if e-s<min_width and smaller:
+                narrow.append((e-s,j,max(smaller)))
+        if not narrow:
+            return([tuple(r) for r in regions])
+        # Merge the narrowest slow region into its neighbour with the closest smaller step
+        w,j,h=min(narrow)
+        m[regions[j][0]:regions[j][1]]=h
+
+def FD_multirate_tree(regions,reach):
+    # Tree of the levels: nodes with the rows lo..hi-1 (grid points of the
+    # level and reach grid points around), step, ratio to the parent step,
+    # own grid points, active rows (reached from own grid points) and children
+    step=np.concatenate([h*np.ones(e-s,int) for s,e,h in regions])
+    steps=sorted(set(step),reverse=True)
+    n=step.size
+
+    def node(level,lo,hi):
+        children=[]
+        if level+1<len(steps):
+            fine=np.zeros(n)
+            fine[lo:hi]=step[lo:hi]<=steps[level+1]
+            fine=np.convolve(fine,np.ones(2*reach+1),mode="same")>0.5
+            for s,e,inside in _runs(fine):
+                if inside:
+                    children.append(node(level+1,max(s,lo),min(e,hi)))
+        own=(step[lo:hi]==steps[level]).astype(float)
+        # Rows which depend on the grid points of the level
+        near=np.convolve(own,np.ones(2*reach+1),mode="same")>0.5
+        active=[(s+lo,e+lo) for s,e,inside in _runs(near) if inside]
+        return({"lo":lo,"hi":hi,"step":int(steps[level]),"ratio":int(steps[max(level-1,0)]//steps[level]),
+                "own":own,"active":active,"children":children})
+
+    return(node(0,0,n))
+
+def FD_multirate_speedup(regions):
+    # Ratio of the cell updates with the global and the local time steps
+    cells=sum(e-s for s,e,h in regions)
+    local=sum((e-s)/float(h) for s,e,h in regions)
+    return(cells/local)
@@ -0,0 +1,49 @@
+## FD_numexpr_func.py fused stencil expressions with numexpr
+# GNU General Public License v3.0
+#
+# Optional backend of the modelling functions: each spatial derivative and
+# the following velocity or pressure update is evaluated as one fused,
+# multithreaded numexpr expression over slice views of the wavefields,
+# instead of one pass over memory per NumPy operation.
+#
+# The backend is selected automatically if numexpr can be imported and the
+# grid has at least NUMEXPR_MIN_SIZE grid points (below, the call overhead
+# of numexpr outweighs the saved memory passes).
+#
+# Usage:
+# backend=select_backend(None,size)
+# local_dict={"vx_k":vx[k],"dt_rho":dt_rho}
+# expr="vx_k-dt_rho*("+stencil_expression(c,plus,minus,"p",local_dict)+")"
+# ne.evaluate(expr,local_dict=local_dict,out=vx[k])
+try:
+    import numexpr as ne
+except ImportError:
+    ne=None
+
+NUMEXPR_MIN_SIZE=2**16
+
+def select_backend(backend,size):
+    # "numexpr" or "numpy"; None selects numexpr for large grids if available
+    if backend is None:
+        if ne is not None and size>=NUMEXPR_MIN_SIZE:
+            return("numexpr")
+        return("numpy")
+    if backend=="numexpr" and ne is None:
+        print("Error: select_backend")
+        print("numexpr is not installed!")
+        return
+    if backend not in ("numpy","numexpr"):
+        print("Error: select_backend")
+        print("Backend has to be numpy or numexpr!")
+        return
+    return(backend)
+
+def stencil_expression(c,plus,minus,name,local_dict):
+    # Expression sum_n c(n)*(plus(n)-minus(n)), the shifted views plus(n)
+    # and minus(n) are added to local_dict as name_p<n> and name_m<n>
+    terms=[]
+    for n in range(len(c)):
+        local_dict["%s_p%d"%(name,n)]=plus[n]
+        local_dict["%s_m%d"%(name,n)]=minus[n]
+        terms.append("%r*(%s_p%d-%s_m%d)"%(float(c[n]),name,n,name,n))
+    return("+".join(terms))
@@ -0,0 +1,80 @@
+## FD_progress_func.py progress, ETA and throughput of the time stepping
+# GNU General Public License v3.0
+#
+# Reports the progress of the time loop of the modelling functions at a
+# wall-clock interval: time step, percentage, elapsed time, estimated time
+# of arrival (ETA) and the achieved throughput in million updated grid
+# points per second (Mcells/s). The clock is only read every few time steps
+# (adapted to the measured speed, about ten times per interval), so the
+# overhead per time step is a counter update.
+#
+# The reports are printed, appended as JSON lines to a file (e.g. for a
+# scheduler or dashboard) and/or passed as dict to a callback function.
+#
+# Usage:
+# Seismogramm=FD_2D_modelling(...,progress=10) # Print every 10 s
+# Seismogramm=FD_2D_modelling(...,progress=FD_progress(60,file="job.jsonl",quiet=True))
+import json
+import time
+
+def FD_progress(interval=10.0,file=None,callback=None,quiet=False):
+    # Settings of the reports: interval in s, JSON lines file, callback(report)
+    return({"interval":float(interval),"file":file,"callback":callback,"quiet":quiet})
+
+def FD_progress_start(progress,nt,cells):
+    # State of the reports for nt time steps with cells updated grid points,
+    # progress is None (no reports), an interval in s or from FD_progress
+    if progress is None or progress is False:
+        return
+    if not isinstance(progress,dict):
+        progress=FD_progress(10.0 if progress is True else progress)
+    state=dict(progress)
+    now=time.perf_counter()
+    state.update(nt=nt,cells=cells,start=now,last=now,n=1,n_start=None,countdown=1,check_every=1)
+    return(state)
+
+def _report(state,n,now,final=False):
+    steps=n-state["n_start"]
+    elapsed=now-state["start"]
+    rate=steps/elapsed if elapsed>0 else 0.0
+    report={"step":n,"nt":state["nt"],"progress":100.0*(n+1)/state["nt"],
+            "elapsed":elapsed,"eta":(state["nt"]-1-n)/rate if rate>0 else None,
+            "mcells_per_s":rate*state["cells"]/1e6,"time":time.time(),"final":final}
+    if not state["quiet"]:
+        if final:
+            print("Finished %d time steps in %.1f s (%.1f Mcells/s)"%(steps,elapsed,report["mcells_per_s"]))
+        else:
+            eta="%.1f s"%report["eta"] if report["eta"] is not None else "unknown"
+            print("Time step %d/%d (%.1f %%), elapsed %.1f s, ETA %s, %.1f Mcells/s"%(
+                  n,state["nt"],report["progress"],elapsed,eta,report["mcells_per_s"]))
+    if state["file"] is not None:
+        with open(state["file"],"a") as f:
+            f.write(json.dumps(report)+"\n")
+    if state["callback"] is not None:
+        state["callback"](report)
+
+def FD_progress_update(state,n):
+    # Called after time step n; reads the clock only every check_every time steps
+    state["countdown"]-=n-state["n"]
+    state["n"]=n
+    if state["countdown"]>0:
+        return
+    now=time.perf_counter()
+    if state["n_start"] is None:
+        # Timing starts after the first time step (without the preparation)
+        state.update(n_start=n,start=now,last=now)
+    elif now-state["last"]>=state["interval"]:
+        state["last"]=now
+        _report(state,n,now)
+    # Check the clock about ten times per interval
+    steps=n-state["n_start"]
+    elapsed=now-state["start"]
+    if steps>0 and elapsed>0:
+        state["check_every"]=max(1,int(0.1*state["interval"]*steps/elapsed))
+    state["countdown"]=state["check_every"]
+
+def FD_progress_finish(state,n):
+    # Final report after the last time step n
+    if state is None or state["n_start"] is None:
+        return
+    _report(state,n,time.perf_counter(),final=True)
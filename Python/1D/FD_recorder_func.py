@@ -0,0 +1,62 @@
+## FD_recorder_func.py seismogram recorder with streaming decimation
+# GNU General Public License v3.0
+#
+# Records the seismograms of the modelling functions during the time
+# stepping. If an output sample interval dt_out is given, every recorded
+# sample is low-pass filtered and resampled on the fly, and only the output
+# samples are stored: the output sample k is the filtered trace at the time
+# k*dt_out, calculated with a Blackman-windowed sinc kernel (cutoff
+# CUTOFF/dt_out, half width taps/2*dt_out), which removes the frequencies
+# above the Nyquist frequency of dt_out before resampling. Each input
+# sample is added to the taps output samples in its reach, so dt_out does
+# not have to be a multiple of dt and the receivers can be recorded in any
+# order (e.g. per tile).
+#
+# The frequencies below about 0.3/dt_out are kept unchanged, so dt_out
+# should be at most 0.3/fmax (e.g. 15 ms for fmax=20 Hz).
+#
+# Usage:
+# recorder=FD_recorder(nrec,nt,dt,dt_out)
+# FD_record(recorder,n,p[xrec])   # in the time loop
+# Seismogramm=recorder["Seismogramm"]
+import numpy as np
+
+# Cutoff frequency of the anti-alias filter in units of 1/dt_out
+CUTOFF=0.4
+
+def FD_recorder(nrec,nt,dt,dt_out=None,taps=32,dtype=float):
+    # Recorder for nrec receivers and nt time steps, dt_out=None stores every time step
+    if dt_out is None:
+        return({"dt_out":None,"Seismogramm":np.zeros((nrec,nt),dtype)})
+    if dt_out<dt:
+        print("Error: FD_recorder")
+        print("dt_out has to be at least dt!")
+        return
+    nt_out=int(np.floor((nt-1)*dt/dt_out+1e-9))+1
+    return({"dt":dt,"dt_out":dt_out,"half_width":taps/2*dt_out,
+            "Seismogramm":np.zeros((nrec,nt_out),dtype)})
+
+def _kernel(tau,half_width,dt,dt_out):
+    # Windowed sinc with the DC gain 1 for samples with the interval dt
+    fc=CUTOFF/dt_out
+    window=0.42+0.5*np.cos(np.pi*tau/half_width)+0.08*np.cos(2*np.pi*tau/half_width)
+    return(2*fc*dt*np.sinc(2*fc*tau)*window)
+
+def FD_record(recorder,n,values,rows=None):
+    # Record the samples values of time step n (of the receivers rows, default all)
+    Seismogramm=recorder["Seismogramm"]
+    if rows is None:
+        rows=slice(None)
+    if recorder["dt_out"] is None:
+        Seismogramm[rows,n]=values
+        return
+    dt=recorder["dt"]
+    dt_out=recorder["dt_out"]
+    half_width=recorder["half_width"]
+    t=n*dt
+    k0=max(int(np.ceil((t-half_width)/dt_out)),0)
+    k1=min(int(np.floor((t+half_width)/dt_out))+1,Seismogramm.shape[1])
+    if k1<=k0:
+        return
+    h=_kernel(np.arange(k0,k1)*dt_out-t,half_width,dt,dt_out)
+    Seismogramm[rows,k0:k1]+=np.multiply.outer(values,h)
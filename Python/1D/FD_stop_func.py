@@ -0,0 +1,82 @@
+## FD_stop_func.py early termination of the time stepping
+# GNU General Public License v3.0
+#
+# The modelling functions run for all time steps of the source signal q,
+# even if no more waves arrive at the receivers. With stop=True (or
+# settings from FD_stop), the wavefields are checked every few time steps
+# and the time loop ends early, the rest of the seismograms stays zero.
+#
+# The model edges are rigid, so the energy stays in the model after the
+# source. Instead of the total energy, the energy within reach of the
+# receivers (grid points closer to a receiver than cmax times the
+# remaining time T-t, plus the stencil length) is compared with the largest
+# total energy so far: below the fraction energy (after the end of the
+# source signal), no waves above this level can arrive at the receivers
+# before the end of the seismograms. If the time of the last expected
+# arrival t_arrival is given, the run also stops after t_arrival as soon as
+# the samples since the last check are below the fraction amplitude of the
+# largest amplitude of the seismograms. The energy density p^2/l+rho*v^2
+# is calculated from the coefficients l_dt=l*dt and dt_rho=dt/rho of the
+# time stepping (the common factor dt and 1/2 omitted).
+#
+# Usage:
+# Seismogramm=FD_1D_modelling(modell_v,rho,dx,dt,q,xscr,xrec,stop=True)
+# Seismogramm=FD_2D_modelling(...,stop=FD_stop(energy=1e-8,t_arrival=1.2,every=20))
+import numpy as np
+
+def FD_stop(energy=1e-6,amplitude=1e-3,t_arrival=None,every=50):
+    # Settings of the termination: fractions of the largest energy and
+    # amplitude, time of the last expected arrival in s, check interval
+    return({"energy":float(energy),"amplitude":float(amplitude),"t_arrival":t_arrival,"every":int(every)})
+
+def FD_stop_distance(positions,receivers,dx):
+    # Distance (in m) of the grid points (array of indices per axis) to the
+    # nearest receiver (indices per axis)
+    distance=np.full(np.broadcast_shapes(*[np.shape(x) for x in positions]),np.inf)
+    for r in zip(*receivers):
+        d=sum((np.asarray(x,float)-xr)**2 for x,xr in zip(positions,r))
+        np.minimum(distance,np.sqrt(d)*dx,out=distance)
+    return(distance)
+
+def FD_stop_start(stop,nt,dt,q,coefficients,distance,reach):
+    # State of the termination for nt time steps: stop is None (no
+    # termination), True or from FD_stop, coefficients (l_dt, dt_rho, ...)
+    # of the wavefields (p, v, ...) of the checks, distance to the receivers
+    # of their grid points and reach the stencil length in m
+    if stop is None or stop is False:
+        return
+    state=dict(FD_stop() if stop is True else stop)
+    q=np.abs(np.asarray(q,float))
+    # End of the source signal (samples above the fraction amplitude)
+    n_source=np.flatnonzero(q>state["amplitude"]*q.max())[-1] if q.max()>0 else 0
+    cmax=np.sqrt((coefficients[0]*coefficients[1]).max())/dt
+    state.update(nt=nt,dt=dt,weights=[1.0/c for c in coefficients],distance=distance,cmax=cmax,
+                 reach=reach,n_source=int(n_source),peak=0.0,next=0,last=nt-1,checked=0)
+    return(state)
+
+def FD_stop_check(state,n,fields,recorder):
+    # True if the time stepping can end after the time step n, fields are
+    # the wavefields (same order and grid points as the coefficients)
+    if n<state["next"]:
+        return(False)
+    state["next"]=n+state["every"]
+    stop=False
+    e=sum(w*f*f for w,f in zip(state["weights"],fields))
+    state["peak"]=max(state["peak"],e.sum())
+    if n>state["n_source"] and state["peak"]>0:
+        R=state["cmax"]*(state["nt"]-1-n)*state["dt"]+state["reach"]
+        stop=e[state["distance"]<=R].sum()<state["energy"]*state["peak"]
+    t=n*state["dt"]
+    if state["t_arrival"] is not None and t>=state["t_arrival"]:
+        # Samples since the last check
+        Seismogramm=recorder["Seismogramm"]
+        dt_out=recorder["dt_out"] or state["dt"]
+        k0=int(state["checked"]*state["dt"]/dt_out)
+        k1=int(t/dt_out)+1
+        largest=np.abs(Seismogramm[:,:k1]).max()
+        if largest>0 and np.abs(Seismogramm[:,k0:k1]).max()<state["amplitude"]*largest:
+            stop=True
+    state["checked"]=n
+    if stop:
+        state["last"]=n
+    return(stop)
@@ -0,0 +1,183 @@
+## FD_sweep_func.py parameter sweeps with shared models and resume
+# GNU General Public License v3.0
+#
+# Runs a modelling function (FD_1D_modelling, FD_2D_modelling or
+# FD_3D_modelling) for every point of a parameter grid in a process pool,
+# e.g. over the discretization (c1, c2) and the scheme (spatial_order,
+# temporal_order, method). As in the scripts, the model and the source and
+# receiver positions are given in grid points: c1 (grid points per
+# wavelength) and c2 (CFL-number) determine dx and dt of a point, f0, q0
+# and T the Ricker source signal, all other parameters are passed to the
+# modelling function. The velocity and density models are copied once
+# into shared memory, which all worker processes use without copies.
+#
+# Every finished point is stored in the directory of the sweep as
+# point_<key>.npy (seismograms) and point_<key>.json (parameters, dx, dt,
+# runtime); the .json file is written last. The key is a hash of the
+# modelling function name, the point, the setup and the models, so a
+# repeated call (e.g. after an interruption) only runs the missing points
+# and the points which failed (e.g. returned None for an unstable run).
+#
+# Usage:
+# points=FD_sweep_points({"c1":[10,20],"c2":[0.3,0.5],"spatial_order":[4,8]})
+# setup={"f0":5,"T":1,"xscr":100,"yscr":100,"xrec":[100,100],"yrec":[80,120]}
+# results=FD_sweep(FD_2D_modelling,modell_v,rho,points,setup,"Sweeps/c1_c2")
+# FD_sweep_table(results)
+# Seismogramm=np.load(results[0]["seismograms"])
+import os
+import json
+import time
+import hashlib
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from FD_model_func import FD_model_load, FD_model_chunks, FD_model_range
+
+# Parameters of a point, which determine the discretization and source signal
+SETUP_KEYS=("c1","c2","f0","q0","T")
+SETUP_DEFAULTS={"c1":20,"c2":0.5,"f0":10,"q0":1,"T":1}
+
+# Models of the worker processes (from shared memory)
+_models={}
+
+def FD_sweep_points(grid):
+    # All combinations of the values of grid (dict of parameter: list of values)
+    names=list(grid)
+    return([dict(zip(names,values)) for values in itertools.product(*(grid[n] for n in names))])
+
+def _digest(arrays):
+    # Hash of the models, read in chunks
+    h=hashlib.sha256()
+    for a in arrays:
+        h.update(str((np.shape(a),np.asarray(a).dtype.str)).encode())
+        for r0,chunk in FD_model_chunks(a):
+            h.update(np.ascontiguousarray(chunk).data)
+    return(h.hexdigest())
+
+def _key(func,point,setup,digest):
+    text=json.dumps({"function":getattr(func,"__name__",repr(func)),"point":point,"setup":setup,
+                     "models":digest},sort_keys=True,default=repr)
+    return(hashlib.sha256(text.encode()).hexdigest()[:16])
+
+def _positions(ndim,setup):
+    # Source and receiver positions in the order of the modelling function
+    axes="xyz"[:ndim]
+    return([setup[a+"scr"] for a in axes]+[list(setup[a+"rec"]) for a in axes])
+
+def _attach(shared):
+    # Initialisation of a worker process: models from shared memory
+    for name,(block,shape,dtype) in shared.items():
+        shm=shared_memory.SharedMemory(name=block)
+        _models[name]=(shm,np.ndarray(shape,dtype,buffer=shm.buf))
+
+def _run_point(func,point,setup,cmin,cmax,filename):
+    # Run one point and store seismograms and metadata
+    p=dict(SETUP_DEFAULTS)
+    p.update(setup)
+    p.update(point)
+    kwargs=dict((k,v) for k,v in point.items() if k not in SETUP_KEYS)
+    fmax=2*p["f0"]
+    dx=cmin/(fmax*p["c1"])
+    dt=dx/cmax*p["c2"]
+    t=np.arange(0,p["T"],dt)
+    tau=np.pi*p["f0"]*(t-1.5/p["f0"])
+    q=p["q0"]*(1.0-2.0*tau**2.0)*np.exp(-tau**2)
+    modell_v=_models["modell_v"][1]
+    rho=_models["rho"][1]
+    start=time.perf_counter()
+    Seismogramm=func(modell_v,rho,dx,dt,q,*_positions(modell_v.ndim,setup),**kwargs)
+    runtime=time.perf_counter()-start
+    meta={"point":point,"dx":dx,"dt":dt,"nt":t.size,"runtime":runtime,
+          "cells":int(modell_v.size),"created":time.time(),"failed":Seismogramm is None}
+    # Write to temporary files first, the .json file marks a finished point
+    tmp=filename+".%d.tmp"%os.getpid()
+    if Seismogramm is not None:
+        with open(tmp,"wb") as f:
+            np.save(f,Seismogramm)
+        os.replace(tmp,filename+".npy")
+        meta["seismograms"]=os.path.basename(filename)+".npy"
+    with open(tmp,"w") as f:
+        json.dump(meta,f,indent=1,default=repr)
+    os.replace(tmp,filename+".json")
+    return(meta)
+
+def _load(filename):
+    # Metadata of a finished point or None
+    try:
+        with open(filename+".json") as f:
+            meta=json.load(f)
+    except (OSError,ValueError):
+        return(None)
+    if "seismograms" in meta:
+        meta["seismograms"]=os.path.join(os.path.dirname(filename),meta["seismograms"])
+    return(meta)
+
+def FD_sweep(func,modell_v,rho,points,setup,directory,workers=None):
+    # Run func for all points which are not finished in directory yet,
+    # returns the metadata of all points (workers=1 runs without pool)
+    os.makedirs(directory,exist_ok=True)
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    if np.shape(modell_v)!=np.shape(rho):
+        print("Error: FD_sweep")
+        print("modell_v and rho need the same shape!")
+        return
+    cmin,cmax=FD_model_range(modell_v)
+    digest=_digest((modell_v,rho))
+    filenames=[os.path.join(directory,"point_"+_key(func,p,setup,digest)) for p in points]
+    # Missing and failed points
+    pending=[(p,f) for p,f in zip(points,filenames) if (_load(f) or {"failed":True})["failed"]]
+    print("Sweep: %d of %d points finished, running %d"%(len(points)-len(pending),len(points),len(pending)))
+
+    ## Run the missing points
+    if pending and workers==1:
+        _models.update(modell_v=(None,modell_v),rho=(None,rho))
+        for n,(p,f) in enumerate(pending):
+            meta=_run_point(func,p,setup,cmin,cmax,f)
+            print("Point %d/%d %s: %.2f s"%(n+1,len(pending),p,meta["runtime"]))
+    elif pending:
+        blocks=[]
+        shared={}
+        try:
+            # Copy the models into shared memory
+            for name,a in (("modell_v",modell_v),("rho",rho)):
+                dtype=np.asarray(a).dtype
+                shm=shared_memory.SharedMemory(create=True,size=max(int(np.prod(np.shape(a)))*dtype.itemsize,1))
+                blocks.append(shm)
+                view=np.ndarray(np.shape(a),dtype,buffer=shm.buf)
+                for r0,chunk in FD_model_chunks(a):
+                    view[r0:r0+chunk.shape[0]]=chunk
+                del view
+                shared[name]=(shm.name,np.shape(a),dtype.str)
+            with ProcessPoolExecutor(workers,initializer=_attach,initargs=(shared,)) as pool:
+                futures={pool.submit(_run_point,func,p,setup,cmin,cmax,f):p for p,f in pending}
+                try:
+                    for n,future in enumerate(as_completed(futures)):
+                        meta=future.result()
+                        print("Point %d/%d %s: %.2f s"%(n+1,len(pending),futures[future],meta["runtime"]))
+                except KeyboardInterrupt:
+                    # Finished points are kept, the sweep resumes with the others
+                    pool.shutdown(wait=True,cancel_futures=True)
+                    raise
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    return([_load(f) for f in filenames])
+
+def FD_sweep_table(results):
+    # Print the parameters, discretization and runtime of every point
+    names=[]
+    for r in results:
+        names+=[k for k in r["point"] if k not in names]
+    print(" ".join("%14s"%k for k in names)+" %10s %10s %8s %10s %10s"%(
+          "dx/m","dt/ms","nt","Runtime/s","Mcells/s"))
+    for r in results:
+        values=" ".join("%14s"%(r["point"].get(k,"")) for k in names)
+        if r["failed"]:
+            print(values+" failed")
+            continue
+        rate=r["cells"]*r["nt"]/r["runtime"]/1e6 if r["runtime"]>0 else 0.0
+        print(values+" %10.3f %10.4f %8d %10.2f %10.1f"%(r["dx"],1000*r["dt"],r["nt"],r["runtime"],rate))
@@ -0,0 +1,106 @@
+## FD_watchdog_func.py detection of unstable runs
+# GNU General Public License v3.0
+#
+# A run with a time step above the stability limit (e.g. c2 above the
+# CFL-number of FD_1D_stability.py) grows exponentially from rounding
+# errors and fills the wavefields with inf and NaN, which is only noticed
+# in the seismograms after the end of the run. The watchdog of the
+# modelling functions checks the largest pressure every few time steps:
+# relative to the summed source amplitude sum|q| (so the start of the
+# source is no growth), a stable run stays of order one. The run is
+# aborted if the pressure is not finite, if the ratio grows by more than
+# the factor growth between count consecutive checks, or if it exceeds
+# limit. The modelling function then returns None after a diagnostic:
+# time step, grid point of the largest pressure, growth per time step, the
+# CFL-number of the run and a suggested CFL-number below the stability
+# limit of the scheme (the 1-D limit divided by sqrt(ndim), see
+# FD_1D_dispersion_func and FD_2D_dispersion_func). The diagnostic is
+# printed and/or passed as dict to a callback function (e.g. the job
+# server, which reports it as error of the job).
+#
+# The check reads the pressure twice (largest and smallest value, no
+# temporary arrays) every 50 time steps.
+#
+# Usage:
+# Seismogramm=FD_1D_modelling(...)            # watchdog=True is the default
+# Seismogramm=FD_2D_modelling(...,watchdog=FD_watchdog(every=20,callback=print))
+# Seismogramm=FD_3D_modelling(...,watchdog=False)
+import numpy as np
+
+def FD_watchdog(every=50,growth=10.0,count=3,limit=1e6,callback=None,quiet=False):
+    # Settings of the watchdog: check interval in time steps, growth factor
+    # between checks, number of growing checks, largest ratio to sum|q|,
+    # callback(report) and quiet (no printed diagnostic)
+    return({"every":int(every),"growth":float(growth),"count":int(count),"limit":float(limit),
+            "callback":callback,"quiet":quiet})
+
+def FD_watchdog_start(watchdog,dt,dx,q,cmax,scheme,origin):
+    # State of the watchdog: watchdog is None or False (no checks), True or
+    # from FD_watchdog, cmax the highest velocity, scheme (temporal_order,
+    # spatial_order, method, coeff_spatial, ndim) and origin the model grid
+    # point of the first checked grid point (per axis)
+    if watchdog is None or watchdog is False:
+        return
+    # Settings not given (e.g. in a job of the server) get their defaults
+    state=FD_watchdog()
+    if watchdog is not True:
+        state.update(watchdog)
+    state.update(dt=dt,dx=dx,cmax=float(cmax),scheme=scheme,origin=origin,
+                 source=np.cumsum(np.abs(np.asarray(q,float))),
+                 next=0,checked=0,ratio=0.0,growing=0,failed=False)
+    return(state)
+
+def FD_watchdog_check(state,n,p):
+    # True if the run is unstable after the time step n, p is the pressure
+    # of the checked grid points
+    if n<state["next"]:
+        return(False)
+    state["next"]=n+state["every"]
+    norm=max(abs(float(p.max())),abs(float(p.min())))
+    source=state["source"][min(n,state["source"].size-1)]
+    if np.isfinite(norm) and source==0:
+        return(False)
+    ratio=norm/source if source>0 else np.inf
+    steps=max(n-state["checked"],1)
+    rate=(ratio/state["ratio"])**(1.0/steps) if state["ratio"]>0 else np.inf
+    state["growing"]=state["growing"]+1 if ratio>state["growth"]*state["ratio"]>0 else 0
+    state["checked"]=n
+    state["ratio"]=ratio
+    if not np.isfinite(norm):
+        _report(state,n,p,"the pressure is not finite",np.nan)
+    elif ratio>state["limit"]:
+        _report(state,n,p,"the pressure is %.3g times the summed source amplitude"%ratio,rate)
+    elif state["growing"]>=state["count"]:
+        _report(state,n,p,"the pressure grows exponentially",rate)
+    return(state["failed"])
+
+def _report(state,n,p,reason,rate):
+    # Diagnostic of an unstable run
+    # (imported here, FD_1D_dispersion_func imports FD_1D_modelling_func)
+    from FD_1D_dispersion_func import FD_1D_stability_limit
+    from FD_1D_modelling_func import scheme_name
+    temporal_order,spatial_order,method,coeff_spatial,ndim=state["scheme"]
+    a=np.abs(p)
+    bad=~np.isfinite(a)
+    index=np.unravel_index(np.argmax(bad) if bad.any() else np.argmax(a),p.shape)
+    position=tuple(int(i+o) for i,o in zip(index,state["origin"]))
+    CFL=state["cmax"]*state["dt"]/state["dx"]
+    stable=FD_1D_stability_limit(temporal_order,spatial_order,method,coeff_spatial)/np.sqrt(ndim)
+    suggested=0.9*stable
+    report={"step":int(n),"time":n*state["dt"],"position":position,"reason":reason,
+            "growth":float(rate),"CFL":CFL,"stability_limit":float(stable),
+            "suggested_CFL":float(suggested),"suggested_dt":float(suggested*state["dx"]/state["cmax"])}
+    report["message"]=("Unstable at time step %d (t=%.4g s): %s, largest at the grid point %s (model axes %s)"
+                       %(n,n*state["dt"],reason,position,("x","y, x","z, y, x")[ndim-1]))
+    if np.isfinite(rate):
+        report["message"]+=", growth %.4g per time step"%rate
+    report["message"]+=(". CFL=%.3f, the stability limit of %s in %d-D is about %.3f: use c2<=%.3f (dt<=%.4g s)."
+                        %(CFL,scheme_name(spatial_order,temporal_order,method),ndim,stable,suggested,
+                          report["suggested_dt"]))
+    state["failed"]=True
+    state["report"]=report
+    if not state["quiet"]:
+        print("Error: FD_watchdog")
+        print(report["message"])
+    if state["callback"] is not None:
+        state["callback"](report)
@@ -0,0 +1,171 @@
+# # FD_2D_DX4_DT2_fast 2-D acoustic Finite-Difference modelling
+#
+# GNU General Public License v3.0
+#
+# Author: Florian Wittkamp
+#
+# Finite-Difference acoustic seismic wave simulation
+#
+# Discretization of the first-order acoustic wave equation
+#
+# Temporal second-order accuracy $O(\Delta T^2)$
+# Spatial fourth-order accuracy  $O(\Delta X^4)$
+
+# Vectorized version of FD_2D_DX4_DT2, which optionally processes the grid
+# in cache-sized tiles with several fused time steps (see FD_2D_modelling_func)
+
+# ##  Initialisation
+import numpy as np
+import matplotlib.pyplot as plt
+from FD_2D_modelling_func import FD_2D_modelling
+from FD_archive_func import FD_archive_save
+from FD_model_func import FD_model_load, FD_model_range
+
+## Input Parameter
+
+# Discretization
+c1=20   # Number of grid points per dominant wavelength
+c2=0.5  # CFL-Number
+nx=200 # Number of grid points in X
+ny=200 # Number of grid points in Y
+T=1     # Total propagation time
+tiled=False # Cache-blocked execution for large models
+progress=10 # Interval of the progress reports in s (None: no reports)
+live=None # Live view of wavefield and seismograms during the time stepping (None, True or frames per second)
+dt_out=None # Sample interval of the seismograms in s (None: dt), e.g. 0.03 for fmax=10 Hz
+max_error=None # Save seismograms and wavefield as compressed archives with this error (None: .npy)
+
+# Source Signal
+f0= 5      # Center frequency Ricker-wavelet
+q0= 1       # Maximum amplitude Ricker-Wavelet
+xscr = 100  # Source position (in grid points) in X
+yscr = 100  # Source position (in grid points) in Y
+
+# Receiver
+xrec1=100; yrec1=80;  # Position Reciever 1 (in grid points)
+xrec2=100; yrec2=100;  # Position Reciever 2 (in grid points)
+xrec3=100; yrec3=120;# Position Reciever 3 (in grid points)
+
+# Velocity and density
+model_files=None # File names of .npy files instead, e.g. ("modell_v.npy","rho.npy")
+if model_files is None:
+    modell_v = 3000*np.ones((ny,nx))
+    rho=2.2*np.ones((ny,nx))
+else:
+    # Memory maps, which are read in chunks
+    modell_v=FD_model_load(model_files[0])
+    rho=FD_model_load(model_files[1])
+    ny,nx=np.shape(modell_v)
+
+## Preparation
+
+cmin,cmax=FD_model_range(modell_v) # Lowest and highest P-wave velocity
+fmax=2*f0                     # Maximum frequency
+dx=cmin/(fmax*c1)             # Spatial discretization (in m)
+dy=dx                         # Spatial discretization (in m)
+dt=dx/(cmax)*c2               # Temporal discretization (in s)
+lampda_min=cmin/fmax          # Smallest wavelength
+
+# Output model parameter:
+print("Model size: x:",dx*nx,"in m, y:",dy*ny,"in m")
+print("Temporal discretization: ",dt," s")
+print("Spatial discretization: ",dx," m")
+print("Number of gridpoints per minimum wavelength: ",lampda_min/dx)
+
+# ## Create space and time vector
+
+x=np.arange(0,dx*nx,dx) # Space vector in X
+y=np.arange(0,dy*ny,dy) # Space vector in Y
+t=np.arange(0,T,dt)     # Time vector
+nt=np.size(t)           # Number of time steps
+
+# Plotting model
+fig, (ax1, ax2) = plt.subplots(1, 2)
+fig.subplots_adjust(wspace=0.4,right=1)
+ax1.plot(y,modell_v[:,xscr]) # Profile through the source
+ax1.set_ylabel('VP in m/s')
+ax1.set_xlabel('Depth in m')
+ax1.set_title('P-wave velocity')
+plt.draw()
+plt.pause(0.001)
+
+ax2.plot(y,rho[:,xscr])
+ax2.set_ylabel('Density in g/cm^3')
+ax2.set_xlabel('Depth in m')
+ax2.set_title('Density');
+
+plt.draw()
+plt.pause(0.001)
+
+# ## Source signal - Ricker-wavelet
+
+tau=np.pi*f0*(t-1.5/f0)
+q=q0*(1.0-2.0*tau**2.0)*np.exp(-tau**2)
+
+# Plotting source signal
+plt.figure(3)
+plt.plot(t,q)
+plt.title('Source signal Ricker-Wavelet')
+plt.ylabel('Amplitude')
+plt.xlabel('Time in s')
+plt.draw()
+plt.pause(0.001)
+
+# ## Time stepping
+
+## Time stepping
+print("Starting time stepping...")
+p=np.zeros((ny,nx))
+Seismogramm=FD_2D_modelling(modell_v,rho,dx,dt,q,xscr,yscr,[xrec1,xrec2,xrec3],
+                            [yrec1,yrec2,yrec3],tiled=tiled,wavefield=p,dt_out=dt_out,
+                            progress=progress,live=live)
+print("Finished time stepping!")
+t_rec=np.arange(np.size(Seismogramm,1))*(dt if dt_out is None else dt_out) # Time vector of the seismograms
+
+
+# ## Save seismograms
+
+## Save seismograms
+if max_error is None:
+    np.save("Seismograms/FD_2D_DX4_DT2_fast",Seismogramm)
+else:
+    FD_archive_save("Seismograms/FD_2D_DX4_DT2_fast.fda",Seismogramm,max_error=max_error)
+    FD_archive_save("Seismograms/FD_2D_DX4_DT2_fast_wavefield.fda",p,max_error=max_error)
+
+# ## Plotting
+
+## Image plot
+fig, ax = plt.subplots(1,1)
+img = ax.imshow(p);
+ax.set_title('P-Wavefield')
+ax.set_xticks(range(0,nx+1,int(nx/5)))
+ax.set_yticks(range(0,ny+1,int(ny/5)))
+ax.set_xlabel('Grid-points in X')
+ax.set_ylabel('Grid-points in Y')
+fig.colorbar(img)
+plt.draw()
+plt.pause(0.001)
+
+## Plot seismograms
+plt.figure()
+plt.plot(t_rec,Seismogramm[0,:])
+plt.title('Seismogram 1')
+plt.ylabel('Amplitude')
+plt.xlabel('Time in s')
+
+plt.figure()
+plt.plot(t_rec,Seismogramm[1,:])
+plt.title('Seismogram 2')
+plt.ylabel('Amplitude')
+plt.xlabel('Time in s')
+
+plt.figure()
+plt.plot(t_rec,Seismogramm[2,:])
+plt.title('Seismogram 3')
+plt.ylabel('Amplitude')
+plt.xlabel('Time in s')
+plt.draw()
+
+plt.show()
+
+print(" ")
@@ -0,0 +1,43 @@
+## FD_2D_benchmark.py benchmark of the 2-D modelling backends
+# GNU General Public License v3.0
+#
+# Compares the runtime per time step of the plain NumPy backend and the
+# fused numexpr backend (if installed) of FD_2D_modelling, with and without
+# cache-blocked (tiled) execution, for several grid sizes. Only the time
+# stepping is timed: the runtime of a short run (setup and nt_setup time
+# steps) is subtracted from the runtime of a run with nt time steps.
+
+## Initialisation
+import time
+import numpy as np
+from FD_2D_modelling_func import FD_2D_modelling
+from FD_numexpr_func import ne
+print(" ")
+print("Starting FD_2D_benchmark")
+
+## Input Parameter
+grid_sizes=[200,500,1000,2000] # Number of grid points in X and Y
+nt=12       # Number of time steps per measurement
+nt_setup=4  # Number of time steps of the subtracted short run
+
+## Benchmark
+runs=[("numpy",False),("numpy",True)]
+if ne is not None:
+    runs+=[("numexpr",False),("numexpr",True)]
+else:
+    print("numexpr is not installed, only the NumPy backend is measured")
+print("%6s"%"n"+"".join(" %20s"%(b+(" tiled" if t else "")+" ms/step") for b,t in runs))
+for n in grid_sizes:
+    modell_v=3000*np.ones((n,n))
+    rho=2.2*np.ones((n,n))
+    line="%6d"%n
+    for backend,tiled in runs:
+        def run(steps):
+            # Runtime of a run with steps time steps
+            start=time.perf_counter()
+            FD_2D_modelling(modell_v,rho,15.0,0.0025,np.zeros(steps),n//2,n//2,[n//4],[n//4],
+                            tiled=tiled,backend=backend)
+            return(time.perf_counter()-start)
+        line+=" %20.2f"%(1e3*(run(nt)-run(nt_setup))/(nt-nt_setup))
+    print(line)
+print(" ")
@@ -0,0 +1,92 @@
+## FD_2D_compare.py 2-D acoustic Finite-Difference modelling
+# GNU General Public License v3.0
+#
+# Finite-Difference acoustic seismic wave simulation
+# Discretization of the first-order acoustic wave equation
+#
+# Compare seismograms, which are calculated with different
+# spatial and temporal accuracy and discretization.
+#
+# Each configuration models the same physical setup with c1 grid points per
+# wavelength and the CFL-number c2. The seismograms are compared against a
+# reference run (high spatial and temporal order, fine grid), after
+# resampling to the time step of the reference (FD_resample). Sample n of
+# FD_2D_modelling belongs to the time (n+0.5)*dt of the source signal (the
+# source is injected before the pressure update), and the source is
+# injected into one grid cell per time step, so amplitudes scale with dx^2/dt.
+
+## Initialisation
+import time
+import numpy as np
+from matplotlib.pyplot import *
+from FD_2D_modelling_func import FD_2D_modelling
+from FD_1D_modelling_func import scheme_name
+from FD_misfit_func import FD_misfit, FD_resample
+print(" ")
+print("Starting FD_2D_compare")
+
+## Input Parameter
+
+# Model and acquisition (in m)
+length=2000.0 # Model size in X and Y (no reflections from the edges before T)
+T=0.6         # Total propagation time
+f0=5          # Center frequency Ricker-wavelet
+scr=(1000.0,1000.0)                                  # Source position (x,y)
+rec=((1000.0,700.0),(1300.0,1000.0),(1300.0,1300.0)) # Receiver positions (x,y)
+
+# Configurations: (spatial_order, temporal_order, method, c1, c2)
+configs=[(4,2,"ABS",20,0.5),
+         (4,3,"ABS",20,0.5),
+         (4,4,"LW",20,0.5),
+         (8,4,"ABS",10,0.3),
+         (8,4,"LW",10,0.6)]
+
+# Reference: high spatial and temporal order on a fine grid
+reference=(12,4,"ABS",40,0.2)
+
+## Run all configurations
+def run(spatial_order,temporal_order,method,c1,c2):
+    cmin=cmax=3000.0
+    fmax=2*f0
+    dx=cmin/(fmax*c1)
+    dt=dx/cmax*c2
+    n=int(round(length/dx))
+    t=np.arange(0,T,dt)
+    tau=np.pi*f0*(t-1.5/f0)
+    q=(1.0-2.0*tau**2.0)*np.exp(-tau**2)
+    g=lambda x: int(round(x/dx))
+    start=time.time()
+    Seismogramm=FD_2D_modelling(cmax*np.ones((n,n)),2.2*np.ones((n,n)),dx,dt,q,
+                                g(scr[0]),g(scr[1]),[g(r[0]) for r in rec],[g(r[1]) for r in rec],
+                                spatial_order,temporal_order,method)
+    return(Seismogramm,dt,dx,time.time()-start)
+
+results=[]
+for config in [reference]+configs:
+    Seismogramm,dt,dx,runtime=run(*config)
+    results.append({"name":scheme_name(*config[:3])+" c1=%g c2=%g"%config[3:],
+                    "Seismogramm":Seismogramm,"dt":dt,"dx":dx,"runtime":runtime})
+
+## Compare against the reference
+ref=results[0]
+nt_ref=ref["Seismogramm"].shape[1]
+print("%-26s %10s %10s %14s"%("Scheme","Runtime/s","L2-misfit","Time shift/ms"))
+for n,r in enumerate(results):
+    scale=r["dt"]/ref["dt"]*(ref["dx"]/r["dx"])**2
+    r["Seismogramm"]=FD_resample(r["Seismogramm"],r["dt"],ref["dt"],nt_ref,0.5)*scale
+    m=FD_misfit(r["Seismogramm"],ref["Seismogramm"],ref["dt"])
+    print("%-26s %10.2f %10.2e %14.4f"%(r["name"]+(" (ref)" if n==0 else ""),r["runtime"],
+          np.max(m["l2"]),1000*np.max(np.abs(m["time_shift"]))))
+
+## Plotting
+t=np.arange(nt_ref)*ref["dt"]
+for n in range(len(rec)):
+    figure(n+1)
+    lines=[plot(t,r["Seismogramm"][n,:])[0] for r in results]
+    legend(lines,[r["name"] for r in results])
+    title('Seismogram '+str(n+1))
+    ylabel('Amplitude')
+    xlabel('Time in s')
+show()
+
+print(" ")
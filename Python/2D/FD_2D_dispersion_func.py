@@ -0,0 +1,119 @@
+## FD_2D_dispersion_func.py 2-D numerical dispersion and stability
+# GNU General Public License v3.0
+#
+# Vectorized von Neumann analysis of the 2-D acoustic FD-schemes of
+# FD_2D_modelling_func: stability limit (CFL-number) and numerical
+# dispersion (ratio between numerical wave velocity and model velocity) for
+# all propagation angles and wavenumbers at once.
+#
+# A plane wave with the wavenumbers KHx=KH*cos(angle) and KHy=KH*sin(angle)
+# (KH=2*pi/(grid points per wavelength)) leads to the same characteristic
+# equation as in 1-D (see FD_1D_dispersion_func) with mu=CFL*|a|, where
+# a=(s(KHx),s(KHy)) are the spatial influences of the staggered derivatives
+# in x and y. With the Lax-Wendroff correction of FD_2D_modelling
+# (grad(laplace(p)) and laplace(div(v)) of second order), each component
+# is reduced by CFL^2/6*sin(KHx/2)*(sin(KHx/2)^2+sin(KHy/2)^2) (x,
+# and accordingly y), which is the 1-D scheme for angle=0. The largest
+# spatial influence is found along the diagonal, so the stable CFL-number
+# is about 1/sqrt(2) of the 1-D limit, and the phase error depends on the
+# propagation angle (by symmetry, angles from 0 to 45 degrees cover all
+# directions).
+#
+# FD_2D_stability_limit and FD_2D_phase_error are cached per scheme (and
+# discretization), so a 2-D run can be configured at the largest stable
+# time step without repeating the analysis.
+#
+# Usage:
+# CFL=FD_2D_stability_limit(temporal_order,spatial_order,method)
+# dt=dx/cmax*0.9*CFL
+# error,angle=FD_2D_phase_error(temporal_order,spatial_order,c2,c1,method)
+# dispersion=FD_2D_dispersion(temporal_order,spatial_order,CFL,KH,angle,method)
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","1D"))
+from FD_taylor_coeff_func import coeff
+from FD_1D_dispersion_func import _physical_root, spatial_influence
+
+# Sampling of the wavenumbers in x and y (0..pi) and the angles (0..45 degrees)
+NK=65
+NANGLE=46
+
+_limits={}
+_errors={}
+
+def _key(temporal_order,spatial_order,method,coeff_spatial):
+    # Cache key of a scheme
+    if coeff_spatial is None:
+        coeff_spatial=coeff(spatial_order)
+    key=2 if method=="LW" else temporal_order
+    return((key,method=="LW",np.asarray(coeff_spatial,float).tobytes()))
+
+def _mu_2D(spatial_order,CFL,KHx,KHy,method,coeff_spatial):
+    # mu=CFL*|a| of the wavenumbers KHx and KHy
+    if coeff_spatial is None:
+        coeff_spatial=coeff(spatial_order)
+    CFL=np.asarray(CFL,float)
+    KHx=np.asarray(KHx,float)
+    KHy=np.asarray(KHy,float)
+    ax=spatial_influence(coeff_spatial,KHx)
+    ay=spatial_influence(coeff_spatial,KHy)
+    if method=="LW":
+        sx=np.sin(KHx/2.0)
+        sy=np.sin(KHy/2.0)
+        ax=ax-CFL**2/6.0*sx*(sx**2+sy**2)
+        ay=ay-CFL**2/6.0*sy*(sx**2+sy**2)
+    return(CFL*np.sqrt(ax**2+ay**2))
+
+def FD_2D_stability_limit(temporal_order,spatial_order,method="ABS",coeff_spatial=None):
+    # Largest stable CFL number for all wavenumbers and angles (cached)
+    key=_key(temporal_order,spatial_order,method,coeff_spatial)
+    if key in _limits:
+        return(_limits[key])
+    mu,amp,phase,mu_stable=_physical_root(temporal_order,method)
+    CFL=np.linspace(1e-3,2.0,2000)
+    # Wavenumbers with KHy<=KHx (symmetric in x and y)
+    KHx,KHy=np.meshgrid(np.linspace(0,np.pi,NK),np.linspace(0,np.pi,NK))
+    half=KHy<=KHx
+    mu_k=_mu_2D(spatial_order,CFL[:,None],KHx[half],KHy[half],method,coeff_spatial)
+    stable=np.all(mu_k<=mu_stable,axis=1)
+    if not stable[0]:
+        # Unstable for all sampled CFL numbers
+        _limits[key]=0.0
+    else:
+        _limits[key]=CFL[np.argmin(stable)-1] if not np.all(stable) else CFL[-1]
+    return(_limits[key])
+
+def FD_2D_check_stability(temporal_order,spatial_order,CFL,method="ABS",coeff_spatial=None):
+    # True where the scheme is stable for all wavenumbers and angles
+    return(np.asarray(CFL,float)<=FD_2D_stability_limit(temporal_order,spatial_order,method,coeff_spatial))
+
+def FD_2D_dispersion(temporal_order,spatial_order,CFL,KH,angle,method="ABS",coeff_spatial=None):
+    # Ratio between numerical wave velocity and model velocity for the
+    # propagation angle (in radians, against the x-axis), NaN if unstable
+    mu,amp,phase,mu_stable=_physical_root(temporal_order,method)
+    CFL=np.asarray(CFL,float)
+    KH=np.asarray(KH,float)
+    angle=np.asarray(angle,float)
+    mu_k=_mu_2D(spatial_order,CFL,KH*np.abs(np.cos(angle)),KH*np.abs(np.sin(angle)),method,coeff_spatial)
+    dispersion=2.0*np.interp(mu_k,mu,phase)/(CFL*KH)
+    stable=FD_2D_check_stability(temporal_order,spatial_order,CFL,method,coeff_spatial)
+    return(np.where(stable,dispersion,np.nan))
+
+def FD_2D_phase_error(temporal_order,spatial_order,CFL,c1,method="ABS",coeff_spatial=None,nk=32):
+    # Largest phase velocity error |dispersion-1| of all angles and of the
+    # wavenumbers up to 2*pi/c1 (c1 grid points per wavelength) and the
+    # angle in degrees at which it occurs (cached), inf if unstable
+    key=_key(temporal_order,spatial_order,method,coeff_spatial)+(float(CFL),float(c1),nk)
+    if key in _errors:
+        return(_errors[key])
+    angle=np.linspace(0,np.pi/4,NANGLE)
+    KH=2*np.pi/c1*np.arange(1,nk+1)/nk
+    dispersion=FD_2D_dispersion(temporal_order,spatial_order,CFL,KH[None,:],angle[:,None],method,coeff_spatial)
+    if np.any(np.isnan(dispersion)):
+        _errors[key]=(np.inf,np.nan)
+        return(_errors[key])
+    error=np.max(np.abs(dispersion-1.0),axis=1)
+    worst=np.argmax(error)
+    _errors[key]=(float(error[worst]),float(np.degrees(angle[worst])))
+    return(_errors[key])
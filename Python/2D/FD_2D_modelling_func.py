@@ -0,0 +1,571 @@
+## FD_2D_modelling_func.py 2-D acoustic Finite-Difference modelling
+# GNU General Public License v3.0
+#
+# Finite-Difference acoustic seismic wave simulation
+# Discretization of the first-order acoustic wave equation
+#
+# Vectorized 2-D modelling function for an arbitrary spatial order and
+# the temporal schemes of the 1-D modelling function (FD_1D_modelling):
+# temporal_order=2               Leapfrog
+# temporal_order=3, method="ABS" Adams-Bashforth
+# temporal_order=4, method="ABS" Adams-Bashforth
+# temporal_order=4, method="LW"  Lax-Wendroff
+#
+# The Lax-Wendroff correction dt^3/24*d^3/dt^3 is approximated for locally
+# homogeneous media by c^2/rho*grad(laplace(p)) for the velocity and by
+# lambda*c^2*laplace(div(v)) for the pressure, which reduces to the third
+# spatial derivative of the 1-D scheme.
+#
+# The Adams-Bashforth schemes keep the derivatives of the previous time
+# steps of p in x and y and of the divergence of v as full arrays.
+#
+# Optional cache-blocked (tiled) execution for large models:
+# The grid is split into tiles, which are small enough to keep all arrays of
+# a tile in the CPU cache. Each tile is copied together with a halo of
+# ghost points and advanced by several time steps at once (temporal
+# blocking), before the next tile is processed. The halo grows by the
+# stencil reach of every fused time step, so the tile interior stays exact,
+# and the results are identical to the non-tiled execution.
+#
+# backend="numexpr" evaluates every derivative and update as one fused
+# expression (see FD_numexpr_func), backend=None selects it automatically.
+# With dt_out, the seismograms are low-pass filtered and resampled to the
+# sample interval dt_out during the time stepping (see FD_recorder_func).
+# progress reports progress, ETA and throughput (see FD_progress_func).
+# live shows the wavefield and seismograms during the time stepping (see
+# FD_live_func).
+# modell_v and rho can also be file names of .npy files, which are read as
+# memory maps in chunks (see FD_model_func).
+#
+# Usage:
+# Seismogramm=FD_2D_modelling(modell_v,rho,dx,dt,q,xscr,yscr,xrec,yrec)
+# Seismogramm=FD_2D_modelling(...,spatial_order=8,temporal_order=4,method="ABS")
+# Seismogramm=FD_2D_modelling(...,tiled=True) # Tile size and fused steps auto-selected
+# returns the pressure seismograms with shape (number of receivers, nt).
+# If an array of the model size is given as wavefield, the pressure
+# wavefield after the last time step is copied into it.
+# refinement=True (or blocks from FD_grid_blocks) uses a coarser grid
+# spacing in bands of rows with higher velocities (see FD_grid_func), for
+# the leapfrog and Adams-Bashforth schemes (with the numpy backend).
+# stop=True ends the time stepping early when no more waves arrive at the
+# receivers (see FD_stop_func).
+# watchdog (default True) aborts unstable runs with a diagnostic and
+# returns None (see FD_watchdog_func), not with grid refinement.
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","1D"))
+from FD_numexpr_func import ne, select_backend, stencil_expression
+from FD_kernel_func import FD_kernel
+from FD_taylor_coeff_func import coeff
+from FD_recorder_func import FD_recorder, FD_record
+from FD_progress_func import FD_progress_start, FD_progress_update, FD_progress_finish
+from FD_live_func import FD_live_start, FD_live_update, FD_live_finish
+from FD_stop_func import FD_stop_start, FD_stop_check, FD_stop_distance
+from FD_watchdog_func import FD_watchdog_start, FD_watchdog_check
+from FD_1D_modelling_func import ABS_WEIGHTS
+from FD_model_func import FD_model_load, FD_model_coefficients
+from FD_grid_func import FD_grid_blocks, FD_grid_align, FD_grid_points, FD_grid_plane, FD_grid_average_2D, FD_grid_source_2D, FD_grid_receivers, FD_grid_nearest_2D
+
+# Rigid grid points at the model edges, as in FD_2D_DX4_DT2
+BOUNDARY=(5,4)
+
+# Taylor coefficients of the fourth-order staggered first derivative
+COEFF_DX4=np.array([9.0/8.0,-1.0/24.0])
+
+def _shift(s,n):
+    return(slice(s.start+n,s.stop+n))
+
+def forward_derivative(f,c,out,ky,kx,axis):
+    # out=sum_n c(n)*(f[k+n]-f[k-n+1]) along axis (0: y, 1: x) on ky,kx
+    # (generated kernel)
+    return(FD_kernel(c,2,axis,True)(f,out,(ky,kx)))
+
+def backward_derivative(f,c,out,ky,kx,axis):
+    # out=sum_n c(n)*(f[k+n-1]-f[k-n]) along axis (0: y, 1: x) on ky,kx
+    # (generated kernel)
+    return(FD_kernel(c,2,axis,False)(f,out,(ky,kx)))
+
+def laplacian(f,out,ky,kx):
+    # out=f[y,x+1]+f[y,x-1]+f[y+1,x]+f[y-1,x]-4*f[y,x] on ky,kx (times dx^2)
+    np.add(f[ky,_shift(kx,1)],f[ky,_shift(kx,-1)],out=out)
+    out+=f[_shift(ky,1),kx]
+    out+=f[_shift(ky,-1),kx]
+    out-=4*f[ky,kx]
+    return(out)
+
+def _update(f,D,history,weights,factor,u,k):
+    # f-=factor*sum_i weights(i)*D_i, D_0 is the current derivative and
+    # history[i-1][k] the derivatives of the previous time steps
+    if len(weights)==1:
+        D*=factor
+        f-=D
+        return
+    np.multiply(D,weights[0],out=u)
+    for w,h in zip(weights[1:],history):
+        u+=w*h[k]
+    u*=factor
+    f-=u
+    # The oldest derivative is replaced by the current one
+    history[-1][k]=D
+    history[:]=history[-1:]+history[:-1]
+
+def _reach(N,method):
+    # Grid points reached by the velocity or the pressure update
+    return(max(N,2) if method=="LW" else N)
+
+def _time_steps(vx,vy,p,history,s,ky,kx,q,n0,n1,src,rec,recorder,rec_index,backend,progress=None,
+                live=None,stop=None,watchdog=None):
+    # Advance the wavefields (global or tile) from time step n0 to n1-1.
+    # history are the previous derivatives of p in x, y and of div(v), s the
+    # coefficients of the scheme, ky,kx the updated grid points, src the
+    # source position or None and rec the receiver positions recorded into
+    # the rows rec_index of the recorder. progress and live are updated after
+    # every time step, stop and watchdog are checked and end the time steps
+    # early.
+    if backend=="numexpr":
+        _time_steps_numexpr(vx,vy,p,history,s,ky,kx,q,n0,n1,src,rec,recorder,rec_index,progress,live,stop,
+                            watchdog)
+        return
+    shape=(ky.stop-ky.start,kx.stop-kx.start)
+    D_x=np.empty(shape)
+    D_y=np.empty(shape)
+    u=np.empty(shape)
+    k=(ky,kx)
+    cx=s["cx"]
+    cy=s["cy"]
+    weights=s["weights"]
+    dt_rho=s["dt_rho"][k]
+    l_dt=s["l_dt"][k]
+    if s["method"]=="LW":
+        lw_v=s["lw_v"][k]
+        lw_p=s["lw_p"][k]
+        lap=np.empty((shape[0]+1,shape[1]+1))
+        div=np.empty((shape[0]+2,shape[1]+2))
+        ey=slice(ky.start-1,ky.stop+1)
+        ex=slice(kx.start-1,kx.stop+1)
+    for n in range(n0,n1):
+
+        # Update velocity
+        forward_derivative(p,cx,D_x,ky,kx,1)
+        forward_derivative(p,cy,D_y,ky,kx,0)
+        if s["method"]=="LW":
+            laplacian(p,lap,slice(ky.start,ky.stop+1),slice(kx.start,kx.stop+1))
+            vx[k]-=dt_rho*D_x+lw_v*(lap[:-1,1:]-lap[:-1,:-1])
+            vy[k]-=dt_rho*D_y+lw_v*(lap[1:,:-1]-lap[:-1,:-1])
+        else:
+            _update(vx[k],D_x,history[0],weights,dt_rho,u,k)
+            _update(vy[k],D_y,history[1],weights,dt_rho,u,k)
+
+        # Inject source wavelet
+        if src is not None:
+            p[src]=p[src]+q[n]
+
+        # Update pressure
+        backward_derivative(vx,cx,D_x,ky,kx,1)
+        backward_derivative(vy,cy,D_y,ky,kx,0)
+        D_x+=D_y
+        if s["method"]=="LW":
+            np.subtract(vx[ey,ex],vx[ey,_shift(ex,-1)],out=div)
+            div+=vy[ey,ex]
+            div-=vy[_shift(ey,-1),ex]
+            laplacian(div,D_y,slice(1,shape[0]+1),slice(1,shape[1]+1))
+            p[k]-=l_dt*D_x+lw_p*D_y
+        else:
+            _update(p[k],D_x,history[2],weights,l_dt,u,k)
+
+        # Save seismograms
+        if rec_index.size:
+            FD_record(recorder,n,p[rec],rec_index)
+        if progress is not None:
+            FD_progress_update(progress,n)
+        if live is not None:
+            FD_live_update(live,n,p,recorder["Seismogramm"])
+        if stop is not None and FD_stop_check(stop,n,(p[k],vx[k],vy[k]),recorder):
+            break
+        if watchdog is not None and FD_watchdog_check(watchdog,n,p[k]):
+            break
+
+def _time_steps_numexpr(vx,vy,p,history,s,ky,kx,q,n0,n1,src,rec,recorder,rec_index,progress=None,
+                        live=None,stop=None,watchdog=None):
+    # Same as _time_steps, every derivative and update is one numexpr expression
+    cx=s["cx"]
+    cy=s["cy"]
+    N=cx.size
+    k=(ky,kx)
+    weights=s["weights"]
+    d={"vx_k":vx[k],"vy_k":vy[k],"p_k":p[k],"dt_rho":s["dt_rho"][k],"l_dt":s["l_dt"][k]}
+    D_px=stencil_expression(cx,[p[ky,_shift(kx,n)] for n in range(1,N+1)],
+                            [p[ky,_shift(kx,1-n)] for n in range(1,N+1)],"px",d)
+    D_py=stencil_expression(cy,[p[_shift(ky,n),kx] for n in range(1,N+1)],
+                            [p[_shift(ky,1-n),kx] for n in range(1,N+1)],"py",d)
+    D_vx=stencil_expression(cx,[vx[ky,_shift(kx,n-1)] for n in range(1,N+1)],
+                            [vx[ky,_shift(kx,-n)] for n in range(1,N+1)],"vx",d)
+    D_vy=stencil_expression(cy,[vy[_shift(ky,n-1),kx] for n in range(1,N+1)],
+                            [vy[_shift(ky,-n),kx] for n in range(1,N+1)],"vy",d)
+    if s["method"]=="LW":
+        # Laplacian of p and of div(v) on the updated grid points plus one
+        shape=(ky.stop-ky.start,kx.stop-kx.start)
+        lap=np.empty((shape[0]+1,shape[1]+1))
+        div=np.empty((shape[0]+2,shape[1]+2))
+        ly=slice(ky.start,ky.stop+1)
+        lx=slice(kx.start,kx.stop+1)
+        ey=slice(ky.start-1,ky.stop+1)
+        ex=slice(kx.start-1,kx.stop+1)
+        d.update(lw_v=s["lw_v"][k],lw_p=s["lw_p"][k],lap_c=lap[:-1,:-1],lap_x=lap[:-1,1:],
+                 lap_y=lap[1:,:-1],div_c=div[1:-1,1:-1],div_l=div[1:-1,:-2],div_r=div[1:-1,2:],
+                 div_b=div[:-2,1:-1],div_t=div[2:,1:-1])
+        e={"c":p[ly,lx],"l":p[ly,_shift(lx,-1)],"r":p[ly,_shift(lx,1)],
+           "b":p[_shift(ly,-1),lx],"t":p[_shift(ly,1),lx]}
+        f={"vx":vx[ey,ex],"vx_l":vx[ey,_shift(ex,-1)],"vy":vy[ey,ex],"vy_b":vy[_shift(ey,-1),ex]}
+        update_vx="vx_k-dt_rho*("+D_px+")-lw_v*(lap_x-lap_c)"
+        update_vy="vy_k-dt_rho*("+D_py+")-lw_v*(lap_y-lap_c)"
+        update_p="p_k-l_dt*("+D_vx+"+"+D_vy+")-lw_p*(div_l+div_r+div_b+div_t-4*div_c)"
+    elif len(weights)==1:
+        update_vx="vx_k-dt_rho*("+D_px+")"
+        update_vy="vy_k-dt_rho*("+D_py+")"
+        update_p="p_k-l_dt*("+D_vx+"+"+D_vy+")"
+    else:
+        # Adams-Bashforth: derivative into D, then update with D and the history h<j>
+        D=np.empty((ky.stop-ky.start,kx.stop-kx.start))
+        d["D"]=D
+        ab="%r*D+"%weights[0]+"+".join("%r*h%d"%(w,j) for j,w in enumerate(weights[1:]))
+        update_vx="vx_k-dt_rho*("+ab+")"
+        update_vy="vy_k-dt_rho*("+ab+")"
+        update_p="p_k-l_dt*("+ab+")"
+    for n in range(n0,n1):
+        if s["method"]=="LW":
+            ne.evaluate("l+r+b+t-4*c",local_dict=e,out=lap)
+            ne.evaluate(update_vx,local_dict=d,out=d["vx_k"])
+            ne.evaluate(update_vy,local_dict=d,out=d["vy_k"])
+            if src is not None:
+                p[src]=p[src]+q[n]
+            ne.evaluate("vx-vx_l+vy-vy_b",local_dict=f,out=div)
+            ne.evaluate(update_p,local_dict=d,out=d["p_k"])
+        elif len(weights)==1:
+            ne.evaluate(update_vx,local_dict=d,out=d["vx_k"])
+            ne.evaluate(update_vy,local_dict=d,out=d["vy_k"])
+            if src is not None:
+                p[src]=p[src]+q[n]
+            ne.evaluate(update_p,local_dict=d,out=d["p_k"])
+        else:
+            for expr,update,f,h in ((D_px,update_vx,"vx_k",history[0]),(D_py,update_vy,"vy_k",history[1])):
+                ne.evaluate(expr,local_dict=d,out=D)
+                d.update(("h%d"%j,a[k]) for j,a in enumerate(h))
+                ne.evaluate(update,local_dict=d,out=d[f])
+                h[-1][k]=D
+                h[:]=h[-1:]+h[:-1]
+            if src is not None:
+                p[src]=p[src]+q[n]
+            h=history[2]
+            ne.evaluate(D_vx+"+"+D_vy,local_dict=d,out=D)
+            d.update(("h%d"%j,a[k]) for j,a in enumerate(h))
+            ne.evaluate(update_p,local_dict=d,out=d["p_k"])
+            h[-1][k]=D
+            h[:]=h[-1:]+h[:-1]
+        if rec_index.size:
+            FD_record(recorder,n,p[rec],rec_index)
+        if progress is not None:
+            FD_progress_update(progress,n)
+        if live is not None:
+            FD_live_update(live,n,p,recorder["Seismogramm"])
+        if stop is not None and FD_stop_check(stop,n,(p[k],vx[k],vy[k]),recorder):
+            break
+        if watchdog is not None and FD_watchdog_check(watchdog,n,p[k]):
+            break
+
+def _refined_update(f,factor,history,weights,u):
+    # f-=factor*sum_i weights(i)*history[i] (flat arrays of the block grid)
+    np.multiply(history[0],weights[0],out=u)
+    for w,h in zip(weights[1:],history[1:]):
+        u+=w*h
+    u*=factor
+    f-=u
+
+def _refined_time_steps(modell_v,rho,dt,c,weights,q,xscr,yscr,xrec,yrec,blocks,recorder,progress,live):
+    # Time stepping on the block grid (bands of rows, see FD_grid_func):
+    # pressure and velocities of all blocks in flat arrays, every block is
+    # an array with ghost rows and zero columns at both sides. The pressure
+    # ghost rows are interpolated before the velocity update, the divergence
+    # of vy is the adjoint of this gradient (ghost values added back with the
+    # interpolation weights), so the energy is conserved. The rigid grid
+    # points of the model edges are grid points with zero coefficients.
+    # Returns the pressure at the nearest grid points of the model grid points.
+    N=c.size
+    ny,nx=np.shape(modell_v)
+    nt=np.size(q)
+    blocks=FD_grid_align(blocks)
+    P=FD_grid_plane(blocks,ny,nx,N)
+    VX=FD_grid_plane(blocks,ny,nx,N,0.0,0.5)
+    VY=FD_grid_plane(blocks,ny,nx,N,0.5,0.0)
+    vx,vy,p,u=[np.zeros(P["size"]) for i in range(4)]
+
+    def view(f,k,rows,cols):
+        # Grid points (rows, cols) of block k of the flat array f
+        a=P["starts"][k]
+        return(f[a:a+P["shapes"][k][0]*P["shapes"][k][1]].reshape(P["shapes"][k])[rows,cols])
+
+    def coefficient(G,values,lo,hi):
+        # values at the grid points of G inside the rigid boundary
+        out=np.zeros(P["size"])
+        y,x=G["y_positions"],G["x_positions"]
+        inside=(y>=lo[0])&(y<ny-hi[0])&(x>=lo[1])&(x<nx-hi[1])
+        out[G["index"]]=np.where(inside,values,0.0)
+        return(out)
+
+    def rowwise(values):
+        # Flat array with the values of the rows of the axis
+        return(np.concatenate([np.repeat(values[a:a+r],m) for a,(r,m) in zip(P["axis"]["base"],P["shapes"])]))
+
+    # Coefficients at the grid points (zero at the ghost and rigid grid
+    # points): density and l averaged over the cells (arithmetic and
+    # harmonic mean), vy weighted with the cell sizes in y and the
+    # divergence in y divided by the cell sizes of the pressure
+    B0,B1=BOUNDARY
+    dt_rho_x=coefficient(VX,dt/FD_grid_average_2D(VX,rho,0.5,0.0,blocks=blocks),(B0,B0+0.5),(B1,B1-0.5))
+    dt_rho_y=coefficient(VY,dt/FD_grid_average_2D(VY,rho,0.0,0.5),(B0+0.5,B0),(B1-0.5,B1))
+    l_dt=coefficient(P,FD_grid_average_2D(P,rho*modell_v**2,0.5,0.5,True,blocks)*dt,(B0,B0),(B1,B1))
+    weight=np.zeros(VY["axis"]["size"])
+    weight[VY["axis"]["index"]]=VY["axis"]["volume"]
+    weight=rowwise(weight)
+    inverse=np.zeros(P["axis"]["size"])
+    inverse[P["axis"]["index"]]=1.0/(P["axis"]["volume"]*P["axis"]["spacing"])
+    inverse=rowwise(inverse)
+
+    # Source (distributed) and receivers (interpolated)
+    src,w_src=FD_grid_source_2D(P,yscr,xscr)
+    rec,w_rec=FD_grid_receivers(P,np.asarray(yrec,float),np.asarray(xrec,float))
+    show=FD_grid_nearest_2D(P,ny,nx) if live is not None else None
+
+    ghosts,sources,ghost_weights=P["ghosts"],P["sources"].ravel(),P["weights"]
+    history=[[np.zeros(P["size"]) for w in weights] for i in range(3)]
+    D_x=[np.zeros((P["rows"][k].stop-P["rows"][k].start,P["cols"][k].stop-P["cols"][k].start)) for k in range(len(blocks))]
+    for n in range(2,nt):
+
+        # Update velocity
+        p[ghosts]=(p[sources].reshape(ghost_weights.shape)*ghost_weights).sum(1)
+        for k,(s,e,f) in enumerate(blocks):
+            p_k=view(p,k,slice(None),slice(None))
+            forward_derivative(p_k,c/f,view(history[0][0],k,VX["rows"][k],VX["cols"][k]),VX["rows"][k],VX["cols"][k],1)
+            forward_derivative(p_k,c/f,view(history[1][0],k,VY["rows"][k],VY["cols"][k]),VY["rows"][k],VY["cols"][k],0)
+        _refined_update(vx,dt_rho_x,history[0],weights,u)
+        _refined_update(vy,dt_rho_y,history[1],weights,u)
+
+        # Inject source wavelet
+        p[src]+=w_src*q[n]
+
+        # Update pressure (divergence in y at the grid points and ghost rows,
+        # ghost values added to the grid points they are interpolated from)
+        D=history[2][0]
+        np.multiply(vy,weight,out=u)
+        for k,(s,e,f) in enumerate(blocks):
+            rows=slice(P["rows"][k].start-N,P["rows"][k].stop+N)
+            backward_derivative(view(u,k,slice(None),slice(None)),c,view(D,k,rows,P["cols"][k]),rows,P["cols"][k],0)
+        D+=np.bincount(sources,(D[ghosts][:,None]*ghost_weights).ravel(),P["size"])
+        D*=inverse
+        for k,(s,e,f) in enumerate(blocks):
+            backward_derivative(view(vx,k,slice(None),slice(None)),c/f,D_x[k],P["rows"][k],P["cols"][k],1)
+            view(D,k,P["rows"][k],P["cols"][k])[...]+=D_x[k]
+        _refined_update(p,l_dt,history[2],weights,u)
+        for h in history:
+            h.insert(0,h.pop())
+
+        # Save seismograms
+        FD_record(recorder,n,(p[rec]*w_rec).sum(1))
+        if progress is not None:
+            FD_progress_update(progress,n)
+        if live is not None:
+            FD_live_update(live,n,p[show],recorder["Seismogramm"])
+    return(p[FD_grid_nearest_2D(P,ny,nx)])
+
+def _cache_size():
+    # Size of the L2 cache in bytes (Linux), 1 MiB if unknown
+    try:
+        with open("/sys/devices/system/cpu/cpu0/cache/index2/size") as f:
+            size=f.read().strip()
+        return(int(size[:-1])*{"K":2**10,"M":2**20}[size[-1]])
+    except (OSError,ValueError,KeyError):
+        return(2**20)
+
+def FD_2D_tile_size(nx,ny,reach,fused_steps=None,cache_size=None,arrays=10):
+    # Tile edge length and number of fused time steps. Roughly ten arrays of
+    # the tile including its halo (fields, coefficients, derivatives and
+    # temporaries) should fit into the cache; the halo is reach*fused_steps.
+    if cache_size is None:
+        cache_size=_cache_size()
+    side=int(np.sqrt(cache_size/(arrays*8)))
+    if fused_steps is None:
+        # Keep the redundant halo work below about 50 %
+        fused_steps=max(1,int(side/(2*reach*4.5)))
+    halo=reach*fused_steps
+    tile=max(side-2*halo,2*halo,16)
+    return(min(tile,max(nx,ny)),fused_steps)
+
+def FD_2D_modelling(modell_v,rho,dx,dt,q,xscr,yscr,xrec,yrec,spatial_order=4,
+                    temporal_order=2,method="ABS",coeff_spatial=None,
+                    tiled=False,tile=None,fused_steps=None,wavefield=None,backend=None,
+                    dt_out=None,progress=None,live=None,refinement=None,stop=None,watchdog=True):
+    ## Check some conditions
+    if temporal_order not in ABS_WEIGHTS or (method=="LW" and temporal_order!=4):
+        print("Error: FD_2D_modelling")
+        print("Supported are temporal_order=2,3,4 (ABS) and 4 (LW)!")
+        return
+    refined=refinement is not None and refinement is not False
+    if refined and (method=="LW" or tiled):
+        print("Error: FD_2D_modelling")
+        print("Grid refinement is supported for the leapfrog and Adams-Bashforth schemes without tiles!")
+        return
+    if refined and stop is not None and stop is not False:
+        print("Error: FD_2D_modelling")
+        print("Early termination is not supported with grid refinement!")
+        return
+    if coeff_spatial is None:
+        coeff_spatial=COEFF_DX4 if spatial_order==4 else coeff(spatial_order)
+        if coeff_spatial is None:
+            return
+
+    ## Preparation
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    ny0,nx0=np.shape(modell_v)
+    nt=np.size(q)
+    cx=np.asarray(coeff_spatial,float)/dx
+    cy=cx # dy=dx
+    N=cx.size
+    backend=select_backend(backend,nx0*ny0)
+    if backend is None:
+        return
+
+    # Grid refinement: the wavefields are only kept on the block grid
+    if refined:
+        blocks=FD_grid_blocks(modell_v) if refinement is True else refinement
+        recorder=FD_recorder(np.size(xrec),nt,dt,dt_out)
+        if blocks is None or recorder is None:
+            return
+        progress=FD_progress_start(progress,nt,int(FD_grid_points(blocks,(ny0,nx0))*ny0*nx0))
+        live=FD_live_start(live,nt,dt,(ny0,nx0))
+        p=_refined_time_steps(modell_v,rho,dt,cx,ABS_WEIGHTS[temporal_order],q,xscr,yscr,
+                              xrec,yrec,blocks,recorder,progress,live)
+        FD_progress_finish(progress,nt-1)
+        FD_live_finish(live,nt-1,p,recorder["Seismogramm"])
+        if wavefield is not None:
+            wavefield[...]=p
+        return(recorder["Seismogramm"])
+
+    # Long stencils get additional ghost points (pad) outside the model,
+    # so the rigid boundary does not depend on the order
+    pad=max(_reach(N,method)-min(BOUNDARY),0)
+    ny,nx=ny0+2*pad,nx0+2*pad
+    xscr=xscr+pad
+    yscr=yscr+pad
+    xrec=np.asarray(xrec,int)+pad
+    yrec=np.asarray(yrec,int)+pad
+
+    # Init wavefields
+    vx=np.zeros((ny,nx))
+    vy=np.zeros((ny,nx))
+    p=np.zeros((ny,nx))
+
+    # Derived coefficients, calculated in chunks of the model, with the
+    # Lax-Wendroff correction (c9=dt^3/24, see FD_1D_DX4_DT4_LW)
+    s={"cx":cx,"cy":cy,"method":method}
+    s["weights"]=ABS_WEIGHTS[2] if method=="LW" else ABS_WEIGHTS[temporal_order]
+    c9=dt**3/24.0/dx**3 if method=="LW" else None
+    model=FD_model_coefficients(modell_v,rho,dt,c9,pad=pad)
+    if model is None:
+        return
+    s.update(model)
+
+    # Derivatives of the previous time steps for the Adams-Bashforth method
+    history=[[np.zeros((ny,nx)) for w in s["weights"][1:]] for i in range(3)]
+
+    # Updated grid points
+    ky=slice(BOUNDARY[0]+pad,ny-BOUNDARY[1]-pad)
+    kx=slice(BOUNDARY[0]+pad,nx-BOUNDARY[1]-pad)
+
+    # Init Seismograms
+    recorder=FD_recorder(xrec.size,nt,dt,dt_out)
+    if recorder is None:
+        return
+
+    ## Time stepping
+    progress=FD_progress_start(progress,nt,(ky.stop-ky.start)*(kx.stop-kx.start))
+    live=FD_live_start(live,nt,dt,(ny0,nx0),(slice(pad,pad+ny0),slice(pad,pad+nx0)))
+    k=(ky,kx)
+    if stop is not None and stop is not False:
+        distance=FD_stop_distance((np.arange(ky.start,ky.stop)[:,None],np.arange(kx.start,kx.stop)),(yrec,xrec),dx)
+        stop=FD_stop_start(stop,nt,dt,q,(s["l_dt"][k],s["dt_rho"][k],s["dt_rho"][k]),distance,N*dx)
+    watchdog=FD_watchdog_start(watchdog,dt,dx,q,np.sqrt((s["l_dt"][k]*s["dt_rho"][k]).max())/dt,
+                               (temporal_order,spatial_order,method,coeff_spatial,2),(ky.start-pad,kx.start-pad))
+    if not tiled:
+        _time_steps(vx,vy,p,history,s,ky,kx,q,2,nt,(yscr,xscr),
+                    (yrec,xrec),recorder,np.arange(xrec.size),backend,progress,live,stop,watchdog)
+    else:
+        # A full time step reaches twice the grid points of one update
+        R=_reach(N,method)
+        reach=2*R
+        if tile is None or fused_steps is None:
+            auto_tile,auto_steps=FD_2D_tile_size(nx,ny,reach,fused_steps,
+                                                 arrays=10+3*len(history[0]))
+            tile=auto_tile if tile is None else tile
+            fused_steps=auto_steps if fused_steps is None else fused_steps
+        halo=reach*fused_steps
+        # Wavefields and history after the block of fused time steps
+        state=[vx,vy,p]+history[0]+history[1]+history[2]
+        state_new=[np.zeros((ny,nx)) for f in state]
+        m=len(history[0])
+        # Coefficients of the tile (global arrays are sliced per tile)
+        coefficients=("dt_rho","l_dt","lw_v","lw_p")
+        for n0 in range(2,nt,fused_steps):
+            n1=min(n0+fused_steps,nt)
+            for ty in range(0,ny,tile):
+                for tx in range(0,nx,tile):
+                    # Tile interior and tile with halo (global indices)
+                    iy=slice(ty,min(ty+tile,ny))
+                    ix=slice(tx,min(tx+tile,nx))
+                    ey=slice(max(ty-halo,0),min(ty+tile+halo,ny))
+                    ex=slice(max(tx-halo,0),min(tx+tile+halo,nx))
+                    # Updated grid points inside the tile (local indices)
+                    lky=slice(max(ky.start,ey.start+R)-ey.start,min(ky.stop,ey.stop-R)-ey.start)
+                    lkx=slice(max(kx.start,ex.start+R)-ex.start,min(kx.stop,ex.stop-R)-ex.start)
+                    if lky.stop<=lky.start or lkx.stop<=lkx.start:
+                        for f,f_new in zip(state,state_new):
+                            f_new[iy,ix]=f[iy,ix]
+                        continue
+                    t=[f[ey,ex].copy() for f in state]
+                    s_t=dict(s)
+                    s_t.update((c,s[c][ey,ex]) for c in coefficients if c in s)
+                    src=None
+                    if ey.start<=yscr<ey.stop and ex.start<=xscr<ex.stop:
+                        src=(yscr-ey.start,xscr-ex.start)
+                    inside=np.nonzero((yrec>=iy.start)&(yrec<iy.stop)&(xrec>=ix.start)&(xrec<ix.stop))[0]
+                    rec=(yrec[inside]-ey.start,xrec[inside]-ex.start)
+                    h_t=[t[3:3+m],t[3+m:3+2*m],t[3+2*m:]]
+                    _time_steps(t[0],t[1],t[2],h_t,s_t,lky,lkx,
+                                q,n0,n1,src,rec,recorder,inside,backend)
+                    # Write back the tile interior (history in the rotated order)
+                    jy=slice(iy.start-ey.start,iy.stop-ey.start)
+                    jx=slice(ix.start-ex.start,ix.stop-ex.start)
+                    for f,f_new in zip(t[:3]+h_t[0]+h_t[1]+h_t[2],state_new):
+                        f_new[iy,ix]=f[jy,jx]
+            state,state_new=state_new,state
+            if progress is not None:
+                FD_progress_update(progress,n1-1)
+            if live is not None:
+                FD_live_update(live,n1-1,state[2],recorder["Seismogramm"])
+            if stop is not None and FD_stop_check(stop,n1-1,(state[2][k],state[0][k],state[1][k]),recorder):
+                break
+            if watchdog is not None and FD_watchdog_check(watchdog,n1-1,state[2][k]):
+                break
+        p=state[2]
+
+    last=nt-1 if stop is None else stop["last"]
+    if watchdog is not None and watchdog["failed"]:
+        last=watchdog["checked"]
+    FD_progress_finish(progress,last)
+    FD_live_finish(live,last,p,recorder["Seismogramm"])
+    if wavefield is not None:
+        wavefield[...]=p[pad:pad+ny0,pad:pad+nx0]
+    if watchdog is not None and watchdog["failed"]:
+        return
+    return(recorder["Seismogramm"])
@@ -0,0 +1,35 @@
+## FD_2D_stability.py 2-D FD stability and dispersion calculation
+# GNU General Public License v3.0
+#
+# Calculate the stability limit of the 2-D FD-simulations (FD_2D_modelling)
+# and the largest phase velocity error of all propagation angles
+#
+# Stability limit is calculated in terms of the CFL-number, which is
+# defined as: CFL=v_(max)*DT/DX
+# You get the maximum DT by DT=CFL*DX/v_(max)
+# In 2-D, the limit is about 1/sqrt(2) of the 1-D limit (FD_1D_stability.py).
+#
+# Theory: see FD_2D_dispersion_func.py
+
+## Initialisation
+from FD_2D_dispersion_func import FD_2D_stability_limit, FD_2D_phase_error
+from FD_1D_modelling_func import scheme_name
+print(" ")
+print("Starting FD_2D_stability")
+
+## Input Parameter
+spatial_order=4
+c1=20   # Number of grid points per dominant wavelength
+c2=0.5  # CFL-Number
+
+print("You choose a spatial order of ",spatial_order)
+for temporal_order,method in [(2,"ABS"),(3,"ABS"),(4,"ABS"),(4,"LW")]:
+    CFL=FD_2D_stability_limit(temporal_order,spatial_order,method)
+    error,angle=FD_2D_phase_error(temporal_order,spatial_order,c2,c1,method)
+    print(scheme_name(spatial_order,temporal_order,method),"has the stability limit CFL=",CFL)
+    if c2>CFL:
+        print("   c2=",c2,"is above the stability limit, no phase velocity error")
+    else:
+        print("   Largest phase velocity error (c1=",c1,", c2=",c2,"):",error,"at",angle,"degrees")
+
+print(" ")
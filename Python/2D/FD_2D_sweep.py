@@ -0,0 +1,40 @@
+## FD_2D_sweep.py 2-D acoustic Finite-Difference modelling
+# GNU General Public License v3.0
+#
+# Parameter sweep over the discretization (c1, c2) and the scheme of
+# FD_2D_modelling on the model of FD_2D_DX4_DT2_fast, in parallel worker
+# processes (see FD_sweep_func). The seismograms and runtimes of the
+# finished points are stored in the directory of the sweep, an
+# interrupted sweep continues with the missing points when the script is
+# started again.
+
+## Initialisation
+import numpy as np
+from FD_2D_modelling_func import FD_2D_modelling
+from FD_sweep_func import FD_sweep, FD_sweep_points, FD_sweep_table
+print(" ")
+print("Starting FD_2D_sweep")
+
+## Input Parameter
+
+# Parameter grid: every combination is one run
+grid={"c1":[10,20],
+      "c2":[0.3,0.5],
+      "spatial_order":[4,8],
+      "temporal_order":[2,4]}
+
+# Model, source and receivers (in grid points), as in FD_2D_DX4_DT2_fast
+nx=200
+ny=200
+modell_v=3000*np.ones((ny,nx))
+rho=2.2*np.ones((ny,nx))
+setup={"f0":5,"T":1,"xscr":100,"yscr":100,"xrec":[100,100,100],"yrec":[80,100,120]}
+
+directory="Seismograms/FD_2D_sweep" # Results of the finished points
+workers=None                        # Number of processes (None: number of cores)
+
+## Run the sweep
+if __name__=="__main__":
+    results=FD_sweep(FD_2D_modelling,modell_v,rho,FD_sweep_points(grid),setup,directory,workers)
+    FD_sweep_table(results)
+    print(" ")
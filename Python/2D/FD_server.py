@@ -0,0 +1,27 @@
+## FD_server.py local job server for the 1-D and 2-D modelling
+# GNU General Public License v3.0
+#
+# Starts the job server of FD_server_func: run configurations submitted
+# over HTTP (TCP or Unix socket) are queued by priority and run in a pool
+# of worker processes. Results are kept in the job directory, identical
+# jobs are only run once.
+#
+# Usage (other Python session, see FD_server_func):
+# from FD_server_func import FD_job_submit, FD_job_status, FD_job_result
+# job=FD_job_submit({"dim":1,"c1":10,"spatial_order":8,"priority":1})
+# Seismogramm=FD_job_result(job["id"])
+
+## Initialisation
+from FD_server_func import FD_server
+print(" ")
+print("Starting FD_server")
+
+## Input Parameter
+address="127.0.0.1:8765"   # host:port or unix:<path of the socket>
+workers=None               # Number of worker processes (None: number of cores)
+directory="Seismograms/Jobs" # Seismograms and metadata of the jobs
+model_dir="Models"         # Model files (.npy), which jobs can use by their name
+
+## Run the server (stop with Ctrl+C)
+if __name__=="__main__":
+    FD_server(address,workers,directory,model_dir)
@@ -0,0 +1,391 @@
+## FD_server_func.py local job server for the 1-D and 2-D modelling
+# GNU General Public License v3.0
+#
+# asyncio HTTP server (TCP or Unix socket) which runs modelling jobs of
+# several users on one workstation in a pool of worker processes (one per
+# core by default, numexpr single-threaded), so the cores are never
+# oversubscribed. Jobs wait in a priority queue (higher priority first,
+# equal priorities in order of submission).
+#
+# A job is a JSON run configuration as the input parameters of the
+# scripts: "dim" (1 or 2), c1, c2, T, f0, q0, nx (, ny), xscr (, yscr), xrec
+# (, yrec), modell_v and rho (number for a homogeneous model, list, or file
+# name of a .npy file in the model directory of the server, default: the
+# model of FD_1D_DX4_DT2 or FD_2D_DX4_DT2), any keyword of FD_1D_modelling
+# or FD_2D_modelling (e.g. spatial_order, temporal_order, method, dt_out,
+# tiled) and "priority". The other arguments of the modelling functions
+# (dx, dt, q) are calculated by the server and cannot be given. Model files are only given by their name (no
+# directories, absolute paths or ".."), so clients can only read the
+# models of the model directory. The job id is a hash of the configuration
+# (without priority) and of the size and modification time of the model
+# files: a job which is identical to a queued, running or finished job
+# (also from an earlier server run, results are kept in the job directory)
+# is not run again, the id of the existing job is returned. An unstable run is aborted
+# by the watchdog (see FD_watchdog_func), the job fails with the diagnostic
+# as error and the worker is free for the next job.
+#
+# HTTP interface (JSON):
+# POST   /jobs                  submit a configuration, returns id and status
+# GET    /jobs                  status of all jobs
+# GET    /jobs/<id>             status and progress (see FD_progress_func)
+# GET    /jobs/<id>/seismograms seismograms as .npy file
+# DELETE /jobs/<id>             cancel a queued job
+#
+# Usage:
+# FD_server("127.0.0.1:8765",model_dir="Models") # or FD_server("unix:/tmp/fd.sock")
+# job=FD_job_submit({"dim":2,"c1":10,"spatial_order":8},"127.0.0.1:8765")
+# Seismogramm=FD_job_result(job["id"],"127.0.0.1:8765") # Waits for the job
+import io
+import os
+import json
+import time
+import socket
+import asyncio
+import hashlib
+import inspect
+import http.client
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from FD_2D_modelling_func import FD_2D_modelling
+from FD_1D_modelling_func import FD_1D_modelling
+from FD_model_func import FD_model_load, FD_model_range
+from FD_progress_func import FD_progress
+from FD_watchdog_func import FD_watchdog
+from FD_numexpr_func import ne
+
+JOB_DIR="Jobs"
+MODEL_DIR="Models" # Directory of the model files of the jobs
+PROGRESS_INTERVAL=1.0 # Interval of the progress reports of a job in s
+
+# Input parameters of the scripts and their defaults
+DEFAULTS={1:{"c1":20,"c2":0.5,"T":10,"f0":10,"q0":1,"nx":2000,
+             "xscr":100,"xrec":[400,800,1800],"modell_v":None,"rho":None},
+          2:{"c1":20,"c2":0.5,"T":1,"f0":5,"q0":1,"nx":200,"ny":200,"xscr":100,"yscr":100,
+             "xrec":[100,100,100],"yrec":[80,100,120],"modell_v":3000.0,"rho":2.2}}
+MODELLING={1:FD_1D_modelling,2:FD_2D_modelling}
+
+def _model_file(name,model_dir):
+    # Path of a model file in the model directory, or an error message
+    if (os.path.isabs(name) or os.path.basename(name)!=name or name in ("",".","..")
+            or (os.path.altsep is not None and os.path.altsep in name)):
+        return(None,"Model files have to be given by their name in the model directory!")
+    filename=os.path.join(model_dir,name)
+    if not os.path.isfile(filename):
+        return(None,"Model file "+name+" not found!")
+    return(filename,None)
+
+def _config(config,model_dir=MODEL_DIR):
+    # Complete configuration with defaults, or an error message
+    if not isinstance(config,dict):
+        return(None,"Configuration has to be a JSON object!")
+    dim=config.get("dim",2)
+    if dim not in DEFAULTS:
+        return(None,"dim has to be 1 or 2!")
+    c=dict(DEFAULTS[dim])
+    c.update(config)
+    c["dim"]=dim
+    c["priority"]=config.get("priority",0)
+    keywords=inspect.signature(MODELLING[dim]).parameters
+    for k in c:
+        if k not in DEFAULTS[dim] and k not in ("dim","priority") and k not in keywords:
+            return(None,"Unknown parameter "+k+"!")
+        if k not in DEFAULTS[dim] and k in keywords and keywords[k].default is inspect.Parameter.empty:
+            return(None,"Parameter "+k+" is calculated by the server (from c1, c2, T, f0, q0 and the model)!")
+    for k in ("progress","live","wavefield"):
+        if k in config:
+            return(None,"Parameter "+k+" is not supported by the server!")
+    for k in ("modell_v","rho"):
+        if isinstance(c[k],str):
+            filename,error=_model_file(c[k],model_dir)
+            if filename is None:
+                return(None,error)
+    return(c,None)
+
+def _job_id(config,model_dir=MODEL_DIR):
+    # Hash of the configuration without the priority and of the size and
+    # modification time of the model files
+    c=dict((k,v) for k,v in config.items() if k!="priority")
+    files=[]
+    for k in ("modell_v","rho"):
+        if isinstance(config[k],str):
+            stat=os.stat(os.path.join(model_dir,config[k]))
+            files.append([config[k],stat.st_size,stat.st_mtime_ns])
+    text=json.dumps({"config":c,"files":files},sort_keys=True)
+    return(hashlib.sha256(text.encode()).hexdigest()[:16])
+
+def _model(value,shape,default,model_dir):
+    # Model from a number, a list or a .npy file of the model directory
+    if value is None:
+        return(default)
+    if isinstance(value,str):
+        return(FD_model_load(os.path.join(model_dir,value)))
+    if np.ndim(value)==0:
+        return(value*np.ones(shape))
+    return(np.asarray(value,float))
+
+def _init_worker():
+    # One thread per worker process, the pool uses all cores
+    if ne is not None:
+        ne.set_num_threads(1)
+
+def _run_job(c,filename,model_dir=MODEL_DIR):
+    # Run a job in a worker process, stores seismograms and metadata
+    dim=c["dim"]
+    shape=(c["nx"],) if dim==1 else (c["ny"],c["nx"])
+    nx=c["nx"]
+    two_layer=lambda a,b: np.hstack((a*np.ones(int(nx/2)),b*np.ones(nx-int(nx/2))))
+    modell_v=_model(c["modell_v"],shape,two_layer(1000.0,1500.0),model_dir)
+    rho=_model(c["rho"],shape,two_layer(1.0,1.5),model_dir)
+    cmin,cmax=FD_model_range(modell_v)
+    fmax=2*c["f0"]
+    dx=cmin/(fmax*c["c1"])
+    dt=dx/cmax*c["c2"]
+    t=np.arange(0,c["T"],dt)
+    tau=np.pi*c["f0"]*(t-1.5/c["f0"])
+    q=c["q0"]*(1.0-2.0*tau**2.0)*np.exp(-tau**2)
+    kwargs=dict((k,v) for k,v in c.items() if k not in DEFAULTS[dim] and k not in ("dim","priority"))
+    progress=FD_progress(PROGRESS_INTERVAL,file=filename+".progress",quiet=True)
+    # Diagnostic of an unstable run as error of the job
+    reports=[]
+    watchdog=kwargs.get("watchdog",True)
+    if watchdog is not None and watchdog is not False:
+        kwargs["watchdog"]=dict(FD_watchdog() if watchdog is True else watchdog,callback=reports.append)
+    start=time.perf_counter()
+    if dim==1:
+        Seismogramm=FD_1D_modelling(modell_v,rho,dx,dt,q,c["xscr"],c["xrec"],progress=progress,**kwargs)
+    else:
+        Seismogramm=FD_2D_modelling(modell_v,rho,dx,dt,q,c["xscr"],c["yscr"],c["xrec"],c["yrec"],
+                                    progress=progress,**kwargs)
+    runtime=time.perf_counter()-start
+    if Seismogramm is None:
+        raise ValueError(reports[0]["message"] if reports else "Modelling failed, see the output of the server")
+    meta={"dx":dx,"dt":dt,"nt":t.size,"runtime":runtime}
+    with open(filename+".tmp","wb") as f:
+        np.save(f,Seismogramm)
+    os.replace(filename+".tmp",filename+".npy")
+    with open(filename+".tmp","w") as f:
+        json.dump(meta,f)
+    os.replace(filename+".tmp",filename+".json")
+    return(meta)
+
+def _status(server,job):
+    # Public part of a job with the last progress report
+    s=dict((k,job[k]) for k in ("id","status","priority","submitted","config"))
+    s.update(job.get("meta",{}))
+    if "error" in job:
+        s["error"]=job["error"]
+    if job["status"]=="running":
+        try:
+            with open(job["filename"]+".progress") as f:
+                lines=f.read().splitlines()
+            if lines:
+                s["progress"]=json.loads(lines[-1])
+        except (OSError,ValueError):
+            pass
+    if job["status"]=="queued":
+        s["position"]=sum(1 for j in server["jobs"].values() if j["status"]=="queued" and
+                          (-j["priority"],j["seq"])<(-job["priority"],job["seq"]))
+    return(s)
+
+def _submit(server,config):
+    c,error=_config(config,server["model_dir"])
+    if c is None:
+        return(400,{"error":error})
+    job_id=_job_id(c,server["model_dir"])
+    job=server["jobs"].get(job_id)
+    if job is not None and job["status"] not in ("failed","cancelled"):
+        # Identical job is queued, running or done, a queued job gets the
+        # higher priority
+        if job["status"]=="queued" and c["priority"]>job["priority"]:
+            server["seq"]+=1
+            job.update(priority=c["priority"],seq=server["seq"])
+            server["queue"].put_nowait((-job["priority"],job["seq"],job_id))
+        return(200,_status(server,job))
+    filename=os.path.join(server["directory"],job_id)
+    server["seq"]+=1
+    job={"id":job_id,"config":c,"priority":c["priority"],"submitted":time.time(),
+         "seq":server["seq"],"filename":filename,"status":"queued"}
+    server["jobs"][job_id]=job
+    try:
+        # Result of an earlier server run
+        with open(filename+".json") as f:
+            job["meta"]=json.load(f)
+        if os.path.exists(filename+".npy"):
+            job["status"]="done"
+            return(200,_status(server,job))
+    except (OSError,ValueError):
+        pass
+    server["queue"].put_nowait((-job["priority"],job["seq"],job_id))
+    return(202,_status(server,job))
+
+def _route(server,method,path,body):
+    # Returns HTTP status, content type and body of a request
+    parts=[p for p in path.split("?")[0].split("/") if p]
+    if not parts or parts[0]!="jobs" or len(parts)>3:
+        return(404,{"error":"Unknown path "+path})
+    if len(parts)==1:
+        if method=="GET":
+            return(200,[_status(server,j) for j in server["jobs"].values()])
+        if method=="POST":
+            try:
+                config=json.loads(body.decode() or "{}")
+            except ValueError:
+                return(400,{"error":"Invalid JSON"})
+            return(_submit(server,config))
+        return(405,{"error":"Method not allowed"})
+    job=server["jobs"].get(parts[1])
+    if job is None:
+        return(404,{"error":"Unknown job "+parts[1]})
+    if len(parts)==3:
+        if parts[2]!="seismograms" or method!="GET":
+            return(404,{"error":"Unknown path "+path})
+        if job["status"]!="done":
+            return(409,{"error":"Job is "+job["status"]})
+        with open(job["filename"]+".npy","rb") as f:
+            return(200,f.read())
+    if method=="GET":
+        return(200,_status(server,job))
+    if method=="DELETE":
+        if job["status"]!="queued":
+            return(409,{"error":"Only queued jobs can be cancelled, job is "+job["status"]})
+        job["status"]="cancelled"
+        return(200,_status(server,job))
+    return(405,{"error":"Method not allowed"})
+
+async def _handle(server,reader,writer):
+    # One HTTP request per connection
+    try:
+        request=(await reader.readline()).decode("latin-1").split()
+        headers={}
+        while True:
+            line=(await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name,_,value=line.partition(":")
+            headers[name.strip().lower()]=value.strip()
+        body=await reader.readexactly(int(headers.get("content-length",0)))
+        if len(request)<2:
+            code,payload=400,{"error":"Invalid request"}
+        else:
+            code,payload=_route(server,request[0],request[1],body)
+        if isinstance(payload,bytes):
+            content_type="application/octet-stream"
+        else:
+            content_type="application/json"
+            payload=json.dumps(payload).encode()
+        writer.write(("HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n"
+                      "Connection: close\r\n\r\n"%(code,http.client.responses.get(code,""),
+                      content_type,len(payload))).encode()+payload)
+        await writer.drain()
+    except (ConnectionError,asyncio.IncompleteReadError,ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def _worker(server):
+    # Takes the job with the highest priority and runs it in the pool
+    loop=asyncio.get_running_loop()
+    while True:
+        priority,seq,job_id=await server["queue"].get()
+        job=server["jobs"][job_id]
+        if job["status"]!="queued" or job["seq"]!=seq:
+            continue
+        job["status"]="running"
+        try:
+            job["meta"]=await loop.run_in_executor(server["pool"],_run_job,job["config"],job["filename"],
+                                                   server["model_dir"])
+            job["status"]="done"
+        except Exception as e:
+            job["status"]="failed"
+            job["error"]=str(e)
+        print("Job %s %s"%(job_id,job["status"]))
+
+def _server(directory,model_dir,pool=None):
+    # State of the server: jobs, priority queue and worker pool
+    os.makedirs(directory,exist_ok=True)
+    return({"jobs":{},"queue":asyncio.PriorityQueue(),"directory":directory,"model_dir":model_dir,
+            "seq":0,"pool":pool})
+
+async def _serve(address,workers,directory,model_dir):
+    workers=workers or os.cpu_count() or 1
+    server=_server(directory,model_dir,ProcessPoolExecutor(workers,initializer=_init_worker))
+    handler=lambda reader,writer: _handle(server,reader,writer)
+    if address.startswith("unix:"):
+        listener=await asyncio.start_unix_server(handler,path=address[5:])
+    else:
+        host,_,port=address.rpartition(":")
+        listener=await asyncio.start_server(handler,host or "127.0.0.1",int(port))
+    tasks=[asyncio.create_task(_worker(server)) for n in range(workers)]
+    print("Serving on %s with %d workers, jobs in %s, models in %s"%(address,workers,directory,model_dir))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        for t in tasks:
+            t.cancel()
+        server["pool"].shutdown(wait=False,cancel_futures=True)
+
+def FD_server(address="127.0.0.1:8765",workers=None,directory=JOB_DIR,model_dir=MODEL_DIR):
+    # Run the job server until interrupted, address is host:port or unix:<path>
+    try:
+        asyncio.run(_serve(address,workers,directory,model_dir))
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+class _UnixConnection(http.client.HTTPConnection):
+    # HTTP connection over a Unix socket
+    def __init__(self,path,timeout=60):
+        http.client.HTTPConnection.__init__(self,"localhost",timeout=timeout)
+        self.unix_path=path
+    def connect(self):
+        self.sock=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+def _request(address,method,path,data=None):
+    # HTTP request to the server, returns status and body
+    if address.startswith("unix:"):
+        connection=_UnixConnection(address[5:])
+    else:
+        connection=http.client.HTTPConnection(address,timeout=60)
+    body=None if data is None else json.dumps(data).encode()
+    connection.request(method,path,body,{"Content-Type":"application/json"})
+    response=connection.getresponse()
+    payload=response.read()
+    connection.close()
+    return(response.status,payload)
+
+def _json(address,method,path,data=None):
+    status,payload=_request(address,method,path,data)
+    result=json.loads(payload.decode())
+    if status>=400:
+        print("Error: FD_job")
+        print(result["error"])
+        return
+    return(result)
+
+def FD_job_submit(config,address="127.0.0.1:8765"):
+    # Submit a run configuration, returns the status with the job id
+    return(_json(address,"POST","/jobs",config))
+
+def FD_job_status(job_id,address="127.0.0.1:8765"):
+    # Status and progress of a job
+    return(_json(address,"GET","/jobs/"+job_id))
+
+def FD_job_cancel(job_id,address="127.0.0.1:8765"):
+    return(_json(address,"DELETE","/jobs/"+job_id))
+
+def FD_job_result(job_id,address="127.0.0.1:8765",wait=True,poll=1.0):
+    # Seismograms of a job, waits until the job is finished (wait=True)
+    while True:
+        status=FD_job_status(job_id,address)
+        if status is None:
+            return
+        if status["status"]=="done":
+            code,payload=_request(address,"GET","/jobs/"+job_id+"/seismograms")
+            return(np.load(io.BytesIO(payload)))
+        if status["status"] in ("failed","cancelled") or not wait:
+            print("Error: FD_job_result")
+            print("Job is "+status["status"]+(": "+status["error"] if "error" in status else ""))
+            return
+        time.sleep(poll)
@@ -0,0 +1,112 @@
+# # FD_3D_DX4_DT2_fast 3-D acoustic Finite-Difference modelling
+#
+# GNU General Public License v3.0
+#
+# Finite-Difference acoustic seismic wave simulation
+#
+# Discretization of the first-order acoustic wave equation
+#
+# Temporal second-order accuracy $O(\Delta T^2)$
+# Spatial fourth-order accuracy  $O(\Delta X^4)$
+
+# Vectorized 3-D extension of FD_2D_DX4_DT2_fast, the time stepping is done
+# by FD_3D_modelling (see FD_3D_modelling_func)
+
+# ##  Initialisation
+import numpy as np
+import matplotlib.pyplot as plt
+from FD_3D_modelling_func import FD_3D_modelling
+from FD_model_func import FD_model_load, FD_model_range
+
+## Input Parameter
+
+# Discretization
+c1=20   # Number of grid points per dominant wavelength
+c2=0.5  # CFL-Number
+nx=100  # Number of grid points in X
+ny=100  # Number of grid points in Y
+nz=100  # Number of grid points in Z
+T=0.5   # Total propagation time
+dtype=np.float32 # Precision of the wavefields (np.float32 or np.float64)
+progress=10 # Interval of the progress reports in s (None: no reports)
+
+# Source Signal
+f0= 5      # Center frequency Ricker-wavelet
+q0= 1       # Maximum amplitude Ricker-Wavelet
+xscr = 50  # Source position (in grid points) in X
+yscr = 50  # Source position (in grid points) in Y
+zscr = 50  # Source position (in grid points) in Z
+
+# Receiver
+xrec1=50; yrec1=30; zrec1=50;  # Position Reciever 1 (in grid points)
+xrec2=50; yrec2=50; zrec2=50;  # Position Reciever 2 (in grid points)
+xrec3=50; yrec3=50; zrec3=70;  # Position Reciever 3 (in grid points)
+
+# Velocity and density
+model_files=None # File names of .npy files instead, e.g. ("modell_v.npy","rho.npy")
+if model_files is None:
+    modell_v = 3000*np.ones((nz,ny,nx))
+    rho=2.2*np.ones((nz,ny,nx))
+else:
+    # Memory maps, which are read in chunks
+    modell_v=FD_model_load(model_files[0])
+    rho=FD_model_load(model_files[1])
+    nz,ny,nx=np.shape(modell_v)
+
+## Preparation
+
+cmin,cmax=FD_model_range(modell_v) # Lowest and highest P-wave velocity
+fmax=2*f0                     # Maximum frequency
+dx=cmin/(fmax*c1)             # Spatial discretization (in m)
+dt=dx/(cmax)*c2               # Temporal discretization (in s)
+lampda_min=cmin/fmax          # Smallest wavelength
+
+# Output model parameter:
+print("Model size: x:",dx*nx,"in m, y:",dx*ny,"in m, z:",dx*nz,"in m")
+print("Temporal discretization: ",dt," s")
+print("Spatial discretization: ",dx," m")
+print("Number of gridpoints per minimum wavelength: ",lampda_min/dx)
+
+# ## Create time vector
+
+t=np.arange(0,T,dt)     # Time vector
+nt=np.size(t)           # Number of time steps
+
+# ## Source signal - Ricker-wavelet
+
+tau=np.pi*f0*(t-1.5/f0)
+q=q0*(1.0-2.0*tau**2.0)*np.exp(-tau**2)
+
+# ## Time stepping
+
+## Time stepping
+print("Starting time stepping...")
+p=np.zeros((nz,ny,nx),dtype)
+Seismogramm=FD_3D_modelling(modell_v,rho,dx,dt,q,xscr,yscr,zscr,[xrec1,xrec2,xrec3],
+                            [yrec1,yrec2,yrec3],[zrec1,zrec2,zrec3],dtype=dtype,wavefield=p,progress=progress)
+print("Finished time stepping!")
+
+# ## Plotting
+
+## Image plot of the wavefield in the source plane
+fig, ax = plt.subplots(1,1)
+img = ax.imshow(p[zscr,:,:]);
+ax.set_title('P-Wavefield at Z='+str(zscr))
+ax.set_xlabel('Grid-points in X')
+ax.set_ylabel('Grid-points in Y')
+fig.colorbar(img)
+plt.draw()
+plt.pause(0.001)
+
+## Plot seismograms
+for n in range(3):
+    plt.figure()
+    plt.plot(t,Seismogramm[n,:])
+    plt.title('Seismogram '+str(n+1))
+    plt.ylabel('Amplitude')
+    plt.xlabel('Time in s')
+plt.draw()
+
+plt.show()
+
+print(" ")
@@ -0,0 +1,210 @@
+## FD_3D_modelling_func.py 3-D acoustic Finite-Difference modelling
+# GNU General Public License v3.0
+#
+# Finite-Difference acoustic seismic wave simulation
+# Discretization of the first-order acoustic wave equation
+# (vx, vy, vz, p) on a staggered grid
+#
+# Vectorized 3-D modelling function for an arbitrary spatial order
+# (coeff(order) from FD_taylor_coeff_func or any other coefficients) and
+# the temporal schemes
+# temporal_order=2 Leapfrog
+# temporal_order=3 Adams-Bashforth
+# temporal_order=4 Adams-Bashforth
+#
+# Memory-lean layout: besides the four wavefields, only dt/rho and
+# lambda*dt on the updated grid points are stored as full arrays. The
+# derivatives are calculated in slabs of a few Z-planes into small
+# working arrays, so no full-size derivative temporaries are allocated.
+# Only the Adams-Bashforth schemes keep the derivatives of the previous
+# time steps as full arrays (three velocity components and the divergence
+# of the velocity per previous time step). dtype=np.float32 halves the
+# memory. The estimated memory is printed before the allocation.
+#
+# Usage:
+# Seismogramm=FD_3D_modelling(modell_v,rho,dx,dt,q,xscr,yscr,zscr,xrec,yrec,zrec)
+# returns the pressure seismograms with shape (number of receivers, nt);
+# modell_v and rho have the shape (nz,ny,nx).
+# FD_3D_memory(nx,ny,nz) returns the estimated memory in bytes.
+# With dt_out, the seismograms are low-pass filtered and resampled to the
+# sample interval dt_out during the time stepping (see FD_recorder_func).
+# progress reports progress, ETA and throughput (see FD_progress_func).
+# modell_v and rho can also be file names of .npy files, which are read as
+# memory maps in chunks (see FD_model_func).
+# watchdog (default True) aborts unstable runs with a diagnostic and
+# returns None (see FD_watchdog_func).
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","1D"))
+from FD_taylor_coeff_func import coeff
+from FD_kernel_func import FD_kernel
+from FD_1D_modelling_func import ABS_WEIGHTS, BOUNDARY
+from FD_recorder_func import FD_recorder, FD_record
+from FD_progress_func import FD_progress_start, FD_progress_update, FD_progress_finish
+from FD_model_func import FD_model_load, FD_model_coefficients
+from FD_watchdog_func import FD_watchdog_start, FD_watchdog_check
+
+# Size of the working arrays of a slab of Z-planes in bytes
+SLAB_SIZE=2**24
+
+def _padding(N):
+    # Ghost points outside the model for long stencils, see FD_1D_modelling
+    return(max(N-min(BOUNDARY),0))
+
+def _slab(nx,ny,nz,itemsize,slab=None):
+    # Number of Z-planes per slab of updated grid points
+    if slab is None:
+        slab=SLAB_SIZE//(itemsize*(nx-sum(BOUNDARY))*(ny-sum(BOUNDARY)))
+    return(int(min(max(slab,1),nz-sum(BOUNDARY))))
+
+def FD_3D_memory(nx,ny,nz,spatial_order=4,temporal_order=2,dtype=np.float64,nrec=0,nt=0,slab=None):
+    # Estimated memory of FD_3D_modelling in bytes (without the model arrays)
+    itemsize=np.dtype(dtype).itemsize
+    pad=_padding(spatial_order//2)
+    fields=4*(nx+2*pad)*(ny+2*pad)*(nz+2*pad)
+    inner=(nx-sum(BOUNDARY))*(ny-sum(BOUNDARY))*(nz-sum(BOUNDARY))
+    history=4*(len(ABS_WEIGHTS[temporal_order])-1)*inner
+    work=3*_slab(nx,ny,nz,itemsize,slab)*(nx-sum(BOUNDARY))*(ny-sum(BOUNDARY))
+    return(itemsize*(fields+2*inner+history+work+nrec*nt))
+
+def derivative(f,c,out,tmp,k,axis,forward):
+    # out=sum_n c(n)*(f[k+n]-f[k-n+1]) (forward) or sum_n c(n)*(f[k+n-1]-f[k-n])
+    # (backward) along axis on the grid points k, tmp is a working array
+    # (generated kernel)
+    return(FD_kernel(c,3,axis,forward)(f,out,k,tmp))
+
+def _update(f,D,history,weights,factor,j,u,tmp):
+    # f-=factor*sum_i weights(i)*D_i on a slab, D_0 is the current derivative
+    # and history[i-1][j] the derivatives of the previous time steps
+    if len(weights)==1:
+        D*=factor[j]
+        f-=D
+        return
+    np.multiply(D,weights[0],out=u)
+    for w,h in zip(weights[1:],history):
+        np.multiply(h[j],w,out=tmp)
+        u+=tmp
+    u*=factor[j]
+    f-=u
+    # The oldest derivative is replaced by the current one
+    history[-1][j]=D
+
+def FD_3D_modelling(modell_v,rho,dx,dt,q,xscr,yscr,zscr,xrec,yrec,zrec,
+                    spatial_order=4,temporal_order=2,coeff_spatial=None,
+                    dtype=np.float64,slab=None,wavefield=None,dt_out=None,
+                    progress=None,watchdog=True):
+    ## Check some conditions
+    if temporal_order not in ABS_WEIGHTS:
+        print("Error: FD_3D_modelling")
+        print("Supported are temporal_order=2,3,4 (Adams-Bashforth)!")
+        return
+    if coeff_spatial is None:
+        coeff_spatial=coeff(spatial_order)
+        if coeff_spatial is None:
+            return
+
+    ## Preparation
+    modell_v=FD_model_load(modell_v)
+    rho=FD_model_load(rho)
+    nz,ny,nx=np.shape(modell_v)
+    nt=np.size(q)
+    dtype=np.dtype(dtype)
+    c=(np.asarray(coeff_spatial,float)/dx).astype(dtype) # dz=dy=dx
+    N=c.size
+    weights=[dtype.type(w) for w in ABS_WEIGHTS[temporal_order]]
+    xrec=np.asarray(xrec,int)
+    yrec=np.asarray(yrec,int)
+    zrec=np.asarray(zrec,int)
+    slab=_slab(nx,ny,nz,dtype.itemsize,slab)
+
+    memory=FD_3D_memory(nx,ny,nz,2*N,temporal_order,dtype,xrec.size,nt,slab)
+    print("Estimated memory: %.3f GiB (%s)"%(memory/2**30,dtype.name))
+
+    # Updated grid points, long stencils get ghost points (pad) outside the model
+    pad=_padding(N)
+    a=BOUNDARY[0]+pad
+    k=[slice(a,n-BOUNDARY[1]+pad) for n in (nz,ny,nx)]
+    inner=tuple(s.stop-s.start for s in k)
+    model=tuple(slice(s.start-pad,s.stop-pad) for s in k)
+    src=(zscr+pad,yscr+pad,xscr+pad)
+    rec=(zrec+pad,yrec+pad,xrec+pad)
+
+    # Init wavefields
+    shape=(nz+2*pad,ny+2*pad,nx+2*pad)
+    vx=np.zeros(shape,dtype)
+    vy=np.zeros(shape,dtype)
+    vz=np.zeros(shape,dtype)
+    p=np.zeros(shape,dtype)
+
+    # Derived coefficients on the updated grid points (in chunks of the model)
+    coefficients=FD_model_coefficients(modell_v,rho,dt,region=model,dtype=dtype)
+    if coefficients is None:
+        return
+    dt_rho=coefficients["dt_rho"]
+    l_dt=coefficients["l_dt"]
+    # Highest velocity from the coefficients (per plane, without temporary
+    # arrays of the model size)
+    cmax=np.sqrt(max(float((l_dt[i]*dt_rho[i]).max()) for i in range(inner[0])))/dt
+
+    # Derivatives of the previous time steps for the Adams-Bashforth method
+    history=[[np.zeros(inner,dtype) for w in weights[1:]] for i in range(4)]
+
+    # Working arrays of a slab
+    D=np.empty((slab,)+inner[1:],dtype)
+    u=np.empty_like(D)
+    tmp=np.empty_like(D)
+
+    # Init Seismograms
+    recorder=FD_recorder(xrec.size,nt,dt,dt_out,dtype=dtype)
+    if recorder is None:
+        return
+
+    ## Time stepping
+    progress=FD_progress_start(progress,nt,inner[0]*inner[1]*inner[2])
+    watchdog=FD_watchdog_start(watchdog,dt,dx,q,cmax,
+                               (temporal_order,spatial_order,"ABS",coeff_spatial,3),tuple(s.start-pad for s in k))
+    for n in range(2,nt):
+
+        # Update velocity
+        for z0 in range(k[0].start,k[0].stop,slab):
+            kz=slice(z0,min(z0+slab,k[0].stop))
+            ks=(kz,k[1],k[2])
+            j=(slice(z0-a,kz.stop-a),slice(None),slice(None))
+            m=kz.stop-kz.start
+            for v,axis,h in ((vx,2,history[0]),(vy,1,history[1]),(vz,0,history[2])):
+                derivative(p,c,D[:m],tmp[:m],ks,axis,True)
+                _update(v[ks],D[:m],h,weights,dt_rho,j,u[:m],tmp[:m])
+        for h in history[:3]:
+            h[:]=h[-1:]+h[:-1]
+
+        # Inject source wavelet
+        p[src]=p[src]+q[n]
+
+        # Update pressure
+        for z0 in range(k[0].start,k[0].stop,slab):
+            kz=slice(z0,min(z0+slab,k[0].stop))
+            ks=(kz,k[1],k[2])
+            j=(slice(z0-a,kz.stop-a),slice(None),slice(None))
+            m=kz.stop-kz.start
+            derivative(vx,c,D[:m],tmp[:m],ks,2,False)
+            derivative(vy,c,u[:m],tmp[:m],ks,1,False)
+            D[:m]+=u[:m]
+            derivative(vz,c,u[:m],tmp[:m],ks,0,False)
+            D[:m]+=u[:m]
+            _update(p[ks],D[:m],history[3],weights,l_dt,j,u[:m],tmp[:m])
+        history[3][:]=history[3][-1:]+history[3][:-1]
+
+        # Save seismograms
+        FD_record(recorder,n,p[rec])
+        if progress is not None:
+            FD_progress_update(progress,n)
+        if watchdog is not None and FD_watchdog_check(watchdog,n,p[tuple(k)]):
+            break
+
+    FD_progress_finish(progress,nt-1 if watchdog is None or not watchdog["failed"] else watchdog["checked"])
+    if wavefield is not None:
+        wavefield[...]=p[pad:pad+nz,pad:pad+ny,pad:pad+nx]
+    if watchdog is not None and watchdog["failed"]:
+        return
+    return(recorder["Seismogramm"])
@@ -0,0 +1,48 @@
+## conftest.py common settings of the accuracy tests
+# GNU General Public License v3.0
+#
+# Adds the 1D, 2D and 3D directories to the module search path and provides
+# run_script, which runs a modelling script (e.g. FD_1D_DX4_DT2.py) with
+# smaller input parameters and without plot windows, so the original loop
+# scripts can serve as reference of the vectorized versions.
+#
+# Usage:
+# python -m pytest -q Python/tests
+import os
+import re
+import sys
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pytest
+
+PYTHON_DIR=os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+for d in ("1D","2D","3D"):
+    sys.path.insert(0,os.path.join(PYTHON_DIR,d))
+
+def _set_parameter(source,name,value):
+    # Replace the first assignment name=... of a line (or after a ";")
+    pattern=r"(?m)(^|;[ \t]*)%s[ \t]*=[^;#\n]*"%re.escape(name)
+    source,count=re.subn(pattern,lambda m: m.group(1)+"%s=%r"%(name,value),source,count=1)
+    if count==0:
+        raise ValueError("Parameter %s not found"%name)
+    return(source)
+
+@pytest.fixture
+def run_script(tmp_path,monkeypatch):
+    # run_script("1D/FD_1D_DX4_DT2.py",nx=200,T=0.3) returns the variables of the script
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("Seismograms")
+    monkeypatch.setattr(plt,"show",lambda *args,**kwargs: None)
+    monkeypatch.setattr(plt,"pause",lambda *args,**kwargs: None)
+    def run(script,**parameters):
+        filename=os.path.join(PYTHON_DIR,script)
+        with open(filename) as f:
+            source=f.read()
+        for name,value in parameters.items():
+            source=_set_parameter(source,name,value)
+        variables={"__name__":"__main__","__file__":filename}
+        exec(compile(source,filename,"exec"),variables)
+        plt.close("all")
+        return(variables)
+    return(run)
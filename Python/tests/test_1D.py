@@ -0,0 +1,520 @@
+## test_1D.py accuracy tests of the 1-D modelling
+# GNU General Public License v3.0
+#
+# The loop scripts FD_1D_DX*_DT*.py are the reference: the vectorized
+# scripts (*_fast.py) and FD_1D_modelling with every backend have to
+# reproduce their seismograms to rounding errors. All schemes are also
+# compared with the analytic solution in a homogeneous medium, the
+# multirate time stepping with the global time step and the block grid
+# refinement with the uniform grid (and a finer uniform grid). Gathers from
+# reciprocal runs (one per receiver) have to match the runs per source.
+# Runs with early termination have to match the full runs, every member of
+# an ensemble run the run of its model, the generated derivative kernels the
+# stencil sums. Unstable runs have to be aborted by the watchdog, and a stencil
+# without stable CFL-number has the stability limit 0. The Holberg
+# coefficients have to be consistent first derivatives with a smaller phase
+# error over the design band than the Taylor coefficients. The configurations
+# of the advisor have to meet the tolerance at the lowest and the highest
+# velocity, cheaper ones have to exceed it. The misfit has to give known
+# values, and a repeated comparison has to be served from the cache. The
+# convolution with a stored impulse response has to reproduce the run of the
+# wavelet. Decimated seismograms (dt_out) have to match the low-pass
+# filtered and subsampled full-rate run, without time shift. The seismogram
+# cache
+# has to return stored runs, rerun changed ones and evict the oldest, the
+# archive has to keep max_error or store lossless, and a resumed sweep has
+# to run only the missing and failed points. The live view has to draw
+# frames (Agg backend) without changing the seismograms. The progress
+# reports have to reach the last time step, and runs without progress have
+# to be silent.
+#
+# Usage:
+# python -m pytest -q Python/tests/test_1D.py
+import os
+import re
+import numpy as np
+import pytest
+import matplotlib.pyplot as plt
+from FD_1D_modelling_func import FD_1D_modelling, SAMPLE_OFFSET
+from FD_numexpr_func import ne
+from FD_grid_func import FD_grid_blocks
+from FD_gather_func import FD_gather
+from FD_stop_func import FD_stop
+from FD_ensemble_func import FD_1D_ensemble, FD_ensemble_dt
+from FD_watchdog_func import FD_watchdog
+import FD_kernel_func
+from FD_kernel_func import FD_kernel, FD_kernel_halo
+from FD_taylor_coeff_func import coeff
+from FD_holberg_coeff_func import holberg_coeff, phase_error
+from FD_1D_dispersion_func import FD_1D_stability_limit, FD_1D_dispersion, FD_1D_check_stability
+from FD_1D_advisor_func import FD_1D_advisor
+from FD_cache_func import FD_cached, FD_cache_key, FD_cache_evict
+from FD_archive_func import FD_archive_save, FD_archive_open, FD_archive_read
+from FD_sweep_func import FD_sweep, FD_sweep_points
+from FD_misfit_func import FD_misfit, FD_resample, FD_time_shift
+from FD_recorder_func import CUTOFF
+import FD_1D_compare_func
+from FD_1D_compare_func import FD_1D_compare_runs
+from FD_1D_impulse_response_func import FD_1D_impulse_response, FD_convolve, FD_ricker
+from FD_live_func import FD_live
+from FD_progress_func import FD_progress
+
+# Small version of the two-layer model of the scripts (interface at 100)
+PARAMETERS={"nx":200,"T":0.3,"xscr":30,"xrec1":60,"xrec2":120,"xrec3":180}
+
+# Scripts and the corresponding (spatial_order, temporal_order, method)
+SCRIPTS={"FD_1D_DX4_DT2":(4,2,"ABS"),
+         "FD_1D_DX4_DT3_ABS":(4,3,"ABS"),
+         "FD_1D_DX4_DT4_ABS":(4,4,"ABS"),
+         "FD_1D_DX4_DT4_LW":(4,4,"LW"),
+         "FD_1D_DX8_DT2":(8,2,"ABS")}
+
+BACKENDS=["numpy"]+(["numexpr"] if ne is not None else [])
+
+def misfit(S,S_ref):
+    # Largest deviation relative to the largest amplitude of the reference
+    return(np.abs(S-S_ref).max()/np.abs(S_ref).max())
+
+@pytest.fixture(scope="module")
+def loop_results():
+    # Results of the loop scripts, calculated once per module
+    return({})
+
+@pytest.fixture
+def loop_script(run_script,loop_results):
+    def run(name):
+        if name not in loop_results:
+            loop_results[name]=run_script("1D/"+name+".py",**PARAMETERS)
+        return(loop_results[name])
+    return(run)
+
+@pytest.mark.parametrize("name",sorted(SCRIPTS))
+def test_fast_script_matches_loop_script(name,loop_script,run_script):
+    reference=loop_script(name)
+    fast=run_script("1D/"+name+"_fast.py",**PARAMETERS)
+    assert np.abs(reference["Seismogramm"]).max()>0
+    assert misfit(fast["Seismogramm"],reference["Seismogramm"])<1e-12
+
+@pytest.mark.parametrize("backend",BACKENDS)
+@pytest.mark.parametrize("name",sorted(SCRIPTS))
+def test_modelling_matches_loop_script(name,backend,loop_script):
+    s=loop_script(name)
+    order,temporal_order,method=SCRIPTS[name]
+    S=FD_1D_modelling(s["modell_v"],s["rho"],s["dx"],s["dt"],s["q"],s["xscr"],
+                      [s["xrec1"],s["xrec2"],s["xrec3"]],order,temporal_order,method,
+                      backend=backend)
+    assert misfit(S,s["Seismogramm"])<1e-12
+
+@pytest.mark.parametrize("backend",BACKENDS)
+@pytest.mark.parametrize("order,temporal_order,method",
+                         [(4,2,"ABS"),(4,3,"ABS"),(4,4,"ABS"),(4,4,"LW"),(8,2,"ABS"),(8,4,"ABS"),(12,3,"ABS")])
+def test_modelling_matches_analytic_solution(order,temporal_order,method,backend):
+    # Homogeneous medium: the pressure of the point source q is
+    # q(t-r/c)*dx/(2*c*dt) (1-D Green's function), with the sample
+    # n at the time (n+SAMPLE_OFFSET)*dt
+    c=2000.0
+    rho=2.0
+    f0=10.0
+    dx=c/(2*f0*20)
+    dt=dx/c*0.5
+    nx=420
+    xscr=10+int(0.1*c/dx)
+    xrec=xscr+np.array([int(0.2*c/dx),int(0.4*c/dx)])
+    def ricker(t):
+        tau=np.pi*f0*(t-1.5/f0)
+        return((1.0-2.0*tau**2)*np.exp(-tau**2))
+    n=np.arange(int(0.45/dt))
+    S=FD_1D_modelling(c*np.ones(nx),rho*np.ones(nx),dx,dt,ricker(n*dt),xscr,xrec,
+                      order,temporal_order,method,backend=backend)
+    r=(xrec-xscr)*dx
+    analytic=np.array([dx/(2*c*dt)*ricker((n+SAMPLE_OFFSET)*dt-ri/c) for ri in r])
+    assert np.linalg.norm(S-analytic)/np.linalg.norm(analytic)<0.01
+
+@pytest.mark.parametrize("name",["FD_1D_DX4_DT2","FD_1D_DX8_DT2"])
+def test_multirate_without_slow_regions_matches_loop_script(name,loop_script):
+    # Velocity contrast 1.5: all grid points keep the global time step
+    s=loop_script(name)
+    order=SCRIPTS[name][0]
+    S=FD_1D_modelling(s["modell_v"],s["rho"],s["dx"],s["dt"],s["q"],s["xscr"],
+                      [s["xrec1"],s["xrec2"],s["xrec3"]],order,multirate=True)
+    assert misfit(S,s["Seismogramm"])<1e-12
+
+@pytest.mark.parametrize("order",[4,8])
+def test_multirate_is_accurate_and_stable(order):
+    # Fast body (4000 m/s, step dt) in a slow model (1000 m/s, step 4*dt)
+    nx=400
+    f0=10.0
+    dx=1000/(2*f0*20)
+    dt=dx/4000*0.5
+    x=np.arange(nx)
+    modell_v=np.where((x>=200)&(x<230),4000.0,1000.0)
+    rho=np.where(modell_v>1000,2.0,1.0)
+    for T,tolerance in ((0.6,0.05),(5.0,None)):
+        tau=np.pi*f0*(np.arange(int(T/dt))*dt-1.5/f0)
+        q=(1.0-2.0*tau**2)*np.exp(-tau**2)
+        S_ref=FD_1D_modelling(modell_v,rho,dx,dt,q,50,[150,215,350],order)
+        S=FD_1D_modelling(modell_v,rho,dx,dt,q,50,[150,215,350],order,multirate=True)
+        if tolerance is not None:
+            assert misfit(S,S_ref)<tolerance
+        assert np.abs(S).max()<1.1*np.abs(S_ref).max()
+
+@pytest.mark.parametrize("name",["FD_1D_DX4_DT2","FD_1D_DX4_DT3_ABS","FD_1D_DX8_DT2"])
+def test_refinement_with_uniform_blocks_matches_loop_script(name,loop_script):
+    # Blocks with the spacing dx reproduce the uniform grid
+    s=loop_script(name)
+    order,temporal_order,method=SCRIPTS[name]
+    S=FD_1D_modelling(s["modell_v"],s["rho"],s["dx"],s["dt"],s["q"],s["xscr"],
+                      [s["xrec1"],s["xrec2"],s["xrec3"]],order,temporal_order,method,
+                      refinement=[(0,90,1.0),(90,200,1.0)])
+    assert misfit(S,s["Seismogramm"])<1e-12
+
+@pytest.mark.parametrize("order,temporal_order",[(4,2),(8,3)])
+def test_refinement_is_accurate_and_stable(order,temporal_order):
+    # Layer of 1700 m/s (spacing 1.5*dx) and half-space of 3000 m/s
+    # (spacing 3*dx) below 1000 m/s, compared with a uniform grid with the
+    # spacing dx/4 (and the uniform grid with dx for the stability)
+    nx=800
+    f0=10.0
+    dx=1000/(2*f0*20)
+    dt=dx/3000*0.5
+    def model(k):
+        x=np.arange(k*nx)/float(k)
+        return(np.where(x<400,1000.0,np.where(x<600,1700.0,3000.0)),np.where(x<400,1.0,2.0))
+    def ricker(t):
+        tau=np.pi*f0*(t-1.5/f0)
+        return((1.0-2.0*tau**2)*np.exp(-tau**2))
+    modell_v,rho=model(1)
+    assert FD_grid_blocks(modell_v)==[(0,400,1.0),(400,601,1.5),(601,800,3.0)]
+    for T,k in ((0.6,4),(5.0,1)):
+        n=np.arange(int(k*T/dt))
+        S_ref=FD_1D_modelling(*model(k),dx/k,dt/k,ricker(n*dt/k),300*k,[350*k,500*k,700*k],order,temporal_order)
+        n=np.arange(int(T/dt))
+        S=FD_1D_modelling(modell_v,rho,dx,dt,ricker(n*dt),300,[350,500,700],order,temporal_order,refinement=True)
+        if k>1:
+            S_ref=np.array([np.interp(n,(np.arange(s.size)+SAMPLE_OFFSET)/k-SAMPLE_OFFSET,s) for s in S_ref])
+            assert misfit(S,S_ref)<0.03
+        assert np.abs(S).max()<1.1*np.abs(S_ref).max()
+
+@pytest.mark.parametrize("kwargs",[{},{"spatial_order":8,"temporal_order":3},{"refinement":True}])
+def test_reciprocal_gathers_match_shot_gathers(kwargs):
+    # Random upper part (sources), layers of 2200 m/s and 3000 m/s (receivers)
+    rng=np.random.default_rng(0)
+    nx=300
+    x=np.arange(nx)
+    modell_v=np.where(x<150,1000+500*rng.random(nx),np.where(x<230,2200.0,3000.0))
+    rho=np.where(x<150,1+rng.random(nx),np.where(x<230,1.7,2.2))
+    dx=2.5
+    dt=dx/3000*0.5
+    q=rng.standard_normal(400)
+    xscr=[40,60,80,100]
+    xrec=[200,250]
+    S=FD_gather(FD_1D_modelling,modell_v,rho,dx,dt,q,xscr,xrec,mode="shots",**kwargs)
+    assert misfit(S[1],FD_1D_modelling(modell_v,rho,dx,dt,q,60,xrec,**kwargs))==0
+    assert misfit(FD_gather(FD_1D_modelling,modell_v,rho,dx,dt,q,xscr,xrec,**kwargs),S)<1e-12
+
+@pytest.mark.parametrize("backend",BACKENDS)
+@pytest.mark.parametrize("stop",[True,FD_stop(t_arrival=0.5)])
+def test_early_termination_matches_full_run(stop,backend):
+    # Receivers near the source of a 5 km model: the reflection at 2.5 km
+    # arrives after 1.8 s, the waves reflected at the model edges only
+    # return to the receivers after the end of the seismograms
+    nx=2000
+    x=np.arange(nx)
+    modell_v=np.where(x<1000,1000.0,1500.0)
+    rho=np.ones(nx)
+    dx=2.5
+    dt=dx/1500*0.5
+    tau=np.pi*10*(np.arange(int(4.0/dt))*dt-0.15)
+    q=(1.0-2.0*tau**2)*np.exp(-tau**2)
+    S_ref=FD_1D_modelling(modell_v,rho,dx,dt,q,100,[150,200],backend=backend)
+    S=FD_1D_modelling(modell_v,rho,dx,dt,q,100,[150,200],backend=backend,stop=stop)
+    last=np.flatnonzero(np.abs(S).max(axis=0)>0)[-1]
+    assert last<0.9*q.size
+    assert np.array_equal(S[:,:last+1],S_ref[:,:last+1])
+    if stop is True:
+        assert misfit(S,S_ref)<1e-6
+    else:
+        assert last*dt<0.6
+        assert misfit(S[:,:int(0.5/dt)],S_ref[:,:int(0.5/dt)])==0
+
+@pytest.mark.parametrize("backend",BACKENDS)
+@pytest.mark.parametrize("name",sorted(SCRIPTS))
+def test_ensemble_members_match_single_runs(name,backend):
+    # Perturbed two-layer models with a common and with individual densities
+    order,temporal_order,method=SCRIPTS[name]
+    rng=np.random.default_rng(0)
+    nx=200
+    x=np.arange(nx)
+    modell_v=np.where(x<100,1000.0,1500.0)*(1+0.1*rng.random((5,1)))+20*rng.standard_normal((5,nx))
+    dx=1.0
+    dt=FD_ensemble_dt(modell_v,dx,0.5)
+    q=rng.standard_normal(300)
+    for rho in (np.where(x<100,1.0,1.5),1+rng.random((5,nx))):
+        S=FD_1D_ensemble(modell_v,rho,dx,dt,q,30,[60,120,180],order,temporal_order,method,backend=backend)
+        assert S.shape==(5,3,q.size)
+        for i in range(5):
+            S_ref=FD_1D_modelling(modell_v[i],np.broadcast_to(rho,modell_v.shape)[i],dx,dt,q,30,[60,120,180],
+                                  order,temporal_order,method,backend="numpy")
+            assert misfit(S[i],S_ref)<1e-12
+    # Densities which do not match the models
+    for rho in (np.ones((4,nx)),np.ones(nx+1)):
+        assert FD_1D_ensemble(modell_v,rho,dx,dt,q,30,[60],order,temporal_order,method,backend=backend) is None
+
+def test_stability_limit_of_unstable_stencil():
+    # Coefficients which are unstable for every sampled CFL number
+    assert FD_1D_stability_limit(2,4,coeff_spatial=1e4*coeff(4))==0.0
+    assert abs(FD_1D_stability_limit(2,4)-0.857)<0.001
+
+@pytest.mark.parametrize("order",[4,6,8,12])
+@pytest.mark.parametrize("fraction",[0.4,0.7])
+def test_holberg_coefficients_beat_taylor_coefficients(order,fraction):
+    c=holberg_coeff(order,fraction)
+    assert c.size==order//2
+    assert abs(np.sum((2*np.arange(1,c.size+1)-1)*c)-1)<1e-12
+    assert phase_error(c,fraction)<0.5*phase_error(coeff(order),fraction)
+
+def test_advisor_configurations_meet_the_tolerance():
+    # Model of FD_1D_advisor.py
+    cmin,cmax,fmax,tol=1000.0,1500.0,20.0,1e-3
+    c1=np.arange(3.0,31.0,0.5)
+    c2=np.linspace(0.02,1.0,50)
+    best,table=FD_1D_advisor(cmin,cmax,5000.0,fmax,10.0,tol,c1=c1,c2=c2)
+    assert best is table[0] and len(table)==20
+    assert [row["cost"] for row in table]==sorted(row["cost"] for row in table)
+    def error(row,c1,c2):
+        # Largest phase error up to fmax at the lowest and the highest velocity
+        band=np.linspace(0.0,1.0,513)[1:]
+        args=(row["temporal_order"],row["spatial_order"])
+        slow=FD_1D_dispersion(*args,c2*cmin/cmax,2*np.pi/c1*band,row["method"])
+        fast=FD_1D_dispersion(*args,c2,2*np.pi/(c1*cmax/cmin)*band,row["method"])
+        return(max(np.abs(slow-1).max(),np.abs(fast-1).max()))
+    for row in table:
+        assert error(row,row["c1"],row["c2"])<=tol
+        # Cheaper configurations (coarser grid or larger time step) are
+        # unstable or exceed the tolerance
+        for c1_cheaper,c2_cheaper in ((row["c1"]-0.5,row["c2"]),(row["c1"],row["c2"]+c2[1]-c2[0])):
+            if c1_cheaper<c1[0] or c2_cheaper>c2[-1]+1e-9:
+                continue
+            stable=FD_1D_check_stability(row["temporal_order"],row["spatial_order"],c2_cheaper,row["method"])
+            assert not stable or not error(row,c1_cheaper,c2_cheaper)<=tol
+
+@pytest.mark.parametrize("backend",BACKENDS)
+def test_watchdog_aborts_unstable_runs(backend):
+    # DX4_DT4_ABS above its stability limit (CFL=0.571) grows from rounding
+    # errors, the suggested time step is stable
+    nx=2000
+    x=np.arange(nx)
+    modell_v=np.where(x<1000,1000.0,1500.0)
+    rho=np.where(x<1000,1.0,1.5)
+    dx=2.5
+    tau=np.pi*10*(np.arange(4000)*dx/1500*0.6-0.15)
+    q=(1.0-2.0*tau**2)*np.exp(-tau**2)
+    reports=[]
+    watchdog=FD_watchdog(callback=reports.append,quiet=True)
+    assert FD_1D_modelling(modell_v,rho,dx,dx/1500*0.6,q,100,[400],4,4,backend=backend,watchdog=watchdog) is None
+    report=reports[0]
+    assert report["step"]<q.size-500 and report["growth"]>1.01
+    assert abs(report["stability_limit"]-0.571)<0.001 and report["suggested_CFL"]<0.571
+    assert 5<=report["position"][0]<nx-4
+    S=FD_1D_modelling(modell_v,rho,dx,report["suggested_dt"],q,100,[400],4,4,backend=backend,watchdog=watchdog)
+    assert S is not None and len(reports)==1
+
+@pytest.mark.parametrize("ndim",[1,2,3])
+@pytest.mark.parametrize("forward",[True,False])
+def test_kernels_match_stencil_sums(ndim,forward,tmp_path,monkeypatch):
+    # Generated kernels (source code written to a new kernel directory)
+    monkeypatch.setattr(FD_kernel_func,"KERNEL_DIR",str(tmp_path))
+    monkeypatch.setattr(FD_kernel_func,"_kernels",{})
+    c=coeff(8)/2.5
+    N=c.size
+    below,above=FD_kernel_halo(c,forward)
+    f=np.random.default_rng(0).random((2*N+6,)*ndim)
+    k=(slice(N,N+6),)*ndim
+    for axis in range(ndim):
+        def shifted(n):
+            # f[k+n] along axis
+            i=list(k)
+            i[axis]=slice(N+n,N+6+n)
+            return(f[tuple(i)])
+        s=0 if forward else -1
+        expected=sum(c[n-1]*(shifted(n+s)-shifted(1-n+s)) for n in range(1,N+1))
+        assert min(1-N+s,s)==-below and max(N+s,1+s)==above
+        out=np.empty((6,)*ndim)
+        FD_kernel(c,ndim,axis,forward)(f,out,k)
+        assert np.abs(out-expected).max()<1e-12*np.abs(expected).max()
+    assert len(list(tmp_path.iterdir()))==ndim
+    # The files are only written, a changed file is not executed
+    for filename in tmp_path.iterdir():
+        filename.write_text("raise RuntimeError\n")
+    monkeypatch.setattr(FD_kernel_func,"_kernels",{})
+    out=np.empty((6,)*ndim)
+    FD_kernel(c,ndim,ndim-1,forward)(f,out,k)
+    assert np.abs(out-expected).max()<1e-12*np.abs(expected).max()
+
+def test_cache_hits_misses_and_evicts(tmp_path):
+    # Runs of a counting modelling function with the model from a file
+    runs=[]
+    def modelling(modell_v,q,progress=None):
+        runs.append(progress)
+        return(np.outer(np.load(modell_v),q))
+    filename=str(tmp_path/"modell_v.npy")
+    np.save(filename,np.arange(4.0))
+    cache_dir=str(tmp_path/"Seismograms")
+    q=np.ones(100)
+    S=FD_cached(modelling,filename,q,cache_dir=cache_dir)
+    # Hit, also with another progress display
+    assert np.array_equal(FD_cached(modelling,filename,q,progress=True,cache_dir=cache_dir),S)
+    assert len(runs)==1
+    # Miss for another source signal and for a changed model file
+    FD_cached(modelling,filename,2*q,cache_dir=cache_dir)
+    key=FD_cache_key(modelling,filename,2*q)
+    np.save(filename,np.arange(4.0)+1)
+    assert np.array_equal(FD_cached(modelling,filename,q,cache_dir=cache_dir),S+q)
+    assert len(runs)==3
+    # Only the two most recently used entries fit into the cache
+    os.utime(os.path.join(cache_dir,key+".npy"),(0,0))
+    FD_cache_evict(cache_dir,2*S.nbytes+1000)
+    assert len(os.listdir(cache_dir))==4 and not os.path.exists(os.path.join(cache_dir,key+".npy"))
+    FD_cached(modelling,filename,q,cache_dir=cache_dir)
+    assert len(runs)==3
+
+def test_misfit_of_known_differences():
+    # Gaussian pulses, the second one scaled by 1.1 and delayed by 7.3 samples
+    dt=0.001
+    t=np.arange(1000)*dt
+    S_ref=np.exp(-((t-0.3)/0.02)**2)[None,:]
+    m=FD_misfit(np.vstack((1.1*S_ref,np.exp(-((t-0.3-7.3*dt)/0.02)**2))),np.vstack((S_ref,S_ref)),dt)
+    assert abs(m["l2"][0]-0.1)<1e-12 and abs(m["max_error"][0]-0.1)<1e-12 and abs(m["time_shift"][0])<1e-12
+    assert abs(m["time_shift"][1]-7.3*dt)<0.05*dt
+    m=FD_misfit(S_ref,S_ref,dt)
+    assert m["l2"][0]==0 and m["max_error"][0]==0 and m["time_shift"][0]==0
+
+def test_compare_runs_are_served_from_the_cache(tmp_path,monkeypatch):
+    setup={"nx":200,"T":0.3,"xscr":30,"xrec":(60,120)}
+    configs=[{"spatial_order":8},{"temporal_order":3,"c2":0.25}]
+    cache_dir=str(tmp_path/"Seismograms")
+    results=FD_1D_compare_runs(configs,{},setup,processes=2,cache_dir=cache_dir)
+    assert [r["name"] for r in results]==["DX4_DT2","DX8_DT2","DX4_DT3_ABS"]
+    assert results[0]["misfit"]["l2"].max()==0 and 0<results[1]["misfit"]["l2"].max()<0.1
+    # No process pool is started for the second comparison
+    def pool(*args,**kwargs):
+        raise AssertionError("configurations were run again")
+    monkeypatch.setattr(FD_1D_compare_func,"ProcessPoolExecutor",pool)
+    cached=FD_1D_compare_runs(configs,{},setup,cache_dir=cache_dir)
+    for r,c in zip(results,cached):
+        assert np.array_equal(r["Seismogramm"],c["Seismogramm"])
+
+@pytest.mark.parametrize("order,temporal_order",[(4,2),(8,3)])
+@pytest.mark.parametrize("fmax,tolerance",[(None,1e-12),(50,1e-5)])
+def test_convolution_with_impulse_response_matches_modelling(order,temporal_order,fmax,tolerance):
+    modell_v=np.where(np.arange(200)<100,1000.0,1500.0)
+    rho=np.where(np.arange(200)<100,1.0,1.5)
+    dt=2.5/1500*0.5
+    q=FD_ricker(10,dt,800)
+    H=FD_1D_impulse_response(modell_v,rho,2.5,dt,800,30,[60,120,180],fmax,order,temporal_order)
+    S=FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120,180],order,temporal_order)
+    assert misfit(FD_convolve(H,q),S)<tolerance
+
+def test_decimation_matches_filtered_full_rate_run():
+    modell_v=np.where(np.arange(200)<100,1000.0,1500.0)
+    rho=np.ones(200)
+    dt=2.5/1500*0.5
+    nt=1500
+    q=FD_ricker(10,dt,nt)
+    S=FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120,180])
+    # Integer factor: Blackman-windowed sinc (32 output samples long) applied
+    # to the full-rate run, then every m-th sample
+    m=4
+    D=FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120,180],dt_out=m*dt)
+    assert D.shape==(3,(nt-1)//m+1)
+    tau=np.arange(-16*m,16*m+1)*dt
+    h=2*CUTOFF/m*np.sinc(2*CUTOFF/(m*dt)*tau)*np.blackman(tau.size)
+    R=np.array([np.convolve(s,h) for s in S])[:,16*m::m][:,:D.shape[1]]
+    assert misfit(D,R)<1e-12
+    assert np.abs(FD_time_shift(D,S[:,::m],m*dt)).max()<0.01*m*dt
+    # Other factor: the output sample k is at the time k*dt_out
+    dt_out=3.7*dt
+    D=FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120,180],dt_out=dt_out)
+    assert D.shape==(3,int((nt-1)/3.7)+1)
+    # (without the last half filter width, which is missing the later samples)
+    D=D[:,:-16]
+    R=FD_resample(S,dt,dt_out,D.shape[1])
+    assert np.abs(FD_time_shift(D,R,dt_out)).max()<0.01*dt_out
+    assert misfit(D,R)<1e-3
+
+def test_archive_keeps_max_error_and_non_finite_values(tmp_path):
+    # Quantized chunks within max_error, chunks with inf/NaN or values which
+    # do not fit into int64 lossless
+    rng=np.random.default_rng(0)
+    S=rng.standard_normal((12,500))
+    S[4,10]=np.nan
+    S[5,20]=-np.inf
+    S[9,30]=1e20
+    filename=str(tmp_path/"run.fda")
+    header=FD_archive_save(filename,S,max_error=1e-3,chunk_size=2*S[0].nbytes)
+    assert [c["encoding"] for c in header["chunks"]]==["quantized","quantized","cast","quantized","cast","quantized"]
+    archive=FD_archive_open(filename)
+    R=FD_archive_read(archive)
+    quantized=np.r_[0:4,6:8,10:12]
+    assert np.abs(R[quantized]-S[quantized]).max()<=1e-3
+    assert np.array_equal(R[4:6],S[4:6],equal_nan=True) and np.array_equal(R[8:10],S[8:10])
+    assert np.array_equal(FD_archive_read(archive,slice(4,6)),S[4:6],equal_nan=True)
+
+def test_sweep_resumes_missing_and_failed_points(tmp_path):
+    # Counting modelling function, which fails for c2=0.9 on the first sweep
+    runs=[]
+    def modelling(modell_v,rho,dx,dt,q,xscr,xrec,spatial_order=4):
+        runs.append(dt)
+        if dt>0.85*dx/1500 and len(runs)<=3:
+            return
+        return(np.outer(modell_v[xrec]*dt,q))
+    modell_v=np.where(np.arange(200)<100,1000.0,1500.0)
+    points=FD_sweep_points({"c2":[0.3,0.9],"spatial_order":[4,8]})
+    setup={"T":0.1,"xscr":30,"xrec":[60,120]}
+    directory=str(tmp_path/"sweep")
+    results=FD_sweep(modelling,modell_v,np.ones(200),points[:3],setup,directory,workers=1)
+    assert len(runs)==3 and [r["failed"] for r in results]==[False,False,True]
+    # Only the failed and the new point are run again
+    results=FD_sweep(modelling,modell_v,np.ones(200),points,setup,directory,workers=1)
+    assert len(runs)==5 and not any(r["failed"] for r in results)
+    assert np.load(results[2]["seismograms"]).shape==(2,results[2]["nt"])
+    FD_sweep(modelling,modell_v,np.ones(200),points,setup,directory,workers=1)
+    assert len(runs)==5
+
+def test_live_view_draws_frames(capsys):
+    # Live view with the Agg backend of the tests: frames are drawn and the
+    # seismograms are not changed
+    plt.close("all")
+    modell_v=np.where(np.arange(200)<100,1000.0,1500.0)
+    rho=np.ones(200)
+    dt=2.5/1500*0.5
+    tau=np.pi*10*(np.arange(2000)*dt-0.15)
+    q=(1.0-2.0*tau**2)*np.exp(-tau**2)
+    S=FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120],live=FD_live(fps=1000,max_fraction=1.0))
+    frames=int(re.search(r"Live view: (\d+) frames",capsys.readouterr().out).group(1))
+    assert frames>1
+    wavefield,traces=plt.gcf().axes[:2]
+    # Normalized by the running maximum
+    assert 0.1<np.abs(wavefield.lines[0].get_ydata()).max()<=1.0
+    assert 0.1<np.abs(traces.lines[1].get_ydata()-2).max()<=1.0
+    assert np.array_equal(S,FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120]))
+    plt.close("all")
+
+def test_progress_reports_reach_the_last_time_step(capsys):
+    modell_v=np.where(np.arange(200)<100,1000.0,1500.0)
+    rho=np.ones(200)
+    dt=2.5/1500*0.5
+    q=np.zeros(500)
+    q[2:100]=np.sin(np.arange(98)*0.2)
+    reports=[]
+    # Interval 0: a report after every time step
+    S=FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120],progress=FD_progress(0,callback=reports.append))
+    steps=[r["step"] for r in reports]
+    assert len(steps)>100 and all(a<b for a,b in zip(steps[:-2],steps[1:-1]))
+    assert reports[-1]["final"] and not any(r["final"] for r in reports[:-1])
+    assert steps[-1]+1==reports[-1]["nt"]==q.size and reports[-1]["progress"]==100.0
+    out=capsys.readouterr().out
+    assert out.count("Time step")==len(reports)-1 and "Finished" in out
+    for progress in (None,False):
+        assert np.array_equal(FD_1D_modelling(modell_v,rho,2.5,dt,q,30,[60,120],progress=progress),S)
+        assert capsys.readouterr().out==""
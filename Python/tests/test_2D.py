@@ -0,0 +1,326 @@
+## test_2D.py accuracy tests of the 2-D modelling
+# GNU General Public License v3.0
+#
+# The loop script FD_2D_DX4_DT2.py is the reference of FD_2D_DX4_DT2_fast.py
+# and of FD_2D_modelling. The other schemes are compared with a plain
+# full-array implementation (reference below) on a random model, with
+# every backend, with and without tiling, and with models from .npy files.
+# The block grid refinement is compared with the uniform grid and a finer
+# uniform grid, reciprocal gathers with the gathers of one run per source
+# and runs with early termination with the full runs. The stability limits
+# of the 2-D von Neumann analysis have to hold for FD_2D_modelling (a
+# stencil without stable CFL-number has the limit 0), and the watchdog has
+# to abort runs above them. The job server has to queue jobs by priority,
+# run identical jobs once, reject unknown parameters, the arguments it
+# calculates itself and model files outside of its model directory, and
+# report failed runs.
+#
+# Usage:
+# python -m pytest -q Python/tests/test_2D.py
+import os
+import json
+import time
+import asyncio
+import threading
+import numpy as np
+import pytest
+from FD_2D_modelling_func import FD_2D_modelling
+from FD_1D_modelling_func import ABS_WEIGHTS, SAMPLE_OFFSET
+from FD_taylor_coeff_func import coeff
+from FD_numexpr_func import ne
+from FD_model_func import FD_model_range
+from FD_gather_func import FD_gather
+from FD_stop_func import FD_stop
+from FD_watchdog_func import FD_watchdog
+from FD_1D_dispersion_func import FD_1D_stability_limit, FD_1D_dispersion
+from FD_2D_dispersion_func import FD_2D_stability_limit, FD_2D_dispersion, FD_2D_phase_error
+from FD_1D_modelling_func import FD_1D_modelling
+from FD_server_func import FD_job_submit, FD_job_status, FD_job_result, _server, _serve, _route
+
+# Small version of the model of the scripts
+PARAMETERS={"nx":60,"ny":60,"T":0.25,"f0":10,"xscr":30,"yscr":30,
+            "xrec1":30,"yrec1":20,"xrec2":30,"yrec2":30,"xrec3":45,"yrec3":40}
+
+BACKENDS=["numpy"]+(["numexpr"] if ne is not None else [])
+
+def misfit(S,S_ref):
+    # Largest deviation relative to the largest amplitude of the reference
+    return(np.abs(S-S_ref).max()/np.abs(S_ref).max())
+
+def reference(modell_v,rho,dx,dt,q,src,rec,order,temporal_order,method):
+    # Straightforward implementation with full arrays and np.roll, the
+    # grid points outside 5..n-4 are masked (rigid boundary)
+    c=coeff(order)/dx
+    N=c.size
+    pad=max(max(N,2 if method=="LW" else 0)-4,0)
+    ny,nx=modell_v.shape
+    vx,vy,p=[np.zeros((ny+2*pad,nx+2*pad)) for i in range(3)]
+    rho=np.pad(rho,pad,mode="edge")
+    v=np.pad(modell_v,pad,mode="edge")
+    l=rho*v*v
+    c9=dt**3/24/dx**3
+    weights=ABS_WEIGHTS[2] if method=="LW" else ABS_WEIGHTS[temporal_order]
+    history=[[] for i in range(3)]
+    roll=lambda f,s,axis: np.roll(f,-s,axis)
+    def derivative(f,axis,forward):
+        out=np.zeros_like(f)
+        for n in range(1,N+1):
+            if forward:
+                out+=c[n-1]*(roll(f,n,axis)-roll(f,1-n,axis))
+            else:
+                out+=c[n-1]*(roll(f,n-1,axis)-roll(f,-n,axis))
+        return(out)
+    mask=np.zeros(p.shape,bool)
+    mask[5+pad:ny-4+pad,5+pad:nx-4+pad]=True
+    S=np.zeros((len(rec[0]),q.size))
+    for n in range(2,q.size):
+        for i,(f,axis) in enumerate(((vx,1),(vy,0))):
+            history[i]=[derivative(p,axis,True)]+history[i][:len(weights)-1]
+            correction=0
+            if method=="LW":
+                # Third derivative along axis and mixed derivative
+                third=roll(p,2,axis)-3*roll(p,1,axis)+3*p-roll(p,-1,axis)
+                mixed=roll(p,1,1-axis)-2*p+roll(p,-1,1-axis)
+                mixed=roll(mixed,1,axis)-mixed
+                correction=l*c9/rho**2*(third+mixed)
+            f-=mask*(dt/rho*sum(w*h for w,h in zip(weights,history[i]))+correction)
+        p[src[0]+pad,src[1]+pad]+=q[n]
+        history[2]=[derivative(vx,1,False)+derivative(vy,0,False)]+history[2][:len(weights)-1]
+        correction=0
+        if method=="LW":
+            div=vx-roll(vx,-1,1)+vy-roll(vy,-1,0)
+            correction=l**2*c9/rho*(roll(div,1,1)+roll(div,-1,1)+roll(div,1,0)+roll(div,-1,0)-4*div)
+        p-=mask*(l*dt*sum(w*h for w,h in zip(weights,history[2]))+correction)
+        S[:,n]=p[np.asarray(rec[0])+pad,np.asarray(rec[1])+pad]
+    return(S)
+
+@pytest.fixture(scope="module")
+def loop_results():
+    return({})
+
+@pytest.fixture
+def loop_script(run_script,loop_results):
+    # Result of FD_2D_DX4_DT2.py, calculated once per module
+    if "FD_2D_DX4_DT2" not in loop_results:
+        loop_results["FD_2D_DX4_DT2"]=run_script("2D/FD_2D_DX4_DT2.py",**PARAMETERS)
+    return(loop_results["FD_2D_DX4_DT2"])
+
+def test_fast_script_matches_loop_script(loop_script,run_script):
+    fast=run_script("2D/FD_2D_DX4_DT2_fast.py",progress=None,**PARAMETERS)
+    assert np.abs(loop_script["Seismogramm"]).max()>0
+    assert misfit(fast["Seismogramm"],loop_script["Seismogramm"])<1e-12
+    assert misfit(fast["p"],loop_script["p"])<1e-12
+
+@pytest.mark.parametrize("tiled",[False,True])
+@pytest.mark.parametrize("backend",BACKENDS)
+def test_modelling_matches_loop_script(backend,tiled,loop_script):
+    s=loop_script
+    S=FD_2D_modelling(s["modell_v"],s["rho"],s["dx"],s["dt"],s["q"],s["xscr"],s["yscr"],
+                      [s["xrec1"],s["xrec2"],s["xrec3"]],[s["yrec1"],s["yrec2"],s["yrec3"]],
+                      tiled=tiled,tile=16,fused_steps=3,backend=backend)
+    assert misfit(S,s["Seismogramm"])<1e-12
+
+@pytest.fixture(scope="module")
+def random_model():
+    rng=np.random.default_rng(0)
+    ny,nx=41,47
+    return({"modell_v":1000+500*rng.random((ny,nx)),"rho":1+rng.random((ny,nx)),
+            "dx":5.0,"dt":0.0008,"q":rng.standard_normal(50),
+            "src":(20,23),"rec":([10,20,30],[12,40,23])})
+
+@pytest.mark.parametrize("tiled",[False,True])
+@pytest.mark.parametrize("backend",BACKENDS)
+@pytest.mark.parametrize("order,temporal_order,method",
+                         [(4,3,"ABS"),(4,4,"ABS"),(4,4,"LW"),(8,2,"ABS"),(12,4,"ABS"),(10,4,"LW")])
+def test_modelling_matches_reference(order,temporal_order,method,backend,tiled,random_model):
+    m=random_model
+    S_ref=reference(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],m["src"],m["rec"],
+                    order,temporal_order,method)
+    S=FD_2D_modelling(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],m["src"][1],m["src"][0],
+                      m["rec"][1],m["rec"][0],order,temporal_order,method,
+                      tiled=tiled,tile=16,fused_steps=3,backend=backend)
+    assert misfit(S,S_ref)<1e-12
+
+def test_modelling_with_model_files(random_model,tmp_path):
+    # .npy files (memory maps, read in small chunks) give the same result
+    m=random_model
+    np.save(tmp_path/"modell_v.npy",m["modell_v"])
+    np.save(tmp_path/"rho.npy",m["rho"])
+    assert FD_model_range(str(tmp_path/"modell_v.npy"),chunk_size=1000)==(m["modell_v"].min(),m["modell_v"].max())
+    for order,method in ((4,"ABS"),(10,"LW")):
+        S_ref=FD_2D_modelling(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],m["src"][1],m["src"][0],
+                              m["rec"][1],m["rec"][0],order,4,method)
+        S=FD_2D_modelling(str(tmp_path/"modell_v.npy"),str(tmp_path/"rho.npy"),m["dx"],m["dt"],m["q"],
+                          m["src"][1],m["src"][0],m["rec"][1],m["rec"][0],order,4,method,tiled=True,tile=16)
+        assert misfit(S,S_ref)<1e-12
+
+@pytest.mark.parametrize("order,temporal_order",[(4,2),(8,3)])
+def test_reciprocal_gathers_match_shot_gathers(order,temporal_order,random_model):
+    # Three sources and two receivers: two reciprocal runs
+    m=random_model
+    args=(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],([m["src"][1],30,15],[m["src"][0],10,35]),
+          (m["rec"][1][:2],m["rec"][0][:2]))
+    S=FD_gather(FD_2D_modelling,*args,mode="shots",spatial_order=order,temporal_order=temporal_order)
+    assert np.abs(S).max()>0
+    assert misfit(FD_gather(FD_2D_modelling,*args,spatial_order=order,temporal_order=temporal_order),S)<1e-12
+
+@pytest.mark.parametrize("tiled",[False,True])
+def test_early_termination_matches_full_run(tiled):
+    # Direct wave at the receivers before t_arrival, the reflections at the
+    # model edges arrive after 0.45 s (with tiles, the checks are after the
+    # blocks of fused time steps)
+    n=120
+    modell_v=1500*np.ones((n,n))
+    rho=np.ones((n,n))
+    dx=5.0
+    dt=dx/1500*0.4
+    tau=np.pi*15*(np.arange(int(0.5/dt))*dt-0.1)
+    q=(1.0-2.0*tau**2)*np.exp(-tau**2)
+    args=(modell_v,rho,dx,dt,q,60,60,[64,68],[60,60])
+    S_ref=FD_2D_modelling(*args)
+    S=FD_2D_modelling(*args,tiled=tiled,tile=32,stop=FD_stop(t_arrival=0.2,every=20))
+    last=np.flatnonzero(np.abs(S).max(axis=0)>0)[-1]
+    assert 0.2<=last*dt<0.35
+    assert np.array_equal(S[:,:last+1],S_ref[:,:last+1])
+    assert np.abs(S_ref[:,last+1:int(0.35/dt)]).max()<0.01*np.abs(S_ref).max()
+
+@pytest.mark.parametrize("temporal_order",[2,3])
+def test_refinement_with_uniform_blocks_matches_reference(temporal_order,random_model):
+    m=random_model
+    S_ref=reference(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],m["src"],m["rec"],
+                    8,temporal_order,"ABS")
+    W=np.zeros(m["modell_v"].shape)
+    S=FD_2D_modelling(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],m["src"][1],m["src"][0],
+                      m["rec"][1],m["rec"][0],8,temporal_order,refinement=[(0,20,1.0),(20,41,1.0)],
+                      wavefield=W)
+    assert misfit(S,S_ref)<1e-12
+    assert np.abs(W).max()>0
+
+def test_refinement_is_accurate_and_stable():
+    # Band of 3000 m/s (spacing 3*dx) between 1000 m/s and 2000 m/s (spacing
+    # 2*dx), compared with a uniform grid with the spacing dx/2 (source k*q
+    # for the same source per area) and the uniform grid with dx
+    ny,nx=140,80
+    f0=10.0
+    dx=5.0
+    dt=dx/3000*0.5/np.sqrt(2)
+    def model(k):
+        y=np.arange(k*ny)[:,None]/float(k)*np.ones(k*nx)
+        return(np.where(y<50,1000.0,np.where(y<110,3000.0,2000.0)),np.where(y<50,1.0,2.0))
+    def ricker(t):
+        tau=np.pi*f0*(t-1.5/f0)
+        return((1.0-2.0*tau**2)*np.exp(-tau**2))
+    modell_v,rho=model(1)
+    for T,k in ((0.25,2),(2.0,1)):
+        n=np.arange(int(k*T/dt))
+        S_ref=FD_2D_modelling(*model(k),dx/k,dt/k,k*ricker(n*dt/k),40*k,30*k,[40*k]*3,[40*k,80*k,120*k])
+        n=np.arange(int(T/dt))
+        S=FD_2D_modelling(modell_v,rho,dx,dt,ricker(n*dt),40,30,[40,40,40],[40,80,120],refinement=True)
+        if k>1:
+            S_ref=np.array([np.interp(n,(np.arange(s.size)+SAMPLE_OFFSET)/k-SAMPLE_OFFSET,s) for s in S_ref])
+            assert misfit(S,S_ref)<0.05
+        assert np.abs(S).max()<1.1*np.abs(S_ref).max()
+
+@pytest.mark.parametrize("order,temporal_order,method",[(4,2,"ABS"),(4,3,"ABS"),(4,4,"LW"),(8,2,"ABS")])
+def test_stability_limit_holds_for_modelling(order,temporal_order,method):
+    # Limit of the diagonal about 1/sqrt(2) of 1-D, dispersion along x as in 1-D
+    CFL=FD_2D_stability_limit(temporal_order,order,method)
+    assert abs(CFL*np.sqrt(2)/FD_1D_stability_limit(temporal_order,order,method)-1)<0.005
+    KH=np.linspace(0.1,2.0,20)
+    assert np.array_equal(FD_2D_dispersion(temporal_order,order,0.4,KH,0.0,method),
+                          FD_1D_dispersion(temporal_order,order,0.4,KH,method))
+    assert FD_2D_phase_error(temporal_order,order,0.4,10,method)[0]<0.01
+    # Coefficients which are unstable for every sampled CFL number
+    assert FD_2D_stability_limit(temporal_order,order,method,1e4*coeff(order))==0.0
+    # Random source signal in a homogeneous medium: stable just below the
+    # limit, growing just above
+    rng=np.random.default_rng(0)
+    modell_v=np.full((40,40),2000.0)
+    q=np.zeros(1500)
+    q[2:50]=rng.standard_normal(48)
+    S=[]
+    for factor in (0.98,1.03):
+        with np.errstate(over="ignore",invalid="ignore"):
+            S.append(FD_2D_modelling(modell_v,np.ones((40,40)),1.0,factor*CFL/2000,q,20,20,[15],[15],
+                                     order,temporal_order,method,backend="numpy",watchdog=False))
+    assert np.abs(S[0][:,-100:]).max()<2*np.abs(S[0][:,:100]).max()
+    assert not np.abs(S[1][:,-100:]).max()<1e3*np.abs(S[1][:,:100]).max()
+    # The watchdog aborts the unstable run
+    reports=[]
+    assert FD_2D_modelling(modell_v,np.ones((40,40)),1.0,1.03*CFL/2000,q,20,20,[15],[15],order,temporal_order,
+                           method,watchdog=FD_watchdog(callback=reports.append,quiet=True)) is None
+    assert reports[0]["step"]<500 and reports[0]["suggested_CFL"]<CFL<reports[0]["CFL"]
+
+def test_server_queues_jobs_and_checks_model_files(tmp_path):
+    # Submit, identical jobs, priorities and rejected configurations
+    # (requests without event loop and workers)
+    os.makedirs(tmp_path/"Models")
+    filename=str(tmp_path/"Models"/"v.npy")
+    np.save(filename,np.full(200,1500.0))
+    server=_server(str(tmp_path/"Jobs"),str(tmp_path/"Models"))
+    def submit(config):
+        return(_route(server,"POST","/jobs",json.dumps(config).encode()))
+    code,job=submit({"dim":1,"T":0.2})
+    assert code==202 and job["status"]=="queued"
+    code,same=submit({"dim":1,"T":0.2})
+    assert code==200 and same["id"]==job["id"] and len(server["jobs"])==1
+    code,file_job=submit({"dim":1,"T":0.2,"modell_v":"v.npy","priority":2})
+    assert code==202 and file_job["position"]==0
+    # The identical job with a higher priority moves ahead
+    code,same=submit({"dim":1,"T":0.2,"priority":5})
+    assert same["id"]==job["id"] and same["position"]==0
+    assert _route(server,"GET","/jobs/"+file_job["id"],b"")[1]["position"]==1
+    assert server["queue"].get_nowait()[2]==job["id"]
+    # A changed model file is a new job
+    stat=os.stat(filename)
+    os.utime(filename,ns=(stat.st_atime_ns,stat.st_mtime_ns+10**9))
+    code,changed=submit({"dim":1,"T":0.2,"modell_v":"v.npy","priority":2})
+    assert code==202 and changed["id"]!=file_job["id"]
+    # Unknown parameters and model files outside of the model directory
+    for config in ({"dim":1,"speed":2},{"dim":1,"progress":1},{"dim":3},{"modell_v":"../Models/v.npy"},
+                   {"modell_v":filename},{"rho":".."},{"rho":"Models/v.npy"},{"modell_v":"w.npy"}):
+        code,error=submit(config)
+        assert code==400 and "error" in error
+    assert len(server["jobs"])==3
+
+@pytest.mark.parametrize("dim",[1,2])
+def test_server_rejects_calculated_arguments(dim,tmp_path):
+    # dx, dt and q are positional arguments of the modelling functions,
+    # which the server calculates from the configuration
+    server=_server(str(tmp_path/"Jobs"),str(tmp_path/"Models"))
+    for config in ({"dx":2.0},{"dt":0.001},{"q":[0.0,1.0]},{"dt":0.001,"spatial_order":8}):
+        code,error=_route(server,"POST","/jobs",json.dumps(dict(config,dim=dim)).encode())
+        assert code==400 and "calculated by the server" in error["error"]
+    assert not server["jobs"]
+    code,job=_route(server,"POST","/jobs",json.dumps({"dim":dim,"spatial_order":8}).encode())
+    assert code==202
+
+def test_server_runs_and_fails_jobs(tmp_path):
+    # Server with one worker on a Unix socket: a run with a model file and
+    # an unstable run, which is aborted by the watchdog
+    os.makedirs(tmp_path/"Models")
+    np.save(tmp_path/"Models"/"v.npy",np.where(np.arange(200)<100,1000.0,1500.0))
+    address="unix:"+str(tmp_path/"fd.sock")
+    loop=asyncio.new_event_loop()
+    serve=loop.create_task(_serve(address,1,str(tmp_path/"Jobs"),str(tmp_path/"Models")))
+    thread=threading.Thread(target=loop.run_until_complete,args=(asyncio.gather(serve,return_exceptions=True),))
+    thread.start()
+    try:
+        while not os.path.exists(tmp_path/"fd.sock"):
+            time.sleep(0.01)
+        config={"dim":1,"T":1,"nx":200,"xscr":30,"xrec":[60,120],"modell_v":"v.npy","rho":1.0}
+        job=FD_job_submit(config,address)
+        failed=FD_job_submit(dict(config,c2=1.5),address)
+        S=FD_job_result(job["id"],address,poll=0.05)
+        assert FD_job_result(failed["id"],address,poll=0.05) is None
+        status=FD_job_status(failed["id"],address)
+        assert status["status"]=="failed" and "Unstable" in status["error"]
+        dx=1000.0/(20*20)
+        dt=dx/1500*0.5
+        tau=np.pi*10*(np.arange(0,1,dt)-0.15)
+        q=(1.0-2.0*tau**2)*np.exp(-tau**2)
+        assert np.array_equal(S,FD_1D_modelling(np.load(tmp_path/"Models"/"v.npy"),np.ones(200),dx,dt,q,30,[60,120]))
+    finally:
+        loop.call_soon_threadsafe(serve.cancel)
+        thread.join()
+        loop.close()
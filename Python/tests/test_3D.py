@@ -0,0 +1,107 @@
+## test_3D.py accuracy tests of the 3-D modelling
+# GNU General Public License v3.0
+#
+# FD_3D_modelling is compared with a plain full-array implementation
+# (reference below) on a random model, with several slab sizes and in
+# single precision. Unstable runs have to be aborted by the watchdog, and
+# reciprocal gathers (one run per receiver) have to match the runs per
+# source.
+#
+# Usage:
+# python -m pytest -q Python/tests/test_3D.py
+import numpy as np
+import pytest
+from FD_3D_modelling_func import FD_3D_modelling
+from FD_1D_modelling_func import ABS_WEIGHTS
+from FD_taylor_coeff_func import coeff
+from FD_watchdog_func import FD_watchdog
+from FD_gather_func import FD_gather
+
+def misfit(S,S_ref):
+    # Largest deviation relative to the largest amplitude of the reference
+    return(np.abs(S-S_ref).max()/np.abs(S_ref).max())
+
+def reference(modell_v,rho,dx,dt,q,src,rec,order,temporal_order):
+    # Straightforward implementation with full arrays and np.roll, the
+    # grid points outside 5..n-4 are masked (rigid boundary)
+    c=coeff(order)/dx
+    N=c.size
+    pad=max(N-4,0)
+    nz,ny,nx=modell_v.shape
+    vx,vy,vz,p=[np.zeros((nz+2*pad,ny+2*pad,nx+2*pad)) for i in range(4)]
+    dt_rho=np.pad(dt/rho,pad)
+    l_dt=np.pad(rho*modell_v*modell_v*dt,pad)
+    weights=ABS_WEIGHTS[temporal_order]
+    history=[[] for i in range(4)]
+    roll=lambda f,s,axis: np.roll(f,-s,axis)
+    def derivative(f,axis,forward):
+        out=np.zeros_like(f)
+        for n in range(1,N+1):
+            if forward:
+                out+=c[n-1]*(roll(f,n,axis)-roll(f,1-n,axis))
+            else:
+                out+=c[n-1]*(roll(f,n-1,axis)-roll(f,-n,axis))
+        return(out)
+    mask=np.zeros(p.shape,bool)
+    mask[5+pad:nz-4+pad,5+pad:ny-4+pad,5+pad:nx-4+pad]=True
+    S=np.zeros((len(rec[0]),q.size))
+    for n in range(2,q.size):
+        for i,(f,axis) in enumerate(((vx,2),(vy,1),(vz,0))):
+            history[i]=[derivative(p,axis,True)]+history[i][:len(weights)-1]
+            f-=mask*dt_rho*sum(w*h for w,h in zip(weights,history[i]))
+        p[tuple(s+pad for s in src)]+=q[n]
+        div=derivative(vx,2,False)+derivative(vy,1,False)+derivative(vz,0,False)
+        history[3]=[div]+history[3][:len(weights)-1]
+        p-=mask*l_dt*sum(w*h for w,h in zip(weights,history[3]))
+        S[:,n]=p[tuple(np.asarray(r)+pad for r in rec)]
+    return(S)
+
+@pytest.fixture(scope="module")
+def random_model():
+    rng=np.random.default_rng(0)
+    nz,ny,nx=22,24,26
+    return({"modell_v":1000+500*rng.random((nz,ny,nx)),"rho":1+rng.random((nz,ny,nx)),
+            "dx":5.0,"dt":0.0008,"q":rng.standard_normal(30),
+            "src":(11,12,13),"rec":([7,14],[8,16],[6,19])})
+
+@pytest.mark.parametrize("order,temporal_order",[(4,2),(4,3),(4,4),(8,2),(12,4)])
+def test_modelling_matches_reference(order,temporal_order,random_model):
+    m=random_model
+    src=m["src"]
+    rec=m["rec"]
+    S_ref=reference(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],src,rec,order,temporal_order)
+    for slab in (None,1,5):
+        S=FD_3D_modelling(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],src[2],src[1],src[0],
+                          rec[2],rec[1],rec[0],order,temporal_order,slab=slab)
+        assert misfit(S,S_ref)<1e-12
+    S=FD_3D_modelling(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],src[2],src[1],src[0],
+                      rec[2],rec[1],rec[0],order,temporal_order,dtype=np.float32)
+    assert S.dtype==np.float32
+    assert misfit(S,S_ref)<1e-4
+
+def test_watchdog_aborts_unstable_runs(random_model):
+    # Homogeneous model above the stability limit of DX4_DT2 in 3-D (about
+    # 0.495), the suggested time step is stable
+    m=random_model
+    modell_v=np.full(m["modell_v"].shape,1500.0)
+    rho=np.ones(m["modell_v"].shape)
+    q=np.zeros(600)
+    q[2:32]=m["q"]
+    reports=[]
+    watchdog=FD_watchdog(callback=reports.append,quiet=True)
+    dt=0.52*m["dx"]/1500
+    assert FD_3D_modelling(modell_v,rho,m["dx"],dt,q,13,12,11,[19],[16],[6],watchdog=watchdog) is None
+    assert len(reports[0]["position"])==3 and reports[0]["suggested_CFL"]<0.495
+    S=FD_3D_modelling(modell_v,rho,m["dx"],reports[0]["suggested_dt"],q,13,12,11,[19],[16],[6],watchdog=watchdog)
+    assert S is not None and len(reports)==1
+
+@pytest.mark.parametrize("order,temporal_order",[(4,2),(8,3)])
+def test_reciprocal_gathers_match_shot_gathers(order,temporal_order,random_model):
+    # Three sources and two receivers, positions (x, y, z)
+    m=random_model
+    sources=([13,10,15],[12,9,14],[11,10,12])
+    receivers=([19,8],[16,15],[6,14])
+    args=(m["modell_v"],m["rho"],m["dx"],m["dt"],m["q"],sources,receivers)
+    S=FD_gather(FD_3D_modelling,*args,mode="shots",spatial_order=order,temporal_order=temporal_order)
+    assert misfit(S[1],FD_3D_modelling(*args[:5],10,9,10,*receivers,order,temporal_order))==0
+    assert misfit(FD_gather(FD_3D_modelling,*args,spatial_order=order,temporal_order=temporal_order),S)<1e-12